@@ -1,15 +1,25 @@
+import time
+LAUNCH_TIME = time.perf_counter() # For the launch-to-first-frame report
+
 import pygame
+import math
 import os
 import random
-import math
-
-# --- INITIALIZATION ---
-pygame.font.init()
-pygame.mixer.init()
+import threading
 
 # --- CONSTANTS ---
-# Screen Dimensions
-WIDTH, HEIGHT = 900, 500
+# Screen dimensions, game settings and the rules themselves live in simulation.py
+from simulation import (WIDTH, HEIGHT, BORDER, FPS, MAX_BULLETS, BULLET_VEL,
+                        INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE,
+                        new_state, step, tick_dt, multishot_seconds_left)
+from dirty_rects import DirtyRenderer
+from text_cache import TEXT_CACHE, render_text
+from profiler import FrameProfiler
+import event_bus
+import asset_pack
+import audio
+import replay
+import telemetry
 
 # Colors
 WHITE = (255, 255, 255)
@@ -21,357 +31,623 @@ HEALTH_BAR_GREEN = (0, 200, 0)
 HEALTH_POWERUP_COLOR = (60, 180, 255) # Light Blue
 MULTI_SHOT_POWERUP_COLOR = (255, 105, 180) # Pink
 
-# Game Window
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Spaceship Fighter!")
-
-# Center Border
-BORDER = pygame.Rect(WIDTH // 2 - 5, 0, 10, HEIGHT)
-
-# Fonts
-HEALTH_FONT = pygame.font.SysFont('comicsans', 40)
-WINNER_FONT = pygame.font.SysFont('comicsans', 100)
-MENU_FONT = pygame.font.SysFont('comicsans', 60)
-INSTRUCTION_FONT = pygame.font.SysFont('comicsans', 30)
-BUTTON_FONT = pygame.font.SysFont('comicsans', 50)
-UI_FONT = pygame.font.SysFont('comicsans', 24)
-
-# Game Settings
-FPS = 60
-VEL = 5  # Player spaceship velocity
-BULLET_VEL = 7
-MAX_BULLETS = 5 # Increased max bullets to accommodate multi-shot
-PLAYER_BULLET_COOLDOWN = 500 # Milliseconds between player shots
-MULTI_SHOT_DURATION = 5000 # 5 seconds
-POWERUP_LIFESPAN = 5000 # 5 seconds for a power-up to exist
+# Particle effects: "OFF", "LOW", "MEDIUM" or "HIGH" (up to 20,000 live particles); --particles QUALITY
+PARTICLE_QUALITY = "HIGH"
+PARTICLE_MAX_STEP = 0.05 # Seconds particles advance per frame at most, so they freeze during pauses and stalls
+THRUSTER_PARTICLES_PER_SECOND = 600
+# Particle groups, each drawn as its own dirty rect: one per ship's thruster trail, and one per burst after those
+THRUSTER_GROUPS = {"yellow": 1, "red": 2}
+BURST_GROUPS = 256 # Burst group numbers are reused after this many; a burst is long gone by then
 
 # --- AI Difficulty Settings ---
-DIFFICULTY = "EASY" # Options: "EASY", "HARD"
-if DIFFICULTY == "HARD":
-    AI_VEL = 4.5
-    AI_SHOOT_COOLDOWN = 600 # AI shoots faster
-else: # EASY
-    AI_VEL = 3
-    AI_SHOOT_COOLDOWN = 1000 # AI shoots slower
-
-# Spaceship Dimensions
-SPACESHIP_WIDTH, SPACESHIP_HEIGHT = 55, 40
-
-# --- ASSET LOADING ---
-# NOTE: Create an 'Assets' folder in the same directory as your script.
-# Add your images and sounds there.
-
-# Custom Events
-YELLOW_HIT = pygame.USEREVENT + 1
-RED_HIT = pygame.USEREVENT + 2
-
-# Sound Effects
-try:
-    BULLET_HIT_SOUND = pygame.mixer.Sound(os.path.join('Assets', 'Grenade+1.mp3'))
-    BULLET_FIRE_SOUND = pygame.mixer.Sound(os.path.join('Assets', 'Gun+Silencer.mp3'))
-    POWERUP_SOUND = pygame.mixer.Sound(os.path.join('Assets', 'Powerup.wav')) # Add a sound for power-ups
-    # Load background music - UPDATED to use theme.mp3
-    pygame.mixer.music.load(os.path.join('Assets', 'theme.mp3'))
-    pygame.mixer.music.set_volume(0.4) # Set volume to 40%
-except pygame.error as e:
-    print(f"Warning: Could not load sound files. Error: {e}")
-    BULLET_HIT_SOUND = None
-    BULLET_FIRE_SOUND = None
-    POWERUP_SOUND = None
-
-
-# Images
-try:
-    YELLOW_SPACESHIP_IMAGE = pygame.image.load(os.path.join('Assets', 'spaceship_yellow.png'))
-    YELLOW_SPACESHIP = pygame.transform.rotate(pygame.transform.scale(YELLOW_SPACESHIP_IMAGE, (SPACESHIP_WIDTH, SPACESHIP_HEIGHT)), 90)
-
-    RED_SPACESHIP_IMAGE = pygame.image.load(os.path.join('Assets', 'spaceship_red.png'))
-    RED_SPACESHIP = pygame.transform.rotate(pygame.transform.scale(RED_SPACESHIP_IMAGE, (SPACESHIP_WIDTH, SPACESHIP_HEIGHT)), 270)
-
-    # List of possible backgrounds
-    SPACE_BACKGROUNDS = [
-        pygame.transform.scale(pygame.image.load(os.path.join('Assets', 'space.png')), (WIDTH, HEIGHT)),
-        pygame.transform.scale(pygame.image.load(os.path.join('Assets', 'space2.webp')), (WIDTH, HEIGHT))
-    ]
-    # Randomly select a background for the session
-    CURRENT_BACKGROUND = random.choice(SPACE_BACKGROUNDS)
+DIFFICULTY = "EASY" # Options: "EASY", "HARD", "HARD+" (plans ahead, dodges bullets; vs. AI only)
+
+# Match seed; None picks a random one for every match (--seed N fixes it, to reproduce a match)
+SEED = None
+
+# Every match is recorded to REPLAY_DIR; play one back with --replay FILE
+RECORD_REPLAYS = True
+REPLAY_DIR = "replays"
+
+# Per-match stats are written to this SQLite database in the background; python telemetry.py summarises them
+RECORD_TELEMETRY = True
+TELEMETRY_PATH = telemetry.DEFAULT_PATH
+
+# Renderer: repaints only changed regions unless DIRTY_RECT_RENDERING is off (F2 toggles it in game)
+DIRTY_RECT_RENDERING = True
+
+# The simulation always ticks FPS times per second; the screen is redrawn at
+# RENDER_FPS (--fps N) with ships and bullets interpolated between ticks
+RENDER_FPS = 60
+TICK_MS = 1000 / FPS
+MAX_CATCH_UP_TICKS = 5 # Ticks run per frame at most; a longer stall is dropped instead of replayed
+
+# Menu, pause and winner screens are drawn once and then wait for input instead of redrawing every frame
+IDLE_WAIT_MS = 1000 # Longest wait for an event on a static screen
+IDLE_POLL_MS = 50 # ...while fonts and sounds are still loading, so the menu text appears promptly
+WINNER_SCREEN_MS = 5000 # How long the result is shown; ESC, ENTER, SPACE or a click skips it
+
+# Per-phase frame profiler; F3 toggles it and its overlay during a match, F4 exports a trace
+PROFILER = FrameProfiler(budget_ms=1000 / FPS)
+PROFILER_OVERLAY_FRAMES = 30 # The overlay's numbers are refreshed this often
+
+# --- SUBSYSTEMS ---
+# Importing this module does no I/O. The window, images, fonts and sounds are
+# created by init(), which main() calls on first use; fonts and sounds then
+# finish loading on a background thread while the menu is drawn.
+WIN = None
+RENDERER = None
+ASSETS = None
+YELLOW_SPACESHIP = None
+RED_SPACESHIP = None
+CURRENT_BACKGROUND = None
+# Bullet sprites for the batched bullet-hell drawing
+YELLOW_BULLET = None
+RED_BULLET = None
 
-except pygame.error as e:
-    print(f"Fatal Error: Could not load image files. Please ensure they are in the 'Assets' folder. Error: {e}")
-    pygame.quit()
-    exit()
+# Fonts
+HEALTH_FONT = None
+WINNER_FONT = None
+MENU_FONT = None
+INSTRUCTION_FONT = None
+BUTTON_FONT = None
+UI_FONT = None
+DEBUG_FONT = None
+
+# Sound Effects, played through an audio.VoicePool with its own mixer channels per category
+SOUNDS = None
+SOUND_CHANNELS = {"weapons": 4, "impacts": 3, "pickups": 2}
+EVENT_SOUNDS = {event_bus.FIRE: "fire", event_bus.HIT: "hit", event_bus.PICKUP: "pickup"}
+
+# Set once the background thread has loaded fonts and sounds
+FONTS_AND_SOUNDS_LOADED = threading.Event()
+
+# Pre-built HUD panels: side -> ((health, bullet_count), surface, rect)
+HUD_PANELS = {}
+HUD_STATS = {"rebuilds": 0}
+# A ship's health bar flashes until this pygame.time.get_ticks() time after a hit
+HUD_FLASH_MS = 200
+HUD_FLASH_UNTIL = {"yellow": 0, "red": 0}
+# Profiler overlay: (refresh number, surface)
+PROFILER_PANEL = [None, None]
+# Particle system (None without NumPy or with PARTICLE_QUALITY "OFF"), the events it has yet to show as
+# (type, side, value), and the frame clock, ship positions and burst group number it last used
+PARTICLES = None
+PARTICLE_BURSTS = []
+PARTICLE_STATE = {"last_frame": None, "yellow": None, "red": None, "burst": 0}
+
+
+def init(headless=False, with_audio=True):
+    """Opens the window and loads images, then starts loading fonts and sounds in the background.
+
+    `headless` uses SDL's dummy video (and audio) drivers; `with_audio` False skips the mixer.
+    Raises RuntimeError if the images can't be loaded.
+    """
+    global WIN, RENDERER, ASSETS, YELLOW_SPACESHIP, RED_SPACESHIP, CURRENT_BACKGROUND, YELLOW_BULLET, RED_BULLET, PARTICLES
+    if WIN is not None:
+        return
+    if headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    # Game Window
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Spaceship Fighter!")
+
+    # --- ASSET LOADING ---
+    # NOTE: Create an 'Assets' folder in the same directory as your script.
+    # Add your images and sounds there.
+
+    # Images - scaled, rotated and stored in display format by asset_pack.py
+    try:
+        ASSETS = asset_pack.load()
+        YELLOW_SPACESHIP = ASSETS.get("yellow_ship")
+        RED_SPACESHIP = ASSETS.get("red_ship")
+
+        # Randomly select a background for the session; only the chosen one is loaded
+        CURRENT_BACKGROUND = ASSETS.get(random.choice(ASSETS.backgrounds()))
+    except (pygame.error, OSError, IndexError) as e:
+        raise RuntimeError(f"Could not load image files. Please ensure they are in the 'Assets' folder. Error: {e}")
+
+    YELLOW_BULLET = pygame.Surface((10, 5)).convert()
+    YELLOW_BULLET.fill(YELLOW)
+    RED_BULLET = pygame.Surface((10, 5)).convert()
+    RED_BULLET.fill(RED)
+
+    RENDERER = DirtyRenderer(WIN, CURRENT_BACKGROUND)
+    RENDERER.full_redraw = not DIRTY_RECT_RENDERING
+
+    if PARTICLE_QUALITY != "OFF":
+        try:
+            from particles import ParticleSystem, QUALITY_BUDGETS
+            quality = PARTICLE_QUALITY
+            if quality not in QUALITY_BUDGETS:
+                print(f"Warning: Unknown particle quality {quality!r}; use OFF, LOW, MEDIUM or HIGH. Using HIGH.")
+                quality = "HIGH"
+            PARTICLES = ParticleSystem(quality)
+            PARTICLES.add_ramp("explosion", (255, 240, 170), (150, 30, 0))
+            PARTICLES.add_ramp("spark", (255, 255, 255), (255, 200, 60))
+            PARTICLES.add_ramp("thruster", (170, 220, 255), (40, 60, 160))
+            PARTICLES.add_ramp("HEALTH", (220, 245, 255), HEALTH_POWERUP_COLOR)
+            PARTICLES.add_ramp("MULTI_SHOT", (255, 230, 245), MULTI_SHOT_POWERUP_COLOR)
+        except ImportError as e:
+            print(f"Warning: Particle effects are off. Error: {e}")
+
+    if with_audio:
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Warning: Could not start audio. Error: {e}")
+    threading.Thread(target=load_fonts_and_sounds, name="asset-loader", daemon=True).start()
+
+def load_fonts_and_sounds():
+    """Loads fonts and, if the mixer is running, sounds and music. Runs on a background thread."""
+    global HEALTH_FONT, WINNER_FONT, MENU_FONT, INSTRUCTION_FONT, BUTTON_FONT, UI_FONT, DEBUG_FONT
+    global SOUNDS
+    try:
+        pygame.font.init()
+        HEALTH_FONT = pygame.font.SysFont('comicsans', 40)
+        WINNER_FONT = pygame.font.SysFont('comicsans', 100)
+        MENU_FONT = pygame.font.SysFont('comicsans', 60)
+        INSTRUCTION_FONT = pygame.font.SysFont('comicsans', 30)
+        BUTTON_FONT = pygame.font.SysFont('comicsans', 50)
+        UI_FONT = pygame.font.SysFont('comicsans', 24)
+        DEBUG_FONT = pygame.font.SysFont('monospace', 14)
+
+        if pygame.mixer.get_init():
+            try:
+                # Decoded samples come from Assets/sound_cache after the first launch
+                sounds = audio.VoicePool(SOUND_CHANNELS)
+                # Pickups matter most, then hits; gunfire is the first to give up a channel
+                sounds.add("hit", audio.load_sound(os.path.join('Assets', 'Grenade+1.mp3')), "impacts", priority=2, retrigger_ms=30)
+                sounds.add("fire", audio.load_sound(os.path.join('Assets', 'Gun+Silencer.mp3')), "weapons", priority=1, retrigger_ms=50)
+                sounds.add("pickup", audio.load_sound(os.path.join('Assets', 'Powerup.wav')), "pickups", priority=3)
+                SOUNDS = sounds
+                # Background music is streamed, so it isn't decoded up front
+                pygame.mixer.music.load(os.path.join('Assets', 'theme.mp3'))
+                pygame.mixer.music.set_volume(0.4) # Set volume to 40%
+            except pygame.error as e:
+                print(f"Warning: Could not load sound files. Error: {e}")
+    finally:
+        FONTS_AND_SOUNDS_LOADED.set()
 
 
 # --- DRAW FUNCTIONS ---
 
-def draw_window(red, yellow, red_bullets, yellow_bullets, red_health, yellow_health, powerups, yellow_multishot_timer, red_multishot_timer):
-    """Draws all game elements to the window."""
-    WIN.blit(CURRENT_BACKGROUND, (0, 0))
-    pygame.draw.rect(WIN, BLACK, BORDER)
-
-    # Health Bars
-    pygame.draw.rect(WIN, HEALTH_BAR_RED, (WIDTH - 210, 10, 200, 30))
-    pygame.draw.rect(WIN, HEALTH_BAR_GREEN, (WIDTH - 210, 10, red_health * 20, 30))
-    pygame.draw.rect(WIN, HEALTH_BAR_RED, (10, 10, 200, 30))
-    pygame.draw.rect(WIN, HEALTH_BAR_GREEN, (10, 10, yellow_health * 20, 30))
-
-    # Health & Ammo Text
-    red_health_text = HEALTH_FONT.render(f"Health: {red_health}", 1, WHITE)
-    yellow_health_text = HEALTH_FONT.render(f"Health: {yellow_health}", 1, WHITE)
-    WIN.blit(red_health_text, (WIDTH - red_health_text.get_width() - 15, 45))
-    WIN.blit(yellow_health_text, (15, 45))
-
-    yellow_ammo_text = UI_FONT.render(f"Bullets: {len(yellow_bullets)}/{MAX_BULLETS}", 1, WHITE)
-    red_ammo_text = UI_FONT.render(f"Bullets: {len(red_bullets)}/{MAX_BULLETS}", 1, WHITE)
-    WIN.blit(yellow_ammo_text, (15, 85))
-    WIN.blit(red_ammo_text, (WIDTH - red_ammo_text.get_width() - 15, 85))
-
-    # Draw Spaceships
-    WIN.blit(YELLOW_SPACESHIP, (yellow.x, yellow.y))
-    WIN.blit(RED_SPACESHIP, (red.x, red.y))
-    
-    # Draw Power-up Timers
+def draw_window(red, yellow, red_bullets, yellow_bullets, red_health, yellow_health, powerups, yellow_multishot_timer, red_multishot_timer, bullet_lag=0.0):
+    """Draws all game elements to the window. Bullets are drawn `bullet_lag` ticks of movement behind their positions."""
+    # Bullet-hell matches keep their bullets in pools instead of lists, with no bullet cap
+    bullet_pools = not isinstance(red_bullets, list)
+    max_bullets = None if bullet_pools else MAX_BULLETS
+
+    if PARTICLES: update_particles(red, yellow)
+
+    # Health Bars, Health & Ammo Text
+    now = pygame.time.get_ticks()
+    red_flash, yellow_flash = HUD_FLASH_UNTIL["red"] > now, HUD_FLASH_UNTIL["yellow"] > now
+    red_hud, red_hud_rect = get_hud_panel("red", red_health, len(red_bullets), max_bullets, red_flash)
+    yellow_hud, yellow_hud_rect = get_hud_panel("yellow", yellow_health, len(yellow_bullets), max_bullets, yellow_flash)
+
+    # Everything on screen, in draw order, as (key, rect, state, draw) for the renderer
+    items = [
+        ("border", BORDER, None, draw_rect(BLACK, BORDER)),
+        blit_item("red_hud", red_hud, red_hud_rect.topleft, (red_health, len(red_bullets), red_flash)),
+        blit_item("yellow_hud", yellow_hud, yellow_hud_rect.topleft, (yellow_health, len(yellow_bullets), yellow_flash)),
+        # Spaceships
+        blit_item("yellow_ship", YELLOW_SPACESHIP, (yellow.x, yellow.y), None),
+        blit_item("red_ship", RED_SPACESHIP, (red.x, red.y), None),
+    ]
+
+    # Power-up Timers
     if yellow_multishot_timer > 0:
-        timer_text = UI_FONT.render(f"Multi-Shot: {yellow_multishot_timer}", 1, MULTI_SHOT_POWERUP_COLOR)
-        WIN.blit(timer_text, (yellow.x, yellow.y - 20))
+        timer_text = render_text(UI_FONT, f"Multi-Shot: {yellow_multishot_timer}", MULTI_SHOT_POWERUP_COLOR)
+        items.append(blit_item("yellow_timer", timer_text, (yellow.x, yellow.y - 20), yellow_multishot_timer))
     if red_multishot_timer > 0:
-        timer_text = UI_FONT.render(f"Multi-Shot: {red_multishot_timer}", 1, MULTI_SHOT_POWERUP_COLOR)
-        WIN.blit(timer_text, (red.x, red.y - 20))
-
+        timer_text = render_text(UI_FONT, f"Multi-Shot: {red_multishot_timer}", MULTI_SHOT_POWERUP_COLOR)
+        items.append(blit_item("red_timer", timer_text, (red.x, red.y - 20), red_multishot_timer))
 
-    # Draw Power-ups as capsules
+    # Power-ups as capsules
     for powerup_rect, powerup_type, _ in powerups: # _ ignores the spawn time
         color = HEALTH_POWERUP_COLOR if powerup_type == "HEALTH" else MULTI_SHOT_POWERUP_COLOR
-        pygame.draw.rect(WIN, color, powerup_rect, border_radius=10)
-
-    # Draw Bullets
-    for bullet in red_bullets:
-        pygame.draw.rect(WIN, RED, bullet)
-    for bullet in yellow_bullets:
-        pygame.draw.rect(WIN, YELLOW, bullet)
-
-    pygame.display.update()
-
-def draw_winner(text):
-    """Displays the winner text and waits before proceeding."""
-    draw_text = WINNER_FONT.render(text, 1, WHITE)
+        items.append((id(powerup_rect), powerup_rect, powerup_type, draw_rect(color, powerup_rect, border_radius=10)))
+
+    # Bullets
+    if bullet_pools:
+        # One item per pool, drawn in a single batched blit; it covers the screen, so it repaints everything when it changes
+        screen = WIN.get_rect()
+        items.append(("red_bullets", screen, (red_bullets.version, bullet_lag), lambda surface: red_bullets.draw(surface, RED_BULLET, bullet_lag)))
+        items.append(("yellow_bullets", screen, (yellow_bullets.version, bullet_lag), lambda surface: yellow_bullets.draw(surface, YELLOW_BULLET, bullet_lag)))
+    else:
+        shift = round(BULLET_VEL * bullet_lag)
+        for bullet in red_bullets:
+            rect = bullet.move(shift, 0)
+            items.append((id(bullet), rect, None, draw_rect(RED, rect)))
+        for bullet in yellow_bullets:
+            rect = bullet.move(-shift, 0)
+            items.append((id(bullet), rect, None, draw_rect(YELLOW, rect)))
+
+    # Particles, written straight into the window's pixels in one batch per effect, so only the area around
+    # each effect is repainted rather than a box spanning both ships' thruster trails
+    if PARTICLES:
+        for group, rect in PARTICLES.groups():
+            items.append((("particles", group), rect, PARTICLES.version, lambda surface, group=group: PARTICLES.draw(surface, group)))
+
+    # Profiler overlay, drawn last so it stays on top
+    if PROFILER.enabled:
+        refresh, panel = get_profiler_panel()
+        items.append(blit_item("profiler", panel, ((WIDTH - panel.get_width()) // 2, 10), refresh))
+        PROFILER.mark("draw_items")
+        dirty = RENDERER.render(items)
+        PROFILER.mark("render")
+        pygame.display.update(dirty)
+        PROFILER.mark("display")
+    else:
+        pygame.display.update(RENDERER.render(items))
+
+def draw_rect(color, rect, **kwargs):
+    """Returns a draw function for a filled rect, for the renderer."""
+    rect = pygame.Rect(rect)
+    return lambda surface: pygame.draw.rect(surface, color, rect, **kwargs)
+
+def get_hud_panel(side, health, bullet_count, max_bullets=MAX_BULLETS, flash=False):
+    """Returns (surface, rect) of one side's health bar, health text and ammo text, rebuilt only when they change.
+    A `max_bullets` of None shows the bullet count without a cap; `flash` outlines the health bar."""
+    key = (health, bullet_count, max_bullets, flash)
+    cached = HUD_PANELS.get(side)
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+
+    health_text = render_text(HEALTH_FONT, f"Health: {health}", WHITE)
+    ammo_text = render_text(UI_FONT, f"Bullets: {bullet_count}/{max_bullets}" if max_bullets else f"Bullets: {bullet_count}", WHITE)
+    if side == "yellow":
+        bar = pygame.Rect(10, 10, 200, 30)
+        health_pos = (15, 45)
+        ammo_pos = (15, 85)
+    else:
+        bar = pygame.Rect(WIDTH - 210, 10, 200, 30)
+        health_pos = (WIDTH - health_text.get_width() - 15, 45)
+        ammo_pos = (WIDTH - ammo_text.get_width() - 15, 85)
+    rect = bar.unionall([health_text.get_rect(topleft=health_pos), ammo_text.get_rect(topleft=ammo_pos)]).clip(WIN.get_rect())
+
+    # The panel starts as a copy of the background behind it, so it is blitted without alpha blending
+    panel = CURRENT_BACKGROUND.subsurface(rect).copy()
+    pygame.draw.rect(panel, HEALTH_BAR_RED, bar.move(-rect.x, -rect.y))
+    pygame.draw.rect(panel, HEALTH_BAR_GREEN, (bar.x - rect.x, bar.y - rect.y, health * 20, bar.height))
+    if flash:
+        pygame.draw.rect(panel, WHITE, bar.move(-rect.x, -rect.y), 3)
+    panel.blit(health_text, (health_pos[0] - rect.x, health_pos[1] - rect.y))
+    panel.blit(ammo_text, (ammo_pos[0] - rect.x, ammo_pos[1] - rect.y))
+
+    HUD_PANELS[side] = (key, panel, rect)
+    HUD_STATS["rebuilds"] += 1
+    return panel, rect
+
+def blit_item(key, image, pos, state):
+    """Builds a renderer item that blits a pre-rendered surface at `pos`."""
+    return (key, image.get_rect(topleft=pos), state, lambda surface: surface.blit(image, pos))
+
+def get_profiler_panel():
+    """Returns (refresh number, surface) for the profiler overlay, re-rendered every PROFILER_OVERLAY_FRAMES frames."""
+    refresh = PROFILER.frames // PROFILER_OVERLAY_FRAMES
+    if PROFILER_PANEL[0] != refresh:
+        PROFILER_PANEL[:] = [refresh, PROFILER.overlay(DEBUG_FONT)]
+    return PROFILER_PANEL[0], PROFILER_PANEL[1]
+
+def update_particles(red, yellow):
+    """Emits particles for the queued gameplay events and for ships that moved, then advances every particle to now."""
+    seconds = particle_seconds()
+    ships = {"yellow": yellow, "red": red}
+
+    # Explosions on hits, bursts in the power-up's colour on pickups
+    for event_type, side, value in PARTICLE_BURSTS:
+        ship = ships[side]
+        PARTICLE_STATE["burst"] = PARTICLE_STATE["burst"] % BURST_GROUPS + 1
+        group = len(THRUSTER_GROUPS) + PARTICLE_STATE["burst"]
+        if event_type == event_bus.HIT:
+            PARTICLES.emit(ship.centerx, ship.centery, 300, 260, 0.7, "explosion", group=group)
+            PARTICLES.emit(ship.centerx, ship.centery, 60, 420, 0.3, "spark", group=group)
+        else:
+            PARTICLES.emit(ship.centerx, ship.centery, 150, 180, 0.5, value, group=group)
+    PARTICLE_BURSTS.clear()
+
+    # Thruster trails out of the back of moving ships: yellow faces right, red faces left
+    for side, ship in ships.items():
+        moved = PARTICLE_STATE[side] not in (None, ship.topleft)
+        PARTICLE_STATE[side] = ship.topleft
+        if moved:
+            x, angle = (ship.left, math.pi) if side == "yellow" else (ship.right, 0.0)
+            PARTICLES.emit(x, ship.centery, THRUSTER_PARTICLES_PER_SECOND * seconds, 90, 0.3, "thruster", angle, 0.3, THRUSTER_GROUPS[side])
+
+    PARTICLES.update(seconds, WIDTH, HEIGHT)
+
+def particle_seconds():
+    """Seconds since particles last advanced, capped at PARTICLE_MAX_STEP."""
+    now = time.perf_counter()
+    last = PARTICLE_STATE["last_frame"]
+    PARTICLE_STATE["last_frame"] = now
+    return min(now - last, PARTICLE_MAX_STEP) if last else 0.0
+
+def reset_particles():
+    """Clears every particle and the queued bursts, e.g. when a new match starts."""
+    PARTICLE_BURSTS.clear()
+    PARTICLE_STATE.update(last_frame=None, yellow=None, red=None)
+    if PARTICLES: PARTICLES.clear()
+
+def start_winner_screen(loser):
+    """Sets off the explosion of the losing ship `loser`, a pygame.Rect, and returns a copy of the window to draw it over."""
+    if PARTICLES:
+        PARTICLES.emit(loser.centerx, loser.centery, 9000, 480, 2.0, "explosion")
+        PARTICLES.emit(loser.centerx, loser.centery, 2500, 700, 1.0, "spark")
+        PARTICLES.emit(loser.centerx, loser.centery, 1500, 250, 2.5, "thruster")
+    return WIN.copy()
+
+def draw_winner(text, backdrop):
+    """Draws one frame of the winner screen: the winner text over `backdrop` and the particles still flying.
+    Returns True while particles are left, i.e. while the screen is still animating."""
+    WIN.blit(backdrop, (0, 0))
+    if PARTICLES:
+        PARTICLES.update(particle_seconds(), WIDTH, HEIGHT)
+        PARTICLES.draw(WIN)
+    draw_text = render_text(WINNER_FONT, text, WHITE)
     WIN.blit(draw_text, (WIDTH / 2 - draw_text.get_width() / 2, HEIGHT / 2 - draw_text.get_height() / 2))
     pygame.display.update()
-    pygame.time.delay(5000)
+    return bool(PARTICLES and PARTICLES.count)
+
+# Menu buttons by the game mode they start
+MENU_BUTTONS = {
+    "AI": pygame.Rect(WIDTH/2 - 150, 180, 300, 60),
+    "PVP": pygame.Rect(WIDTH/2 - 150, 270, 300, 60),
+    "BULLET_HELL": pygame.Rect(WIDTH/2 - 150, 360, 300, 60),
+}
 
 def draw_menu():
     """Draws the main menu screen with selectable game modes."""
     WIN.blit(CURRENT_BACKGROUND, (0, 0))
-    title_text = MENU_FONT.render("Spaceship Fighter", 1, WHITE)
-    WIN.blit(title_text, (WIDTH/2 - title_text.get_width()/2, 50))
-
-    # Define buttons
-    vs_ai_button = pygame.Rect(WIDTH/2 - 150, 200, 300, 60)
-    vs_player_button = pygame.Rect(WIDTH/2 - 150, 300, 300, 60)
+    vs_ai_button, vs_player_button, bullet_hell_button = MENU_BUTTONS["AI"], MENU_BUTTONS["PVP"], MENU_BUTTONS["BULLET_HELL"]
 
     # Draw buttons
     pygame.draw.rect(WIN, (0, 100, 200), vs_ai_button, border_radius=10)
     pygame.draw.rect(WIN, (200, 100, 0), vs_player_button, border_radius=10)
+    pygame.draw.rect(WIN, (150, 0, 150), bullet_hell_button, border_radius=10)
+
+    # Text appears as soon as the fonts have finished loading
+    if not FONTS_AND_SOUNDS_LOADED.is_set():
+        pygame.display.update()
+        return
+
+    title_text = render_text(MENU_FONT, "Spaceship Fighter", WHITE)
+    WIN.blit(title_text, (WIDTH/2 - title_text.get_width()/2, 50))
 
     # Draw button text
-    ai_text = BUTTON_FONT.render("Play vs. AI", 1, WHITE)
-    player_text = BUTTON_FONT.render("Play vs. Player", 1, WHITE)
+    ai_text = render_text(BUTTON_FONT, "Play vs. AI", WHITE)
+    player_text = render_text(BUTTON_FONT, "Play vs. Player", WHITE)
+    bullet_hell_text = render_text(BUTTON_FONT, "Bullet Hell", WHITE)
     WIN.blit(ai_text, (vs_ai_button.x + (vs_ai_button.width - ai_text.get_width()) / 2, vs_ai_button.y + 5))
     WIN.blit(player_text, (vs_player_button.x + (vs_player_button.width - player_text.get_width()) / 2, vs_player_button.y + 5))
+    WIN.blit(bullet_hell_text, (bullet_hell_button.x + (bullet_hell_button.width - bullet_hell_text.get_width()) / 2, bullet_hell_button.y + 5))
     
-    pause_control = INSTRUCTION_FONT.render("P = Pause | ESC = Return to Menu", 1, WHITE)
-    WIN.blit(pause_control, (WIDTH/2 - pause_control.get_width()/2, 420))
+    pause_control = render_text(INSTRUCTION_FONT, "P = Pause | ESC = Return to Menu", WHITE)
+    WIN.blit(pause_control, (WIDTH/2 - pause_control.get_width()/2, 440))
 
     pygame.display.update()
-    return vs_ai_button, vs_player_button
 
 
 def draw_pause_screen():
     """Draws the pause overlay."""
-    pause_text = WINNER_FONT.render("PAUSED", 1, WHITE)
+    pause_text = render_text(WINNER_FONT, "PAUSED", WHITE)
     WIN.blit(pause_text, (WIDTH/2 - pause_text.get_width()/2, HEIGHT/2 - pause_text.get_height()/2))
     pygame.display.update()
 
 
-# --- GAME LOGIC FUNCTIONS ---
-
-def handle_yellow_movement(keys_pressed, yellow):
-    if keys_pressed[pygame.K_a] and yellow.x - VEL > 0:  # LEFT
-        yellow.x -= VEL
-    if keys_pressed[pygame.K_d] and yellow.x + VEL + yellow.width < BORDER.x:  # RIGHT
-        yellow.x += VEL
-    if keys_pressed[pygame.K_w] and yellow.y - VEL > 0:  # UP
-        yellow.y -= VEL
-    if keys_pressed[pygame.K_s] and yellow.y + VEL + yellow.height < HEIGHT - 15:  # DOWN
-        yellow.y += VEL
-
-def handle_red_movement(keys_pressed, red):
-    if keys_pressed[pygame.K_LEFT] and red.x - VEL > BORDER.x + BORDER.width:  # LEFT
-        red.x -= VEL
-    if keys_pressed[pygame.K_RIGHT] and red.x + VEL + red.width < WIDTH:  # RIGHT
-        red.x += VEL
-    if keys_pressed[pygame.K_UP] and red.y - VEL > 0:  # UP
-        red.y -= VEL
-    if keys_pressed[pygame.K_DOWN] and red.y + VEL + red.height < HEIGHT - 15:  # DOWN
-        red.y += VEL
-
-def handle_red_ai_movement(red, yellow, powerups):
-    """Controls the red spaceship with smarter AI to prioritize power-ups."""
-    target_y = yellow.centery
-    target_x = None  # Default: no horizontal target
-
-    # Find the closest power-up on the AI's side
-    closest_powerup = None
-    min_dist = float('inf')
-    for p_rect, p_type, p_time in powerups:
-        if p_rect.centerx > BORDER.centerx:
-            dist = ((red.centerx - p_rect.centerx)**2 + (red.centery - p_rect.centery)**2)**0.5
-            if dist < min_dist:
-                min_dist = dist
-                closest_powerup = p_rect
-    
-    # If a power-up is found, make it the primary target
-    if closest_powerup:
-        target_y = closest_powerup.centery
-        target_x = closest_powerup.centerx
-
-    # --- Execute Movement ---
-    # Vertical movement
-    if red.centery < target_y:
-        red.y += AI_VEL
-    elif red.centery > target_y:
-        red.y -= AI_VEL
-
-    # Horizontal movement
-    if target_x:  # If there's a horizontal target (a power-up)
-        if red.centerx < target_x:
-            red.x += AI_VEL
-        elif red.centerx > target_x:
-            red.x -= AI_VEL
-    else:  # If no power-up, do the slight random wiggle
-        if random.randint(0, 100) > 98:
-            move_dir = random.choice([-1, 1])
-            red.x += (AI_VEL * move_dir)
-
-    # Clamp position to stay within bounds
-    if red.x < BORDER.x + BORDER.width:
-        red.x = BORDER.x + BORDER.width
-    if red.x + red.width > WIDTH:
-        red.x = WIDTH - red.width
-    if red.y < 0:
-        red.y = 0
-    if red.y + red.height > HEIGHT:
-        red.y = HEIGHT - red.height
-
-
-def handle_bullets(yellow_bullets, red_bullets, yellow, red):
-    # Iterate over a copy of the list to allow safe removal
-    for bullet in yellow_bullets[:]:
-        bullet.x += BULLET_VEL
-        if red.colliderect(bullet):
-            pygame.event.post(pygame.event.Event(RED_HIT))
-            if bullet in yellow_bullets: yellow_bullets.remove(bullet)
-        elif bullet.x > WIDTH:
-            if bullet in yellow_bullets: yellow_bullets.remove(bullet)
-
-    # Iterate over a copy of the list to allow safe removal
-    for bullet in red_bullets[:]:
-        bullet.x -= BULLET_VEL
-        if yellow.colliderect(bullet):
-            pygame.event.post(pygame.event.Event(YELLOW_HIT))
-            if bullet in red_bullets: red_bullets.remove(bullet)
-        elif bullet.x < 0:
-            if bullet in red_bullets: red_bullets.remove(bullet)
-
-def handle_powerups(powerups, yellow, red, yellow_health, red_health, yellow_multishot_end_time, red_multishot_end_time):
-    """Checks for powerup collision and applies effects."""
-    current_time = pygame.time.get_ticks()
-    # Iterate over a copy of the list to allow safe removal
-    for powerup_rect, powerup_type, spawn_time in powerups[:]:
-        if yellow.colliderect(powerup_rect):
-            if powerup_type == "HEALTH":
-                yellow_health = min(10, yellow_health + 2)
-            elif powerup_type == "MULTI_SHOT":
-                yellow_multishot_end_time = current_time + MULTI_SHOT_DURATION
-            if POWERUP_SOUND: POWERUP_SOUND.play()
-            powerups.remove((powerup_rect, powerup_type, spawn_time))
-        elif red.colliderect(powerup_rect):
-            if powerup_type == "HEALTH":
-                red_health = min(10, red_health + 2)
-            elif powerup_type == "MULTI_SHOT":
-                red_multishot_end_time = current_time + MULTI_SHOT_DURATION
-            if POWERUP_SOUND: POWERUP_SOUND.play()
-            powerups.remove((powerup_rect, powerup_type, spawn_time))
-            
-    return yellow_health, red_health, yellow_multishot_end_time, red_multishot_end_time
+# --- INPUT HANDLING ---
+
+def wait_for_events(timeout):
+    """Sleeps until an event arrives or `timeout` milliseconds pass, then returns every pending event."""
+    event = pygame.event.wait(max(1, timeout)) # A timeout of 0 waits forever
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+def exposes_window(event):
+    """Whether `event` means the window's contents were lost or uncovered and static screens must be redrawn."""
+    return event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED)
+
+def read_player_input(keys_pressed, fire_pressed, up, down, left, right):
+    """Packs one player's held keys and fire press into a simulation input bitmask."""
+    bits = 0
+    if keys_pressed[up]: bits |= INPUT_UP
+    if keys_pressed[down]: bits |= INPUT_DOWN
+    if keys_pressed[left]: bits |= INPUT_LEFT
+    if keys_pressed[right]: bits |= INPUT_RIGHT
+    if fire_pressed: bits |= INPUT_FIRE
+    return bits
 
 
 # --- GAME STATE MANAGEMENT ---
 
-def start_new_game():
+def start_new_game(game_mode):
     """Initializes all variables for a new game session."""
-    game_vars = {
-        "red": pygame.Rect(700, 300, SPACESHIP_WIDTH, SPACESHIP_HEIGHT),
-        "yellow": pygame.Rect(100, 300, SPACESHIP_WIDTH, SPACESHIP_HEIGHT),
-        "red_bullets": [],
-        "yellow_bullets": [],
-        "red_health": 10,
-        "yellow_health": 10,
-        "last_yellow_shot": 0,
-        "last_red_shot": 0,
-        "powerups": [],
-        "last_powerup_spawn_time": pygame.time.get_ticks(),
-        "yellow_multishot_end_time": 0,
-        "red_multishot_end_time": 0
+    return new_state(game_mode, DIFFICULTY, seed=SEED, now=pygame.time.get_ticks())
+
+def start_recording(game_vars):
+    """Starts recording a replay of a new match, or returns None if recording is off or fails."""
+    if not RECORD_REPLAYS:
+        return None
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{game_vars['mode'].lower()}-{game_vars['seed']}{replay.REPLAY_EXTENSION}"
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        return replay.ReplayRecorder(os.path.join(REPLAY_DIR, name), game_vars)
+    except OSError as e:
+        print(f"Warning: Could not record a replay. Error: {e}")
+        return None
+
+def new_event_bus():
+    """Creates an event bus with the sound and HUD subscribers and a fresh event_bus.MatchStats. Returns (bus, stats)."""
+    bus = event_bus.EventBus()
+    for event_type in (event_bus.FIRE, event_bus.HIT, event_bus.PICKUP):
+        bus.subscribe(event_type, play_event_sound)
+    bus.subscribe(event_bus.HIT, flash_hud)
+    bus.subscribe(event_bus.HIT, queue_particles)
+    bus.subscribe(event_bus.PICKUP, queue_particles)
+    return bus, event_bus.MatchStats(bus)
+
+def play_event_sound(event):
+    """Sound subscriber. Triggers of a sound on the same tick merge into one voice."""
+    if SOUNDS: SOUNDS.play(EVENT_SOUNDS[event.type], event.tick)
+
+def flash_hud(event):
+    """HUD subscriber: flashes the health bar of the ship that was hit."""
+    HUD_FLASH_UNTIL[event.side] = pygame.time.get_ticks() + HUD_FLASH_MS
+
+def queue_particles(event):
+    """Particle subscriber: the effect is emitted by the next draw_window(), which knows where the ships are drawn."""
+    if PARTICLES: PARTICLE_BURSTS.append((event.type, event.side, event.value))
+
+def report_ai_planner(game_vars):
+    """Prints how much time the HARD+ AI spent planning per tick, if it was playing."""
+    if "ai_planner" in game_vars:
+        mean, p99, worst = game_vars["ai_planner"].report()
+        print(f"AI planner: {mean:.3f} ms per tick on average, p99 {p99:.3f} ms, worst {worst:.3f} ms")
+
+def get_draw_args(game_vars, previous=None, alpha=1.0):
+    """Creates a dictionary with only the arguments needed for drawing.
+
+    With `previous`, the (yellow, red) ship positions before the last tick, the
+    ships and bullets are drawn `alpha` of the way from the previous tick to the last one.
+    """
+    red, yellow = game_vars["red"], game_vars["yellow"]
+    if previous:
+        yellow = interpolate(previous[0], yellow, alpha)
+        red = interpolate(previous[1], red, alpha)
+    return {
+        "red": red,
+        "yellow": yellow,
+        "red_bullets": game_vars["red_bullets"],
+        "yellow_bullets": game_vars["yellow_bullets"],
+        "red_health": game_vars["red_health"],
+        "yellow_health": game_vars["yellow_health"],
+        "powerups": game_vars["powerups"],
+        "yellow_multishot_timer": multishot_seconds_left(game_vars, "yellow"),
+        "red_multishot_timer": multishot_seconds_left(game_vars, "red"),
+        "bullet_lag": 1.0 - alpha if previous else 0.0
     }
-    return game_vars
+
+def interpolate(old_position, rect, alpha):
+    """A copy of `rect` moved `alpha` of the way from `old_position` to where it is now."""
+    x, y = old_position
+    return pygame.Rect(round(x + (rect.x - x) * alpha), round(y + (rect.y - y) * alpha), rect.width, rect.height)
 
 # --- MAIN GAME LOOP ---
 
 def main():
     """Main function to run the game, including menus and restart logic."""
-    if pygame.mixer.get_init():
-        pygame.mixer.music.play(-1)
+    try:
+        init()
+    except RuntimeError as e:
+        print(f"Fatal Error: {e}")
+        pygame.quit()
+        return
 
     clock = pygame.time.Clock()
-    game_state = "MENU" # Can be "MENU", "PLAYING", "PAUSED"
+    game_state = "MENU" # Can be "MENU", "PLAYING", "PAUSED", "WINNER"
     game_mode = "AI" # Default game mode
     game_vars = {} # Dictionary to hold all game-specific variables
+    recorder = None # Replay of the current match
+    bus, stats = None, None # Gameplay events of the current match
+    telemetry_sink = telemetry.TelemetrySink(TELEMETRY_PATH) if RECORD_TELEMETRY else None
+    # Fixed-timestep clock: real milliseconds not yet simulated, and ship positions before the last tick
+    accumulator = 0.0
+    last_frame_time = time.perf_counter()
+    previous_positions = None
+    yellow_fire = red_fire = False # Fire presses waiting for the next tick
+    # What the static screen on display shows; when it differs from what should be shown, it is redrawn
+    drawn_screen = None
+    winner_text, winner_backdrop, winner_until = None, None, 0
+    first_frame = True
+    music_started = False
     run = True
     while run:
+        profiler = None # Set while a profiled PLAYING frame is in progress
+        if not music_started and FONTS_AND_SOUNDS_LOADED.is_set():
+            music_started = True
+            if pygame.mixer.get_init():
+                pygame.mixer.music.play(-1)
+
         if game_state == "MENU":
-            vs_ai_button, vs_player_button = draw_menu()
-            for event in pygame.event.get():
+            screen = ("MENU", FONTS_AND_SOUNDS_LOADED.is_set())
+            if drawn_screen != screen:
+                draw_menu()
+                drawn_screen = screen
+            for event in wait_for_events(IDLE_WAIT_MS if screen[1] else IDLE_POLL_MS):
                 if event.type == pygame.QUIT:
                     run = False
+                if exposes_window(event):
+                    drawn_screen = None
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     mode_selected = None
-                    if vs_ai_button.collidepoint(event.pos):
-                        mode_selected = "AI"
-                    elif vs_player_button.collidepoint(event.pos):
-                        mode_selected = "PVP"
-                    
+                    for mode, button in MENU_BUTTONS.items():
+                        if button.collidepoint(event.pos):
+                            mode_selected = mode
+
                     if mode_selected:
+                        FONTS_AND_SOUNDS_LOADED.wait() # The HUD needs the fonts
                         game_mode = mode_selected
-                        game_vars = start_new_game() # Initialize game variables
+                        game_vars = start_new_game(game_mode) # Initialize game variables
+                        recorder = start_recording(game_vars)
+                        bus, stats = new_event_bus()
+                        if telemetry_sink: telemetry_sink.start_match(game_vars, bus)
+                        reset_particles()
                         game_state = "PLAYING"
+                        RENDERER.invalidate() # The menu covered the whole window
+                        accumulator, last_frame_time = 0.0, time.perf_counter()
+                        previous_positions = None
+                        yellow_fire = red_fire = False
 
         elif game_state == "PAUSED":
-            draw_pause_screen()
-            for event in pygame.event.get():
+            if drawn_screen != "PAUSED":
+                draw_pause_screen()
+                drawn_screen = "PAUSED"
+            for event in wait_for_events(IDLE_WAIT_MS):
                 if event.type == pygame.QUIT:
                     run = False
+                if exposes_window(event):
+                    drawn_screen = None
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
                     game_state = "PLAYING" # Unpause
+                    RENDERER.invalidate() # Repaint over the pause text
+                    last_frame_time = time.perf_counter() # Paused time isn't simulated
+
+        elif game_state == "WINNER":
+            # Animated while the explosion lasts, then drawn once and left until the time is up
+            animating = drawn_screen != "WINNER" and draw_winner(winner_text, winner_backdrop)
+            drawn_screen = None if animating else "WINNER"
+            remaining = winner_until - pygame.time.get_ticks()
+            if animating or remaining <= 0: # The frame or the wait may have run past the end; don't sleep
+                events = pygame.event.get()
+            else:
+                events = wait_for_events(min(remaining, IDLE_WAIT_MS))
+            for event in events:
+                if event.type == pygame.QUIT:
+                    run = False
+                if exposes_window(event):
+                    drawn_screen = None
+                if (event.type == pygame.MOUSEBUTTONDOWN
+                        or event.type == pygame.KEYDOWN and event.key in (pygame.K_ESCAPE, pygame.K_RETURN, pygame.K_SPACE)):
+                    winner_until = 0 # Skip to the menu
+            if pygame.time.get_ticks() >= winner_until:
+                reset_particles()
+                game_state = "MENU" # Go back to menu after a win
 
         elif game_state == "PLAYING":
-            current_time = pygame.time.get_ticks()
-
+            drawn_screen = None # The match draws over whatever static screen was up
+            if PROFILER.enabled:
+                profiler = PROFILER
+                profiler.start_frame()
             # Event Handling
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
-                    
+
                 if event.type == pygame.KEYDOWN:
                     # Pause Game
                     if event.key == pygame.K_p:
@@ -380,152 +656,358 @@ def main():
                     # Return to Menu
                     if event.key == pygame.K_ESCAPE:
                         game_state = "MENU"
+                        if recorder: recorder.close(game_vars)
+                        if telemetry_sink: telemetry_sink.end_match(game_vars)
+                        report_ai_planner(game_vars)
                         continue
+                    # Toggle dirty-rect / full redraw rendering
+                    if event.key == pygame.K_F2:
+                        RENDERER.full_redraw = not RENDERER.full_redraw
+                        RENDERER.invalidate()
+                    # Toggle the frame profiler and its overlay
+                    if event.key == pygame.K_F3:
+                        PROFILER.enabled = not PROFILER.enabled
+                        PROFILER.clear()
+                        RENDERER.invalidate()
+                        profiler = None # Start timing with the next frame
+                    # Export the profiler's frames as a Chrome trace, CSV and summary
+                    if event.key == pygame.K_F4 and PROFILER.frames:
+                        print(f"Profile written to {PROFILER.export()}")
 
                     # Player 1 (Yellow) Firing
-                    can_fire_multi = current_time < game_vars["yellow_multishot_end_time"]
-                    bullets_to_fire = 3 if can_fire_multi else 1
-                    if event.key == pygame.K_LCTRL and len(game_vars["yellow_bullets"]) <= MAX_BULLETS - bullets_to_fire:
-                        if current_time - game_vars["last_yellow_shot"] > PLAYER_BULLET_COOLDOWN:
-                            game_vars["last_yellow_shot"] = current_time
-                            if can_fire_multi: # Multi-shot active
-                                game_vars["yellow_bullets"].append(pygame.Rect(game_vars["yellow"].x + game_vars["yellow"].width, game_vars["yellow"].y + game_vars["yellow"].height // 2 - 2 - 10, 10, 5))
-                                game_vars["yellow_bullets"].append(pygame.Rect(game_vars["yellow"].x + game_vars["yellow"].width, game_vars["yellow"].y + game_vars["yellow"].height // 2 - 2, 10, 5))
-                                game_vars["yellow_bullets"].append(pygame.Rect(game_vars["yellow"].x + game_vars["yellow"].width, game_vars["yellow"].y + game_vars["yellow"].height // 2 - 2 + 10, 10, 5))
-                            else: # Normal shot
-                                game_vars["yellow_bullets"].append(pygame.Rect(game_vars["yellow"].x + game_vars["yellow"].width, game_vars["yellow"].y + game_vars["yellow"].height // 2 - 2, 10, 5))
-                            if BULLET_FIRE_SOUND: BULLET_FIRE_SOUND.play()
-
-                    # Player 2 (Red) Firing - ONLY in PVP mode
-                    if game_mode == "PVP":
-                        can_fire_multi_red = current_time < game_vars["red_multishot_end_time"]
-                        bullets_to_fire_red = 3 if can_fire_multi_red else 1
-                        if event.key == pygame.K_RCTRL and len(game_vars["red_bullets"]) <= MAX_BULLETS - bullets_to_fire_red:
-                            if current_time - game_vars["last_red_shot"] > PLAYER_BULLET_COOLDOWN:
-                                game_vars["last_red_shot"] = current_time
-                                if can_fire_multi_red: # Multi-shot active
-                                    game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2 - 10, 10, 5))
-                                    game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2, 10, 5))
-                                    game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2 + 10, 10, 5))
-                                else: # Normal shot
-                                    game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2, 10, 5))
-                                if BULLET_FIRE_SOUND: BULLET_FIRE_SOUND.play()
-
-                # Health Handling from custom events
-                if event.type == RED_HIT:
-                    game_vars["red_health"] -= 1
-                    if BULLET_HIT_SOUND: BULLET_HIT_SOUND.play()
-                if event.type == YELLOW_HIT:
-                    game_vars["yellow_health"] -= 1
-                    if BULLET_HIT_SOUND: BULLET_HIT_SOUND.play()
-
-            # AI Shooting Logic - ONLY in AI mode
-            if game_mode == "AI":
-                can_fire_multi_ai = current_time < game_vars["red_multishot_end_time"]
-                bullets_to_fire_ai = 3 if can_fire_multi_ai else 1
-                if current_time - game_vars["last_red_shot"] > AI_SHOOT_COOLDOWN and len(game_vars["red_bullets"]) <= MAX_BULLETS - bullets_to_fire_ai:
-                    if abs((game_vars["red"].y + game_vars["red"].height//2) - (game_vars["yellow"].y + game_vars["yellow"].height//2)) < 50:
-                        game_vars["last_red_shot"] = current_time
-                        if can_fire_multi_ai: # Multi-shot active
-                           game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2 - 10, 10, 5))
-                           game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2, 10, 5))
-                           game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2 + 10, 10, 5))
-                        else: # Normal shot
-                           game_vars["red_bullets"].append(pygame.Rect(game_vars["red"].x, game_vars["red"].y + game_vars["red"].height // 2 - 2, 10, 5))
-                        if BULLET_FIRE_SOUND: BULLET_FIRE_SOUND.play()
+                    if event.key == pygame.K_LCTRL:
+                        yellow_fire = True
+                    # Player 2 (Red) Firing - ignored by the simulation in AI mode
+                    if event.key == pygame.K_RCTRL:
+                        red_fire = True
+
+            if profiler: profiler.mark("events")
+
+            # Run the simulation ticks that are due since the last frame
+            now = time.perf_counter()
+            accumulator += (now - last_frame_time) * 1000
+            last_frame_time = now
+            keys_pressed = pygame.key.get_pressed()
+            ticks_run = 0
+            while accumulator >= TICK_MS and game_state == "PLAYING" and not game_vars["winner"]:
+                if ticks_run == MAX_CATCH_UP_TICKS:
+                    accumulator = 0.0 # Too far behind: drop the backlog rather than fall further behind
+                    break
+                if game_mode == "BULLET_HELL":
+                    yellow_fire = yellow_fire or keys_pressed[pygame.K_LCTRL] # Hold to keep firing
+                inputs = (read_player_input(keys_pressed, yellow_fire, pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d),
+                          read_player_input(keys_pressed, red_fire, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT))
+                yellow_fire = red_fire = False # A press fires on one tick only
+                dt = tick_dt(game_vars["tick"])
+                if recorder: recorder.record(inputs, dt)
+                previous_positions = (game_vars["yellow"].topleft, game_vars["red"].topleft)
+                if profiler: profiler.mark("input")
+                step(game_vars, inputs, dt, profiler, bus)
+                bus.dispatch() # Sounds, HUD and stats
+                if profiler: profiler.mark("dispatch")
+                accumulator -= TICK_MS
+                ticks_run += 1
 
             # Check for Winner
-            if game_vars: # Ensure game has started
-                winner_text = ""
-                if game_vars["red_health"] <= 0:
+            if game_vars["winner"]:
+                if game_vars["winner"] == "YELLOW":
                     winner_text = "Yellow Wins!"
-                if game_vars["yellow_health"] <= 0:
+                else:
                     winner_text = "Red Wins!" if game_mode == "PVP" else "Computer Wins!"
+                if recorder: recorder.close(game_vars)
+                if telemetry_sink: telemetry_sink.end_match(game_vars)
+                report_ai_planner(game_vars)
+                print(f"Match stats: {stats.summary()}")
+                winner_backdrop = start_winner_screen(game_vars["red"] if game_vars["winner"] == "YELLOW" else game_vars["yellow"])
+                winner_until = pygame.time.get_ticks() + WINNER_SCREEN_MS
+                game_state = "WINNER"
+                drawn_screen = None
+                continue
+
+            # Draw all elements
+            draw_args = get_draw_args(game_vars, previous_positions, min(1.0, accumulator / TICK_MS))
+            if profiler: profiler.mark("draw_args")
+            draw_window(**draw_args)
 
-                if winner_text != "":
-                    draw_winner(winner_text)
-                    game_state = "MENU" # Go back to menu after a win
-                    continue
-
-            # Power-up Timeout Logic
-            if game_vars:
-                game_vars["powerups"] = [(r, t, s) for r, t, s in game_vars["powerups"] if current_time - s <= POWERUP_LIFESPAN]
-
-
-            # Power-up Spawning Logic
-            if game_vars and len(game_vars["powerups"]) < 2 and current_time - game_vars["last_powerup_spawn_time"] > random.randint(8000, 15000):
-                game_vars["last_powerup_spawn_time"] = current_time
-                
-                spawn_side = random.choice(["LEFT", "RIGHT"])
-                powerup_type = random.choices(["HEALTH", "MULTI_SHOT"], weights=[3, 1], k=1)[0]
-                
-                # Spawn attempt with collision avoidance
-                tries = 0
-                while True:
-                    if spawn_side == "LEFT":
-                        powerup_x = random.randint(50, BORDER.left - 50)
-                    else: # spawn_side == "RIGHT"
-                        powerup_x = random.randint(BORDER.right + 50, WIDTH - 50)
-                    
-                    powerup_y = random.randint(50, HEIGHT - 50)
-                    powerup_rect = pygame.Rect(powerup_x, powerup_y, 20, 20)
-                    
-                    # Avoid spawning on ships
-                    if not powerup_rect.colliderect(game_vars["yellow"]) and not powerup_rect.colliderect(game_vars["red"]):
-                        game_vars["powerups"].append((powerup_rect, powerup_type, current_time))
-                        break
-                    
-                    tries += 1
-                    if tries > 20:  # Fallback to prevent infinite loop
-                        break
-
-
-            # Handle Movement and Game Logic
-            if game_vars:
-                keys_pressed = pygame.key.get_pressed()
-                handle_yellow_movement(keys_pressed, game_vars["yellow"])
-                
-                if game_mode == "AI":
-                    handle_red_ai_movement(game_vars["red"], game_vars["yellow"], game_vars["powerups"])
-                else: # PVP mode
-                    handle_red_movement(keys_pressed, game_vars["red"])
-
-                handle_bullets(game_vars["yellow_bullets"], game_vars["red_bullets"], game_vars["yellow"], game_vars["red"])
-                (game_vars["yellow_health"], game_vars["red_health"], 
-                 game_vars["yellow_multishot_end_time"], game_vars["red_multishot_end_time"]) = handle_powerups(
-                    game_vars["powerups"], game_vars["yellow"], game_vars["red"], 
-                    game_vars["yellow_health"], game_vars["red_health"], 
-                    game_vars["yellow_multishot_end_time"], game_vars["red_multishot_end_time"])
-
-                # Calculate remaining time for UI
-                yellow_timer = 0
-                if current_time < game_vars["yellow_multishot_end_time"]:
-                    yellow_timer = math.ceil((game_vars["yellow_multishot_end_time"] - current_time) / 1000)
-                
-                red_timer = 0
-                if current_time < game_vars["red_multishot_end_time"]:
-                    red_timer = math.ceil((game_vars["red_multishot_end_time"] - current_time) / 1000)
-
-                # Create a dictionary with only the arguments needed for drawing
-                draw_args = {
-                    "red": game_vars["red"],
-                    "yellow": game_vars["yellow"],
-                    "red_bullets": game_vars["red_bullets"],
-                    "yellow_bullets": game_vars["yellow_bullets"],
-                    "red_health": game_vars["red_health"],
-                    "yellow_health": game_vars["yellow_health"],
-                    "powerups": game_vars["powerups"],
-                    "yellow_multishot_timer": yellow_timer,
-                    "red_multishot_timer": red_timer
-                }
-                # Draw all elements
-                draw_window(**draw_args)
-        
         # This part runs regardless of game state
+        if first_frame:
+            first_frame = False
+            print(f"Launch to first frame: {(time.perf_counter() - LAUNCH_TIME) * 1000:.0f} ms")
+        clock.tick(RENDER_FPS)
+        if profiler:
+            profiler.mark("wait")
+            profiler.end_frame()
+
+    if recorder: recorder.close(game_vars)
+    if telemetry_sink:
+        telemetry_sink.end_match(game_vars)
+        telemetry_sink.close()
+    if PROFILER.enabled and PROFILER.frames:
+        print(f"Profile written to {PROFILER.export()}")
+    pygame.quit()
+
+
+# --- ONLINE PVP ---
+
+def play_online(join=None, port=None, latency_ms=0, loss=0.0):
+    """Plays PVP over the network: hosts a server and plays yellow, or joins `join` and plays red."""
+    import asyncio
+    import netplay
+    try:
+        init()
+    except RuntimeError as e:
+        print(f"Fatal Error: {e}")
+        pygame.quit()
+        return
+    FONTS_AND_SOUNDS_LOADED.wait()
+    shim = {"latency": latency_ms / 2000, "loss": loss}
+    try:
+        asyncio.run(online_match(netplay, join, port or netplay.DEFAULT_PORT, shim))
+    except (OSError, TimeoutError) as e:
+        print(f"Network Error: {e}")
+    pygame.quit()
+
+async def online_match(netplay, join, port, shim):
+    """Runs the window and, when hosting, the server on one asyncio loop."""
+    import asyncio
+    server_task = None
+    if join is None:
+        server = await netplay.start_server(port, difficulty=DIFFICULTY, seed=SEED, **shim)
+        server_task = asyncio.create_task(server.run())
+        join = "127.0.0.1"
+        waiting_text = f"Waiting for an opponent on port {port}"
+    else:
+        draw_message(f"Connecting to {join}:{port}")
+        waiting_text = "Waiting for the match to start"
+    client = await netplay.connect(join, port, **shim)
+    client.bus, stats = new_event_bus()
+
+    loop = asyncio.get_running_loop()
+    next_frame = loop.time()
+    run = True
+    while run:
+        fire_pressed = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                run = False
+            if event.type == pygame.KEYDOWN and event.key in (pygame.K_LCTRL, pygame.K_RCTRL):
+                fire_pressed = True
+
+        if client.clock_start is None:
+            draw_message(waiting_text)
+            RENDERER.invalidate()
+        else:
+            # Either set of keys controls your own ship
+            keys_pressed = pygame.key.get_pressed()
+            bits = (read_player_input(keys_pressed, fire_pressed, pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d)
+                    | read_player_input(keys_pressed, fire_pressed, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT))
+            client.update(bits)
+            client.bus.dispatch()
+            draw_window(**get_draw_args(client.state))
+
+            if client.state["winner"] and client.confirmed_tick >= client.state["tick"]:
+                you_won = client.state["winner"] == netplay.SIDES[client.side].upper()
+                draw_message("You Win!" if you_won else "You Lose!", WINNER_FONT)
+                await asyncio.sleep(5) # Keeps the server running while the result is shown
+                run = False
+
+        next_frame += 1 / FPS
+        await asyncio.sleep(max(0.0, next_frame - loop.time()))
+
+    report = client.report()
+    print(f"Online match: RTT {report['rtt_ms']} ms, {report['download_bytes_per_s']} B/s down, "
+          f"{report['upload_bytes_per_s']} B/s up, {report['rollbacks']} rollbacks "
+          f"({report['mean_rollback_ms']} ms mean, {report['max_rollback_ms']} ms max)")
+    client.transport.close()
+    if server_task:
+        server_task.cancel()
+        server.transport.close()
+
+def draw_message(text, font=None):
+    """Draws a line of text centred over the background."""
+    WIN.blit(CURRENT_BACKGROUND, (0, 0))
+    message = render_text(font or INSTRUCTION_FONT, text, WHITE)
+    WIN.blit(message, (WIDTH / 2 - message.get_width() / 2, HEIGHT / 2 - message.get_height() / 2))
+    pygame.display.update()
+
+
+# --- REPLAY VIEWER ---
+
+REPLAY_SEEK_TICKS = FPS * 5
+REPLAY_SPEEDS = (0.25, 0.5, 1, 2, 4, 8)
+
+def play_replay(path):
+    """Plays a replay in the window. SPACE pauses, LEFT/RIGHT seek 5 seconds, UP/DOWN change speed, HOME restarts, ESC quits."""
+    try:
+        init()
+        player = replay.ReplayPlayer(replay.load(path))
+    except (RuntimeError, OSError, replay.ReplayError) as e:
+        print(f"Fatal Error: {e}")
+        pygame.quit()
+        return
+    FONTS_AND_SOUNDS_LOADED.wait()
+    bus, stats = new_event_bus() # Seeking replays ticks silently
+    # The status line is drawn over the game, so every frame is repainted in full
+    RENDERER.full_redraw = True
+
+    clock = pygame.time.Clock()
+    speed = REPLAY_SPEEDS.index(1)
+    paused = False
+    ticks_due = 0.0
+    run = True
+    while run:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                run = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    run = False
+                elif event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_RIGHT:
+                    player.seek(player.position + REPLAY_SEEK_TICKS)
+                elif event.key == pygame.K_LEFT:
+                    player.seek(player.position - REPLAY_SEEK_TICKS)
+                elif event.key == pygame.K_HOME:
+                    player.seek(0)
+                elif event.key == pygame.K_UP:
+                    speed = min(speed + 1, len(REPLAY_SPEEDS) - 1)
+                elif event.key == pygame.K_DOWN:
+                    speed = max(speed - 1, 0)
+
+        if not paused:
+            ticks_due += REPLAY_SPEEDS[speed]
+            while ticks_due >= 1:
+                ticks_due -= 1
+                player.advance(bus)
+                bus.dispatch()
+
+        draw_window(**get_draw_args(player.state))
+        seconds = player.position // FPS
+        status = (f"Replay {seconds // 60}:{seconds % 60:02d}  tick {player.position}/{len(player)}  "
+                  f"{REPLAY_SPEEDS[speed]}x{'  PAUSED' if paused else ''}{'  END' if player.finished() else ''}")
+        status_text = render_text(UI_FONT, status, WHITE)
+        status_rect = WIN.blit(status_text, (WIDTH / 2 - status_text.get_width() / 2, HEIGHT - status_text.get_height() - 5))
+        pygame.display.update(status_rect)
         clock.tick(FPS)
 
     pygame.quit()
 
 
+# --- BENCHMARKS ---
+
+def benchmark_rendering(frames=1800):
+    """Plays scripted AI matches and compares full redraws with dirty-rect rendering."""
+    init(headless=True, with_audio=False)
+    FONTS_AND_SOUNDS_LOADED.wait()
+    from simulation import random_yellow_input
+    for full_redraw in (True, False):
+        RENDERER.full_redraw = full_redraw
+        RENDERER.invalidate()
+        game_vars = new_state("AI", DIFFICULTY, seed=1)
+        pixels = 0
+        start = time.perf_counter()
+        for _ in range(frames):
+            step(game_vars, (random_yellow_input(game_vars), 0))
+            if game_vars["winner"]:
+                game_vars = new_state("AI", DIFFICULTY, seed=game_vars["seed"] + 1)
+            draw_window(**get_draw_args(game_vars))
+            pixels += RENDERER.pixels_pushed
+        elapsed = time.perf_counter() - start
+        mode = "full redraw" if full_redraw else "dirty rects"
+        print(f"{mode:>11}: {pixels / frames:9,.0f} pixels/frame ({pixels / frames / (WIDTH * HEIGHT):6.1%} of the screen), "
+              f"{elapsed / frames * 1000:.3f} ms/frame")
+    RENDERER.full_redraw = not DIRTY_RECT_RENDERING
+    stats = TEXT_CACHE.stats()
+    print(f"text cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%}), "
+          f"{stats['evictions']} evictions; HUD rebuilt {HUD_STATS['rebuilds']} times in {2 * frames} frames")
+
+
+def benchmark_bullet_hell(frames=1800):
+    """Plays scripted bullet-hell matches and reports simulation and drawing time against the number of live bullets."""
+    init(headless=True, with_audio=False)
+    FONTS_AND_SOUNDS_LOADED.wait()
+    from simulation import scripted_yellow_input
+    game_vars = new_state("BULLET_HELL", DIFFICULTY, seed=1)
+    samples = [] # (live bullets, step ms, draw ms)
+    for _ in range(frames):
+        start = time.perf_counter()
+        step(game_vars, (scripted_yellow_input(game_vars), 0))
+        stepped = time.perf_counter()
+        if game_vars["winner"]:
+            game_vars = new_state("BULLET_HELL", DIFFICULTY, seed=game_vars["seed"] + 1)
+        draw_window(**get_draw_args(game_vars))
+        samples.append((len(game_vars["red_bullets"]) + len(game_vars["yellow_bullets"]),
+                        (stepped - start) * 1000, (time.perf_counter() - stepped) * 1000))
+    for low, high in ((0, 1000), (1000, 3000), (3000, 5000), (5000, 10**9)):
+        bucket = [s for s in samples if low <= s[0] < high]
+        if bucket:
+            frame_ms = sorted(s[1] + s[2] for s in bucket)
+            print(f"{low:>5}+ bullets: {len(bucket):5} frames, step {sum(s[1] for s in bucket) / len(bucket):.3f} ms, "
+                  f"draw {sum(s[2] for s in bucket) / len(bucket):.3f} ms, worst frame {frame_ms[-1]:.3f} ms")
+    print(f"peak {max(s[0] for s in samples)} live bullets; frame budget at {FPS} FPS is {1000 / FPS:.1f} ms")
+
+
+STARTUP_PROBE = """
+import importlib.util, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+spec = importlib.util.spec_from_file_location("space_blaster", sys.argv[1])
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+imported = time.perf_counter()
+game.init(headless=True, with_audio=False)
+game.draw_menu()
+first_frame = time.perf_counter()
+game.FONTS_AND_SOUNDS_LOADED.wait()
+loaded = time.perf_counter()
+print(imported - start, first_frame - start, loaded - start)
+"""
+
+def benchmark_startup(runs=5):
+    """Measures import time, time to the first menu frame and time until fonts and sounds are ready, in fresh processes."""
+    import subprocess
+    import sys
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_PROBE, os.path.abspath(__file__)],
+                                capture_output=True, text=True, check=True).stdout
+        results.append([float(value) * 1000 for value in output.split()[-3:]])
+    for i, label in enumerate(("import", "first frame", "fonts and sounds loaded")):
+        times = sorted(r[i] for r in results)
+        print(f"{label:>23}: median {times[len(times) // 2]:7.1f} ms, best {times[0]:7.1f} ms")
+
+
 if __name__ == "__main__":
-    main()
+    import sys
+
+    def option(name, default=None):
+        """The value following `name` on the command line."""
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv[:-1] else default
+
+    if "--difficulty" in sys.argv:
+        DIFFICULTY = option("--difficulty")
+    if "--seed" in sys.argv:
+        SEED = int(option("--seed"))
+    if "--fps" in sys.argv:
+        RENDER_FPS = int(option("--fps")) # Redraw rate only; the game always ticks FPS times per second
+        PROFILER.budget_ms = 1000 / RENDER_FPS
+    if "--particles" in sys.argv:
+        PARTICLE_QUALITY = option("--particles", "").upper()
+    if "--profile" in sys.argv:
+        PROFILER.enabled = True # Same as pressing F3; the profile is written on exit
+    if "--host" in sys.argv or "--join" in sys.argv:
+        # --host [PORT] hosts and plays yellow, --join HOST[:PORT] plays red
+        host, _, port = option("--join").partition(":") if "--join" in sys.argv else (None, "", option("--host", ""))
+        play_online(host, int(port) if port.isdigit() else None,
+                    float(option("--net-latency", 0)), float(option("--net-loss", 0)))
+    elif "--replay" in sys.argv:
+        play_replay(option("--replay"))
+    elif "--bench-render" in sys.argv:
+        benchmark_rendering()
+    elif "--bench-startup" in sys.argv:
+        benchmark_startup()
+    elif "--bench-bullet-hell" in sys.argv:
+        benchmark_bullet_hell()
+    else:
+        main()
@@ -0,0 +1,212 @@
+import time
+from array import array
+
+from simulation import (WIDTH, HEIGHT, BORDER, BULLET_VEL, POWERUP_LIFESPAN, MAX_HEALTH, FPS)
+
+# HARD+ AI. Each tick the planner projects yellow's bullets forward into a
+# threat map of the red half, then scores candidate trajectories for the red
+# ship over a short horizon: dodging bullets, lining up a shot at where yellow
+# is heading and reaching power-ups. The search is anytime: candidates are
+# tried best-first (last tick's plan, then every straight line, then two-leg
+# turns off the best lines) until the budget runs out, and the best one found
+# so far is followed for one tick. The budget counts candidates rather than
+# wall time so a match plays out identically on every machine, which replays
+# rely on; the wall time spent is measured and reported by report().
+
+HORIZON = 24 # Ticks looked ahead
+SAMPLE = 3 # Ticks between the checks along a trajectory
+CANDIDATES = 28 # Trajectories scored per tick
+TURNS = (3, 6, 12) # Ticks before the second leg of a two-leg trajectory, multiples of SAMPLE
+ROW_HEIGHT = 10 # The threat map tracks rows of this many pixels as bits
+LEAD_TICKS = 20 # How far ahead yellow's movement is extrapolated when aiming
+
+# Scores
+HIT_PENALTY = 1000
+AIM_REWARD = 4
+AIM_WINDOW = 20 # Pixels between red's centre and the aim point that still count as lined up
+PICKUP_REWARD = 300
+DISTANCE_WEIGHT = 0.05 # Per pixel still to go to the target at the end of the horizon
+DISCOUNT = 0.93 # Per sample, so nearer outcomes count more
+
+WEIGHTS = [DISCOUNT ** s for s in range(HORIZON // SAMPLE + 1)]
+MOVES = [(dx, dy) for dy in (0, -1, 1) for dx in (0, -1, 1)] # Standing still first, so it wins ties
+COST_SAMPLES = 600 # Planning times kept for report()
+
+
+def row_mask(top, height):
+    """Bitmask of the ROW_HEIGHT rows that pixels top..top + height - 1 cover."""
+    return ((1 << ((top + height - 1) // ROW_HEIGHT + 1)) - 1) ^ ((1 << (top // ROW_HEIGHT)) - 1)
+
+
+class Planner:
+    """Plans the red ship's moves for the HARD+ difficulty. Lives in the match state as state["ai_planner"]."""
+
+    def __init__(self):
+        self.plan = [] # Moves for the coming ticks, as (dx, dy)
+        self.last_yellow_y = None
+        self.yellow_vy = 0
+        self.ticks = 0
+        self.cost_ms = array("d", bytes(8 * COST_SAMPLES)) # Ring buffer of planning times
+
+    # --- PREDICTION ---
+
+    def watch(self, yellow):
+        """Updates the estimate of yellow's vertical speed from its movement since the last tick."""
+        if self.last_yellow_y is not None:
+            self.yellow_vy = yellow.y - self.last_yellow_y
+        self.last_yellow_y = yellow.y
+
+    def aim_y(self, red, yellow, ahead=0):
+        """Where yellow's centre is expected to be when a bullet fired `ahead` ticks from now reaches it."""
+        travel = max(0, red.x - yellow.right) // BULLET_VEL
+        y = yellow.centery + self.yellow_vy * min(ahead + travel, LEAD_TICKS)
+        return min(max(y, yellow.height // 2), HEIGHT - yellow.height // 2)
+
+    def wants_to_fire(self, red, yellow):
+        """Fires when a bullet would meet yellow where it is heading, instead of whenever roughly level."""
+        return abs(red.y + red.height // 2 - self.aim_y(red, yellow)) < yellow.height // 2
+
+    def threat_map(self, yellow_bullets):
+        """Returns, per sample along the horizon, the regions of the red half a yellow bullet sweeps through
+        since the previous sample, as (left, right, bitmask of ROW_HEIGHT rows)."""
+        samples = [[] for _ in range(HORIZON // SAMPLE + 1)]
+        for bullet in yellow_bullets:
+            rows = row_mask(bullet.top, bullet.height)
+            for s, threat in enumerate(samples):
+                left = bullet.x + BULLET_VEL * s * SAMPLE
+                if left > WIDTH:
+                    break
+                if left + bullet.width > BORDER.right:
+                    # Include the distance travelled since the previous sample so a bullet can't skip over the ship
+                    threat.append((left - BULLET_VEL * SAMPLE, left + bullet.width, rows))
+        return samples
+
+    # --- SEARCH ---
+
+    def score(self, moves, red, ai_vel, threat, aims, powerups):
+        """Plays `moves` forward from red's position, a sample at a time, and returns how good the outcome looks."""
+        x, y = float(red.x), float(red.y)
+        width, height = red.width, red.height
+        min_x, max_x, max_y = BORDER.right, WIDTH - width, HEIGHT - height
+        step = ai_vel * SAMPLE
+        score = 0.0
+        taken = 0 # Bitmask of power-ups reached
+        for s in range(1, HORIZON // SAMPLE + 1):
+            dx, dy = moves[s * SAMPLE - 1]
+            x += dx * step
+            y += dy * step
+            if x < min_x: x = min_x
+            elif x > max_x: x = max_x
+            if y < 0: y = 0
+            elif y > max_y: y = max_y
+            weight = WEIGHTS[s]
+            top, left = int(y), int(x)
+            if threat[s]:
+                rows = row_mask(top, height)
+                for bullet_left, bullet_right, bullet_rows in threat[s]:
+                    if bullet_left < left + width and left < bullet_right and bullet_rows & rows:
+                        score -= HIT_PENALTY * weight
+                        break
+            if abs(top + height // 2 - aims[s]) < AIM_WINDOW:
+                score += AIM_REWARD * weight
+            for i, (rect, value, expires) in enumerate(powerups):
+                if (not taken >> i & 1 and s * SAMPLE <= expires and rect.left < left + width and left < rect.right
+                        and rect.top < top + height and top < rect.bottom):
+                    taken |= 1 << i
+                    score += value * weight
+        # Head for the most valuable power-up left, or else for the aiming row
+        target = None
+        for i, (rect, value, expires) in enumerate(powerups):
+            if not taken >> i & 1 and (target is None or value > target[1]):
+                target = (rect, value)
+        if target:
+            score -= DISTANCE_WEIGHT * (abs(x + width / 2 - target[0].centerx) + abs(y + height / 2 - target[0].centery))
+        else:
+            score -= DISTANCE_WEIGHT * abs(y + height / 2 - aims[-1])
+        return score
+
+    def search(self, state):
+        """Returns the best move list found within the candidate budget."""
+        red, yellow = state["red"], state["yellow"]
+        ai_vel = state["ai_vel"]
+        threat = self.threat_map(state["yellow_bullets"])
+        aims = [self.aim_y(red, yellow, s * SAMPLE) for s in range(HORIZON // SAMPLE + 1)]
+        # Power-ups on red's side: (rect, value, ticks until it expires)
+        powerups = []
+        for rect, powerup_type, spawn_time in state["powerups"]:
+            if rect.centerx > BORDER.centerx:
+                value = PICKUP_REWARD * (1 + (MAX_HEALTH - state["red_health"]) / MAX_HEALTH) if powerup_type == "HEALTH" else PICKUP_REWARD
+                powerups.append((rect, value, (spawn_time + POWERUP_LIFESPAN - state["time"]) * FPS // 1000))
+
+        budget = CANDIDATES
+        best_moves, best_score = None, None
+        def consider(moves):
+            nonlocal budget, best_moves, best_score
+            budget -= 1
+            score = self.score(moves, red, ai_vel, threat, aims, powerups)
+            if best_score is None or score > best_score:
+                best_moves, best_score = moves, score
+            return score
+
+        # Last tick's plan, one tick further along and held at its last move
+        if self.plan:
+            consider(self.plan[1:] + self.plan[-1:])
+        # Straight lines, then two-leg turns off the most promising ones
+        lines = sorted(MOVES, key=lambda move: -consider([move] * HORIZON))
+        for first in lines:
+            for turn in TURNS:
+                for second in MOVES:
+                    if budget <= 0:
+                        return best_moves
+                    if second != first:
+                        consider([first] * turn + [second] * (HORIZON - turn))
+        return best_moves
+
+    def move(self, state):
+        """Plans and makes red's move for this tick, clamped like handle_red_ai_movement()."""
+        start = time.perf_counter()
+        red = state["red"]
+        self.watch(state["yellow"])
+        self.plan = self.search(state)
+        dx, dy = self.plan[0]
+        red.x += dx * state["ai_vel"]
+        red.y += dy * state["ai_vel"]
+        if red.x < BORDER.x + BORDER.width:
+            red.x = BORDER.x + BORDER.width
+        if red.x + red.width > WIDTH:
+            red.x = WIDTH - red.width
+        if red.y < 0:
+            red.y = 0
+        if red.y + red.height > HEIGHT:
+            red.y = HEIGHT - red.height
+        self.cost_ms[self.ticks % COST_SAMPLES] = (time.perf_counter() - start) * 1000
+        self.ticks += 1
+
+    def report(self):
+        """Returns (mean ms, p99 ms, worst ms) of planning time over the last COST_SAMPLES ticks."""
+        costs = sorted(self.cost_ms[:min(self.ticks, COST_SAMPLES)])
+        if not costs:
+            return 0.0, 0.0, 0.0
+        return sum(costs) / len(costs), costs[min(len(costs) - 1, int(len(costs) * 0.99))], costs[-1]
+
+
+if __name__ == "__main__":
+    from simulation import run_match, scripted_yellow_input, mirror_ai_input, random_yellow_input
+
+    # HARD against HARD+ with each scripted opponent, and what the planning cost
+    SEEDS = 10
+    for policy in (scripted_yellow_input, mirror_ai_input, random_yellow_input):
+        for difficulty in ("HARD", "HARD+"):
+            red_wins = health_left = 0
+            worst = []
+            for seed in range(SEEDS):
+                state = run_match(seed, difficulty, policy, max_ticks=FPS * 60)
+                red_wins += state["winner"] == "RED"
+                health_left += state["red_health"]
+                if "ai_planner" in state:
+                    worst.append(state["ai_planner"].report())
+            cost = ""
+            if worst:
+                cost = (f", planning mean {sum(w[0] for w in worst) / len(worst):.3f} ms, "
+                        f"p99 {max(w[1] for w in worst):.3f} ms, worst {max(w[2] for w in worst):.3f} ms")
+            print(f"{policy.__name__:>21} vs {difficulty:<5}: red won {red_wins}/{SEEDS}, red health left {health_left / SEEDS:.1f}{cost}")
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+from simulation import WIDTH, HEIGHT, SPACESHIP_WIDTH, SPACESHIP_HEIGHT
+
+# Preprocessed asset pack. The build step decodes every image once, scales and
+# rotates it, and writes the raw 32-bit pixels into one file next to the
+# sources. At runtime the pack is memory-mapped and each surface is only
+# materialised (and converted to the display format) the first time it is
+# asked for, so the unused background is never decoded. The pack records a
+# hash of every source file and is rebuilt when any of them changes.
+
+ASSETS_DIR = "Assets"
+PACK_FILE = os.path.join(ASSETS_DIR, "assets.pack")
+PACK_MAGIC = b"SBPACK1\n"
+PIXEL_FORMAT = "BGRA" # Byte order of the usual 32-bit display format
+ALIGNMENT = 64
+
+# name -> (source file, size, rotation, has alpha)
+IMAGES = {
+    "yellow_ship": ("spaceship_yellow.png", (SPACESHIP_WIDTH, SPACESHIP_HEIGHT), 90, True),
+    "red_ship": ("spaceship_red.png", (SPACESHIP_WIDTH, SPACESHIP_HEIGHT), 270, True),
+    "background_space": ("space.png", (WIDTH, HEIGHT), 0, False),
+    "background_space2": ("space2.webp", (WIDTH, HEIGHT), 0, False),
+}
+BACKGROUND_PREFIX = "background_"
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_hashes(assets_dir=ASSETS_DIR):
+    """Hashes every source image that exists. Missing optional backgrounds are left out."""
+    hashes = {}
+    for name, (filename, size, rotation, alpha) in IMAGES.items():
+        path = os.path.join(assets_dir, filename)
+        if os.path.exists(path):
+            hashes[filename] = hash_file(path)
+    return hashes
+
+
+# --- BUILD STEP ---
+
+def build(assets_dir=ASSETS_DIR, pack_file=PACK_FILE):
+    """Decodes, scales and rotates every source image and writes them into one pack file."""
+    hashes = source_hashes(assets_dir)
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, (filename, size, rotation, alpha) in IMAGES.items():
+        if filename not in hashes:
+            if not name.startswith(BACKGROUND_PREFIX):
+                raise FileNotFoundError(os.path.join(assets_dir, filename))
+            print(f"Warning: skipping missing background {filename}")
+            continue
+        image = pygame.transform.scale(pygame.image.load(os.path.join(assets_dir, filename)), size)
+        if rotation:
+            image = pygame.transform.rotate(image, rotation)
+        pixels = pygame.image.tobytes(image, PIXEL_FORMAT)
+        entries[name] = {"offset": offset, "length": len(pixels), "size": image.get_size(), "alpha": alpha}
+        padding = -len(pixels) % ALIGNMENT
+        blobs.append(pixels + b"\0" * padding)
+        offset += len(pixels) + padding
+
+    header = json.dumps({"format": PIXEL_FORMAT, "sources": hashes, "entries": entries}).encode()
+    data_start = len(PACK_MAGIC) + 4 + len(header)
+    data_start += -data_start % ALIGNMENT
+    # Write to a temporary file first so a crash never leaves a half-written pack behind
+    tmp_file = pack_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(PACK_MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_file, pack_file)
+    return pack_file
+
+
+# --- RUNTIME LOADING ---
+
+class AssetPack:
+    """A memory-mapped asset pack whose surfaces are materialised on first use."""
+
+    def __init__(self, pack_file=PACK_FILE):
+        self.file = open(pack_file, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{pack_file} is not an asset pack")
+        header_length, = struct.unpack_from("<I", self.map, len(PACK_MAGIC))
+        header_start = len(PACK_MAGIC) + 4
+        self.header = json.loads(self.map[header_start:header_start + header_length])
+        self.data_start = header_start + header_length
+        self.data_start += -self.data_start % ALIGNMENT
+        self.surfaces = {}
+
+    def is_current(self, assets_dir=ASSETS_DIR):
+        """True if the pack was built from the source files as they are now."""
+        return self.header["sources"] == source_hashes(assets_dir)
+
+    def backgrounds(self):
+        """Names of the backgrounds in the pack."""
+        return [name for name in self.header["entries"] if name.startswith(BACKGROUND_PREFIX)]
+
+    def get(self, name):
+        """Returns the named surface, converting it to the display format once a window exists."""
+        surface = self.surfaces.get(name)
+        if surface is None:
+            entry = self.header["entries"][name]
+            start = self.data_start + entry["offset"]
+            # frombuffer wraps the mapped pixels without copying; convert/copy then detaches them
+            surface = pygame.image.frombuffer(memoryview(self.map)[start:start + entry["length"]],
+                                              tuple(entry["size"]), self.header["format"])
+            if pygame.display.get_surface():
+                surface = surface.convert_alpha() if entry["alpha"] else surface.convert()
+            else:
+                surface = surface.copy()
+            self.surfaces[name] = surface
+        return surface
+
+    def close(self):
+        self.surfaces.clear()
+        self.map.close()
+        self.file.close()
+
+
+def load(assets_dir=ASSETS_DIR, pack_file=PACK_FILE):
+    """Opens the asset pack, rebuilding it first if it is missing or any source file changed."""
+    if os.path.exists(pack_file):
+        try:
+            pack = AssetPack(pack_file)
+            if pack.is_current(assets_dir):
+                return pack
+            pack.close()
+        except (ValueError, OSError, KeyError, struct.error):
+            pass # Corrupt or unreadable pack, rebuild it
+    build(assets_dir, pack_file)
+    return AssetPack(pack_file)
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    path = build()
+    print(f"Built {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,175 @@
+import os
+import time
+
+import pygame
+
+from asset_pack import ASSETS_DIR, hash_file
+
+# Sound effects through a fixed pool of mixer channels. Every sound belongs to
+# a category, and each category owns its own channels (reserved, so nothing
+# else plays on them): rapid fire can't take the channels hits and pickups
+# need. When all of a category's channels are busy, the voice playing the
+# least important sound, oldest first, is stolen, unless everything playing
+# matters more than the new sound, which is then dropped. Triggers of a sound
+# on the same tick as (or within `retrigger_ms` of) its last start merge into
+# the voice already playing it, a little louder, instead of taking another
+# channel: a multi-shot volley or a bullet-hell stream is one voice, not ten.
+#
+# Decoded samples are cached on disk in the mixer's format, keyed by a hash of
+# the source file and the mixer settings, so later launches skip decoding.
+# Everything works under SDL's dummy audio driver, which plays silently.
+
+CACHE_DIR = os.path.join(ASSETS_DIR, "sound_cache")
+MERGE_BOOST = 0.15 # Volume added to a voice per trigger merged into it, up to full volume
+
+
+def load_sound(path, cache_dir=CACHE_DIR):
+    """Loads a sound as pygame.mixer.Sound, from decoded samples cached in `cache_dir` when they are up to date."""
+    frequency, sample_format, channels = pygame.mixer.get_init()
+    name = os.path.basename(path)
+    cache = os.path.join(cache_dir, f"{name}.{hash_file(path)[:16]}.{frequency}.{sample_format}.{channels}.pcm")
+    try:
+        with open(cache, "rb") as f:
+            return pygame.mixer.Sound(buffer=f.read())
+    except OSError:
+        pass
+
+    sound = pygame.mixer.Sound(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Drop caches of older versions of the file or other mixer settings
+        for old in os.listdir(cache_dir):
+            if old.startswith(name + ".") and old.endswith(".pcm"):
+                os.remove(os.path.join(cache_dir, old))
+        with open(cache + ".tmp", "wb") as f:
+            f.write(sound.get_raw())
+        os.replace(cache + ".tmp", cache)
+    except OSError as e:
+        print(f"Warning: Could not cache decoded sound {name}. Error: {e}")
+    return sound
+
+
+class Voice:
+    """A registered sound and the channel it last started on."""
+    __slots__ = ("sound", "category", "priority", "retrigger_ms", "volume", "channel", "started", "tick", "merged")
+
+    def __init__(self, sound, category, priority, retrigger_ms, volume):
+        self.sound = sound
+        self.category = category
+        self.priority = priority
+        self.retrigger_ms = retrigger_ms
+        self.volume = volume
+        self.channel = None
+        self.started = self.tick = None
+        self.merged = 0 # Triggers merged into the current playback
+
+
+class VoicePool:
+    """Plays registered sounds on per-category channel pools with voice stealing and retrigger merging."""
+
+    def __init__(self, categories):
+        """`categories` maps a category name to its number of channels."""
+        total = sum(categories.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        pygame.mixer.set_reserved(total) # Sound.play() without a channel can't take ours
+        self.channels = {} # category -> [Channel]
+        first = 0
+        for category, count in categories.items():
+            self.channels[category] = [pygame.mixer.Channel(i) for i in range(first, first + count)]
+            first += count
+        self.owner = {} # Channel -> the Voice playing on it
+        self.started = {} # Channel -> when its playback started, in ms
+        self.voices = {}
+        self.stats = {"played": 0, "merged": 0, "stolen": 0, "dropped": 0}
+
+    def add(self, name, sound, category, priority=0, retrigger_ms=0, volume=1.0):
+        """Registers `sound` as `name`. Higher priorities steal voices from lower ones."""
+        self.voices[name] = Voice(sound, category, priority, retrigger_ms, volume)
+
+    def play(self, name, tick=None):
+        """Triggers sound `name`; `tick` is the simulation tick it belongs to, if any.
+        Returns the channel it plays on, or None if it was dropped or isn't registered."""
+        voice = self.voices.get(name)
+        if voice is None:
+            return None
+        now = time.perf_counter() * 1000
+
+        # Merge into the playback that just started instead of starting another one
+        channel = voice.channel
+        if (channel and self.owner.get(channel) is voice and channel.get_busy()
+                and ((tick is not None and tick == voice.tick) or now - voice.started < voice.retrigger_ms)):
+            voice.merged += 1
+            channel.set_volume(min(1.0, voice.volume * (1 + MERGE_BOOST * voice.merged)))
+            self.stats["merged"] += 1
+            return channel
+
+        channel = self.free_channel(voice.category) or self.steal(voice.category, voice.priority)
+        if channel is None:
+            self.stats["dropped"] += 1
+            return None
+        channel.play(voice.sound)
+        channel.set_volume(voice.volume)
+        self.owner[channel] = voice
+        self.started[channel] = now
+        voice.channel, voice.started, voice.tick, voice.merged = channel, now, tick, 0
+        self.stats["played"] += 1
+        return channel
+
+    def free_channel(self, category):
+        for channel in self.channels[category]:
+            if not channel.get_busy():
+                return channel
+        return None
+
+    def steal(self, category, priority):
+        """The busy channel playing the least important sound, oldest first, if that isn't more important than `priority`."""
+        victim = min(self.channels[category], key=lambda channel: (self.owner[channel].priority, self.started[channel]))
+        if self.owner[victim].priority > priority:
+            return None
+        victim.stop()
+        self.stats["stolen"] += 1
+        return victim
+
+    def stop(self):
+        for channels in self.channels.values():
+            for channel in channels:
+                channel.stop()
+
+
+if __name__ == "__main__":
+    # Loads the game's sounds cold and from the cache, then fires a bullet-hell's worth of triggers through a pool
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.init()
+    files = ("Grenade+1.mp3", "Gun+Silencer.mp3", "Powerup.wav")
+    for label in ("decoded", "cached"):
+        if label == "decoded" and os.path.isdir(CACHE_DIR):
+            for old in os.listdir(CACHE_DIR):
+                os.remove(os.path.join(CACHE_DIR, old))
+        start = time.perf_counter()
+        sounds = [load_sound(os.path.join(ASSETS_DIR, f)) for f in files]
+        print(f"{label:>8}: {(time.perf_counter() - start) * 1000:.2f} ms for {len(files)} sounds")
+
+    pool = VoicePool({"weapons": 4, "impacts": 3, "pickups": 2})
+    pool.add("hit", sounds[0], "impacts", priority=2, retrigger_ms=30)
+    pool.add("fire", sounds[1], "weapons", priority=1, retrigger_ms=50)
+    pool.add("pickup", sounds[2], "pickups", priority=3)
+    start = time.perf_counter()
+    for tick in range(600):
+        for _ in range(3): # Both sides firing, one multi-shot volley
+            pool.play("fire", tick)
+        if tick % 7 == 0:
+            pool.play("hit", tick)
+        if tick % 150 == 0:
+            pool.play("pickup", tick)
+        time.sleep(1 / 240)
+    print(f"{pool.stats} in {(time.perf_counter() - start):.2f} s")
+
+    # One sound retriggered faster than it plays must steal each channel in turn, oldest first
+    pool.add("burst", sounds[1], "weapons", priority=1)
+    weapons = pool.channels["weapons"]
+    pool.stop()
+    for _ in weapons: # Fill every channel, in order
+        pool.play("burst")
+    stolen = [weapons.index(pool.play("burst")) for _ in range(2 * len(weapons))]
+    assert stolen == list(range(len(weapons))) * 2, stolen
+    print(f"steal order {stolen}")
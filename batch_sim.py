@@ -0,0 +1,467 @@
+import numpy as np
+
+from simulation import (WIDTH, HEIGHT, BORDER, FPS, VEL, BULLET_VEL, MAX_BULLETS, PLAYER_BULLET_COOLDOWN,
+                        MULTI_SHOT_DURATION, POWERUP_LIFESPAN, POWERUP_SPAWN_DELAY, MAX_POWERUPS, MAX_HEALTH, SPACESHIP_WIDTH, SPACESHIP_HEIGHT,
+                        AI_DIFFICULTY_PRESETS, PLANNED_DIFFICULTIES, NEVER,
+                        STREAM_SPAWN_DELAY, STREAM_SPAWN_SIDE, STREAM_SPAWN_TYPE, STREAM_WIGGLE_ROLL,
+                        STREAM_WIGGLE_DIR, STREAM_SCRIPTED_INPUT, STREAM_SPAWN_X, STREAM_SPAWN_Y,
+                        INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE)
+
+# Batched version of simulation.py: N matches advance in lockstep, with every
+# rule applied as a whole-array operation. Given the same seeds it produces
+# exactly the same matches as simulation.step().
+
+BULLET_WIDTH, BULLET_HEIGHT = 10, 5
+POWERUP_SIZE = 20
+SPAWN_TRIES = 21 # The scalar spawner gives up after 21 attempts
+
+# Powerup types
+HEALTH = 0
+MULTI_SHOT = 1
+
+# Winner codes
+NO_WINNER = 0
+YELLOW_WINS = 1
+RED_WINS = 2
+
+
+# --- RANDOM NUMBERS ---
+
+def rand_int(seed, tick, stream, lo, hi):
+    """Array version of simulation.rand_int."""
+    with np.errstate(over="ignore"):
+        x = (seed * np.uint64(0x9E3779B97F4A7C15) + tick.astype(np.uint64) * np.uint64(0xBF58476D1CE4E5B9)
+             + np.asarray(stream).astype(np.uint64) * np.uint64(0x94D049BB133111EB))
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return (x % np.uint64(hi - lo + 1)).astype(np.int32) + lo
+
+def round_like_rect(values):
+    """Rounds half away from zero, the way pygame.Rect stores float coordinates."""
+    return np.where(values >= 0, np.floor(values + 0.5), -np.floor(0.5 - values)).astype(np.int32)
+
+def rects_collide(ax, ay, aw, ah, bx, by, bw, bh):
+    """Array version of pygame.Rect.colliderect for non-empty rects."""
+    return (ax < bx + bw) & (bx < ax + aw) & (ay < by + bh) & (by < ay + ah)
+
+
+# --- GAME STATE MANAGEMENT ---
+# Every array has the match index as its last axis. Bullets and power-ups are
+# stored slot-major, shape (slots, N), so per-match reductions over the slots
+# are a handful of contiguous row operations.
+
+def new_batch(seeds, mode="AI", difficulty="EASY", ai_vel=None, ai_shoot_cooldown=None):
+    """Creates the state dictionary for len(seeds) matches.
+
+    `ai_vel` and `ai_shoot_cooldown` default to the difficulty preset and may
+    be scalars or per-match arrays, for parameter sweeps.
+    """
+    if mode == "AI" and difficulty in PLANNED_DIFFICULTIES:
+        raise ValueError(f"the batch engine can't run the {difficulty} planner AI")
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    n = len(seeds)
+    preset_vel, preset_cooldown = AI_DIFFICULTY_PRESETS[difficulty]
+    ai_vel = preset_vel if ai_vel is None else ai_vel
+    ai_shoot_cooldown = preset_cooldown if ai_shoot_cooldown is None else ai_shoot_cooldown
+
+    def full(value, dtype=np.int32):
+        return np.full(n, value, dtype=dtype)
+
+    batch = {
+        "mode": mode,
+        "n": n,
+        "seed": seeds,
+        "index": np.arange(n), # Position of each match in the original seed list
+        "time": full(0),
+        "tick": full(0),
+        "ai_vel": np.broadcast_to(np.asarray(ai_vel, dtype=np.float64), (n,)).copy(),
+        "ai_shoot_cooldown": np.broadcast_to(np.asarray(ai_shoot_cooldown, dtype=np.int32), (n,)).copy(),
+        "red_x": full(700),
+        "red_y": full(300),
+        "yellow_x": full(100),
+        "yellow_y": full(300),
+        "red_health": full(MAX_HEALTH),
+        "yellow_health": full(MAX_HEALTH),
+        "last_yellow_shot": full(NEVER),
+        "last_red_shot": full(NEVER),
+        "yellow_multishot_end_time": full(0),
+        "red_multishot_end_time": full(0),
+        "next_powerup_spawn_time": full(0),
+        "winner": full(NO_WINNER, np.int8),
+        # Match statistics
+        "yellow_shots": full(0),
+        "red_shots": full(0),
+        "yellow_hits": full(0), # Hits landed by yellow
+        "red_hits": full(0), # Hits landed by red
+        "yellow_pickups": full(0),
+        "red_pickups": full(0),
+    }
+    # Bullets: MAX_BULLETS slots per side per match
+    for side in ("yellow", "red"):
+        batch[side + "_bullets_x"] = np.zeros((MAX_BULLETS, n), dtype=np.int32)
+        batch[side + "_bullets_y"] = np.zeros((MAX_BULLETS, n), dtype=np.int32)
+        batch[side + "_bullets_alive"] = np.zeros((MAX_BULLETS, n), dtype=bool)
+        batch[side + "_bullet_count"] = full(0)
+    # Power-ups: the scalar spawner never allows more than two at a time
+    batch["powerups_x"] = np.zeros((MAX_POWERUPS, n), dtype=np.int32)
+    batch["powerups_y"] = np.zeros((MAX_POWERUPS, n), dtype=np.int32)
+    batch["powerups_type"] = np.zeros((MAX_POWERUPS, n), dtype=np.int8)
+    batch["powerups_spawn_time"] = np.zeros((MAX_POWERUPS, n), dtype=np.int32)
+    batch["powerups_alive"] = np.zeros((MAX_POWERUPS, n), dtype=bool)
+    schedule_powerup_spawns(batch, np.arange(n))
+    return batch
+
+def select(batch, rows):
+    """Returns a batch holding only the given matches."""
+    selected = {key: value[..., rows] if isinstance(value, np.ndarray) else value for key, value in batch.items()}
+    selected["n"] = len(selected["seed"])
+    return selected
+
+def store(batch, rows, part):
+    """Writes the matches of `part` back into `batch` at `rows`."""
+    for key, value in part.items():
+        if isinstance(value, np.ndarray):
+            batch[key][..., rows] = value
+
+
+# --- GAME LOGIC FUNCTIONS ---
+
+def move_yellow(bits, x, y, active):
+    left = active & (bits & INPUT_LEFT != 0) & (x - VEL > 0)
+    x[left] -= VEL
+    right = active & (bits & INPUT_RIGHT != 0) & (x + VEL + SPACESHIP_WIDTH < BORDER.x)
+    x[right] += VEL
+    up = active & (bits & INPUT_UP != 0) & (y - VEL > 0)
+    y[up] -= VEL
+    down = active & (bits & INPUT_DOWN != 0) & (y + VEL + SPACESHIP_HEIGHT < HEIGHT - 15)
+    y[down] += VEL
+
+def move_red(bits, x, y, active):
+    left = active & (bits & INPUT_LEFT != 0) & (x - VEL > BORDER.x + BORDER.width)
+    x[left] -= VEL
+    right = active & (bits & INPUT_RIGHT != 0) & (x + VEL + SPACESHIP_WIDTH < WIDTH)
+    x[right] += VEL
+    up = active & (bits & INPUT_UP != 0) & (y - VEL > 0)
+    y[up] -= VEL
+    down = active & (bits & INPUT_DOWN != 0) & (y + VEL + SPACESHIP_HEIGHT < HEIGHT - 15)
+    y[down] += VEL
+
+def closest_powerup(batch, cx, cy, side):
+    """Finds each match's closest live power-up on one side of the border. Returns (found, center_x, center_y)."""
+    b = batch
+    p_cx = b["powerups_x"] + POWERUP_SIZE // 2
+    p_cy = b["powerups_y"] + POWERUP_SIZE // 2
+    on_side = (p_cx > BORDER.centerx) if side == "RIGHT" else (p_cx < BORDER.centerx)
+    eligible = b["powerups_alive"] & on_side
+    dist = np.where(eligible, (cx - p_cx)**2 + (cy - p_cy)**2, np.iinfo(np.int32).max)
+    # Ties go to the older power-up, which comes first in the scalar power-up list
+    older_first = b["powerups_spawn_time"][0] <= b["powerups_spawn_time"][1]
+    pick_second = (dist[1] < dist[0]) | ((dist[1] == dist[0]) & ~older_first)
+    found = np.where(pick_second, eligible[1], eligible[0])
+    return found, np.where(pick_second, p_cx[1], p_cx[0]), np.where(pick_second, p_cy[1], p_cy[0])
+
+def handle_red_ai_movement(batch, active):
+    """Greedy AI from simulation.handle_red_ai_movement, for every active match at once."""
+    b = batch
+    red_cx = b["red_x"] + SPACESHIP_WIDTH // 2
+    red_cy = b["red_y"] + SPACESHIP_HEIGHT // 2
+
+    has_target, target_x, power_up_y = closest_powerup(b, red_cx, red_cy, "RIGHT")
+    target_y = np.where(has_target, power_up_y, b["yellow_y"] + SPACESHIP_HEIGHT // 2)
+    vel = b["ai_vel"]
+
+    # Vertical movement
+    dy = np.where(red_cy < target_y, vel, np.where(red_cy > target_y, -vel, 0.0))
+    # Horizontal movement towards a power-up
+    dx = np.where(has_target, np.where(red_cx < target_x, vel, np.where(red_cx > target_x, -vel, 0.0)), 0.0)
+    # Without a power-up, the slight random wiggle
+    rows = np.nonzero(active & ~has_target)[0]
+    seed, tick = b["seed"][rows], b["tick"][rows]
+    wiggle = rand_int(seed, tick, STREAM_WIGGLE_ROLL, 0, 100) > 98
+    rows, seed, tick = rows[wiggle], seed[wiggle], tick[wiggle]
+    dx[rows] = vel[rows] * np.where(rand_int(seed, tick, STREAM_WIGGLE_DIR, 0, 1) == 0, -1.0, 1.0)
+
+    new_y = round_like_rect(b["red_y"] + dy)
+    new_x = round_like_rect(b["red_x"] + dx)
+    # Clamp position to stay within bounds
+    new_x = np.clip(new_x, BORDER.x + BORDER.width, WIDTH - SPACESHIP_WIDTH)
+    new_y = np.clip(new_y, 0, HEIGHT - SPACESHIP_HEIGHT)
+    b["red_x"] = np.where(active, new_x, b["red_x"]).astype(np.int32)
+    b["red_y"] = np.where(active, new_y, b["red_y"]).astype(np.int32)
+
+def ai_wants_to_fire(batch):
+    return np.abs((batch["red_y"] + SPACESHIP_HEIGHT // 2) - (batch["yellow_y"] + SPACESHIP_HEIGHT // 2)) < 50
+
+def fire(batch, side, wants_to_fire, cooldown):
+    """Fires a normal or multi-shot volley for every match in `wants_to_fire` that is allowed to."""
+    b = batch
+    now = b["time"]
+    count = b[side + "_bullet_count"]
+    # simulation.py ends cooldowns with timers; per-match heaps have no array form, so here they are a comparison
+    can_fire = wants_to_fire & (now - b["last_" + side + "_shot"] > cooldown)
+    rows = np.nonzero(can_fire)[0]
+    multi = now[rows] < b[side + "_multishot_end_time"][rows]
+    bullets_to_fire = np.where(multi, 3, 1)
+    room = count[rows] <= MAX_BULLETS - bullets_to_fire
+    rows, multi, bullets_to_fire = rows[room], multi[room], bullets_to_fire[room]
+    if len(rows) == 0:
+        return
+    b["last_" + side + "_shot"][rows] = now[rows]
+    b[side + "_shots"][rows] += bullets_to_fire
+    count[rows] += bullets_to_fire
+
+    # Yellow fires from its right edge, red from its left edge
+    x = b[side + "_x"][rows] + (SPACESHIP_WIDTH if side == "yellow" else 0)
+    y = b[side + "_y"][rows] + SPACESHIP_HEIGHT // 2 - 2
+    # Fill the first free slots; the room check above guarantees there are enough
+    alive = b[side + "_bullets_alive"]
+    free_slots = np.argsort(alive[:, rows], axis=0, kind="stable")
+    for shot, y_offset in ((0, np.where(multi, -10, 0)), (1, 0), (2, 10)):
+        firing = shot < bullets_to_fire
+        slots = free_slots[shot, firing]
+        firing_rows = rows[firing]
+        b[side + "_bullets_x"][slots, firing_rows] = x[firing]
+        b[side + "_bullets_y"][slots, firing_rows] = (y + y_offset)[firing]
+        alive[slots, firing_rows] = True
+
+def cancel_bullets(batch, active):
+    """Culls every bullet that touches an opposing bullet."""
+    b = batch
+    # (yellow slot, red slot, match) overlap table; with MAX_BULLETS slots a side this is tiny
+    touching = (rects_collide(b["yellow_bullets_x"][:, None], b["yellow_bullets_y"][:, None], BULLET_WIDTH, BULLET_HEIGHT,
+                              b["red_bullets_x"][None], b["red_bullets_y"][None], BULLET_WIDTH, BULLET_HEIGHT)
+                & b["yellow_bullets_alive"][:, None] & b["red_bullets_alive"][None] & active)
+    for side, axis in (("yellow", 1), ("red", 0)):
+        cancelled = touching.any(axis=axis)
+        b[side + "_bullets_alive"] &= ~cancelled
+        b[side + "_bullet_count"] -= cancelled.sum(axis=0, dtype=np.int32)
+
+def handle_bullets(batch, active):
+    """Moves bullets, cancels bullets that touch each other, counts hits and culls bullets that hit or leave the screen."""
+    b = batch
+    for side, direction in (("yellow", 1), ("red", -1)):
+        b[side + "_bullets_x"] += (b[side + "_bullets_alive"] & active) * np.int32(BULLET_VEL * direction)
+    cancel_bullets(b, active)
+
+    for side, target, direction in (("yellow", "red", 1), ("red", "yellow", -1)):
+        alive = b[side + "_bullets_alive"]
+        moving = alive & active
+        bx = b[side + "_bullets_x"]
+        hit = moving & rects_collide(b[target + "_x"], b[target + "_y"], SPACESHIP_WIDTH, SPACESHIP_HEIGHT,
+                                     bx, b[side + "_bullets_y"], BULLET_WIDTH, BULLET_HEIGHT)
+        off_screen = moving & ((bx > WIDTH) if direction > 0 else (bx < 0))
+        hits = hit.sum(axis=0, dtype=np.int32)
+        b[target + "_health"] -= hits
+        b[side + "_hits"] += hits
+        b[side + "_bullet_count"] -= hits + off_screen.sum(axis=0, dtype=np.int32)
+        alive &= ~(hit | off_screen)
+
+def handle_powerups(batch, active):
+    """Applies power-ups touched by a ship; yellow wins a power-up both ships touch."""
+    b = batch
+    px, py = b["powerups_x"], b["powerups_y"]
+    alive = b["powerups_alive"] & active
+    if not alive.any():
+        return
+    now = b["time"]
+    for side in ("yellow", "red"):
+        touched = alive & rects_collide(b[side + "_x"], b[side + "_y"], SPACESHIP_WIDTH, SPACESHIP_HEIGHT,
+                                        px, py, POWERUP_SIZE, POWERUP_SIZE)
+        health_packs = (touched & (b["powerups_type"] == HEALTH)).sum(axis=0, dtype=np.int32)
+        multi_shot = (touched & (b["powerups_type"] == MULTI_SHOT)).any(axis=0)
+        # Each health pack is applied in turn with the cap, so the cap after the last one is the same
+        b[side + "_health"] = np.where(health_packs > 0, np.minimum(MAX_HEALTH, b[side + "_health"] + 2 * health_packs),
+                                       b[side + "_health"]).astype(np.int32)
+        b[side + "_multishot_end_time"] = np.where(multi_shot, now + MULTI_SHOT_DURATION,
+                                                   b[side + "_multishot_end_time"]).astype(np.int32)
+        b[side + "_pickups"] += touched.sum(axis=0, dtype=np.int32)
+        alive &= ~touched
+        b["powerups_alive"] &= ~touched
+
+def expire_powerups(batch, active):
+    b = batch
+    b["powerups_alive"] &= ~(active & (b["time"] - b["powerups_spawn_time"] > POWERUP_LIFESPAN))
+
+def schedule_powerup_spawns(batch, rows):
+    """Rolls the delay to the next power-up spawn of matches `rows`, like simulation.schedule_powerup_spawn()."""
+    b = batch
+    delay = rand_int(b["seed"][rows], b["tick"][rows], STREAM_SPAWN_DELAY, *POWERUP_SPAWN_DELAY)
+    b["next_powerup_spawn_time"][rows] = b["time"][rows] + delay + 1
+
+def spawn_powerups(batch, active):
+    """Spawns power-ups away from both ships, drawing the same random numbers as the scalar spawner."""
+    b = batch
+    now = b["time"]
+    # The spawn delay is at least 8000ms, so only hash the matches that could be due
+    count = b["powerups_alive"].sum(axis=0, dtype=np.int32)
+    rows = np.nonzero(active & (count < MAX_POWERUPS) & (now >= b["next_powerup_spawn_time"]))[0]
+    if len(rows) == 0:
+        return
+    seed, tick = b["seed"][rows], b["tick"][rows]
+    schedule_powerup_spawns(b, rows)
+
+    left = rand_int(seed, tick, STREAM_SPAWN_SIDE, 0, 1) == 0
+    powerup_type = np.where(rand_int(seed, tick, STREAM_SPAWN_TYPE, 0, 3) < 3, HEALTH, MULTI_SHOT)
+
+    # Try all attempts at once and keep the first one clear of both ships
+    attempts = np.arange(SPAWN_TRIES)[:, None]
+    x = np.where(left,
+                 rand_int(seed, tick, STREAM_SPAWN_X + 2 * attempts, 50, BORDER.left - 50),
+                 rand_int(seed, tick, STREAM_SPAWN_X + 2 * attempts, BORDER.right + 50, WIDTH - 50))
+    y = rand_int(seed, tick, STREAM_SPAWN_Y + 2 * attempts, 50, HEIGHT - 50)
+    clear = np.ones_like(x, dtype=bool)
+    for side in ("yellow", "red"):
+        clear &= ~rects_collide(x, y, POWERUP_SIZE, POWERUP_SIZE,
+                                b[side + "_x"][rows], b[side + "_y"][rows], SPACESHIP_WIDTH, SPACESHIP_HEIGHT)
+    found = clear.any(axis=0)
+    first = clear.argmax(axis=0)
+    columns = np.arange(len(rows))
+
+    rows, first, columns = rows[found], first[found], columns[found]
+    slot = b["powerups_alive"][:, rows].argmin(axis=0)
+    b["powerups_x"][slot, rows] = x[first, columns]
+    b["powerups_y"][slot, rows] = y[first, columns]
+    b["powerups_type"][slot, rows] = powerup_type[columns]
+    b["powerups_spawn_time"][slot, rows] = now[rows]
+    b["powerups_alive"][slot, rows] = True
+
+def check_winner(batch, active):
+    b = batch
+    winner = np.where(b["red_health"] <= 0, YELLOW_WINS, NO_WINNER)
+    winner = np.where(b["yellow_health"] <= 0, RED_WINS, winner)
+    b["winner"] = np.where(active, winner, b["winner"]).astype(np.int8)
+
+
+# --- SIMULATION STEP ---
+
+def step(batch, yellow_bits, red_bits=0, dt=1000 // FPS):
+    """Advances every unfinished match by one tick, exactly like simulation.step()."""
+    b = batch
+    active = b["winner"] == NO_WINNER
+    yellow_bits = np.broadcast_to(np.asarray(yellow_bits, dtype=np.int32), (b["n"],))
+    red_bits = np.broadcast_to(np.asarray(red_bits, dtype=np.int32), (b["n"],))
+    b["time"] += active * np.int32(dt)
+    b["tick"] += active
+
+    # Power-up Timeout and Spawning, first like simulation.run_timers()
+    expire_powerups(b, active)
+    spawn_powerups(b, active)
+
+    # Firing
+    fire(b, "yellow", active & (yellow_bits & INPUT_FIRE != 0), PLAYER_BULLET_COOLDOWN)
+    if b["mode"] == "AI":
+        fire(b, "red", active & ai_wants_to_fire(b), b["ai_shoot_cooldown"])
+    else:
+        fire(b, "red", active & (red_bits & INPUT_FIRE != 0), PLAYER_BULLET_COOLDOWN)
+
+    # Check for Winner; matches that just finished skip the rest of the tick
+    check_winner(b, active)
+    active &= b["winner"] == NO_WINNER
+
+    # Movement
+    move_yellow(yellow_bits, b["yellow_x"], b["yellow_y"], active)
+    if b["mode"] == "AI":
+        handle_red_ai_movement(b, active)
+    else:
+        move_red(red_bits, b["red_x"], b["red_y"], active)
+
+    # Bullets and Power-ups
+    handle_bullets(b, active)
+    handle_powerups(b, active)
+
+
+# --- HEADLESS RUNNER ---
+
+def scripted_yellow_input(batch):
+    """Array version of simulation.scripted_yellow_input."""
+    yellow_cy = batch["yellow_y"] + SPACESHIP_HEIGHT // 2
+    red_cy = batch["red_y"] + SPACESHIP_HEIGHT // 2
+    return INPUT_FIRE | np.where(yellow_cy < red_cy - VEL, INPUT_DOWN, np.where(yellow_cy > red_cy + VEL, INPUT_UP, 0))
+
+def random_yellow_input(batch):
+    """Array version of simulation.random_yellow_input."""
+    return rand_int(batch["seed"], batch["tick"] + 1, STREAM_SCRIPTED_INPUT, 0, 31)
+
+def mirror_ai_input(batch):
+    """Array version of simulation.mirror_ai_input."""
+    yellow_cx = batch["yellow_x"] + SPACESHIP_WIDTH // 2
+    yellow_cy = batch["yellow_y"] + SPACESHIP_HEIGHT // 2
+    has_target, target_x, power_up_y = closest_powerup(batch, yellow_cx, yellow_cy, "LEFT")
+    target_y = np.where(has_target, power_up_y, batch["red_y"] + SPACESHIP_HEIGHT // 2)
+    bits = np.where(yellow_cy < target_y, INPUT_DOWN, np.where(yellow_cy > target_y, INPUT_UP, 0))
+    bits |= np.where(has_target & (yellow_cx < target_x), INPUT_RIGHT, 0)
+    bits |= np.where(has_target & (yellow_cx > target_x), INPUT_LEFT, 0)
+    bits |= np.where(ai_wants_to_fire(batch), INPUT_FIRE, 0)
+    return bits
+
+def run_batch(seeds, difficulty="EASY", yellow_policy=scripted_yellow_input, max_ticks=FPS * 60 * 10, dt=1000 // FPS, **ai_params):
+    """Plays len(seeds) AI matches in lockstep and returns the final batch state.
+
+    Finished matches are periodically compacted out of the working set, so
+    long matches don't keep paying for short ones.
+    """
+    results = new_batch(seeds, "AI", difficulty, **ai_params)
+    batch = results
+    for tick in range(max_ticks):
+        running = batch["winner"] == NO_WINNER
+        if not running.any():
+            break
+        if tick % 32 == 0 and running.mean() < 0.75:
+            if batch is not results:
+                store(results, batch["index"], batch)
+            batch = select(batch, np.nonzero(running)[0])
+        step(batch, yellow_policy(batch), 0, dt)
+    if batch is not results:
+        store(results, batch["index"], batch)
+    return results
+
+
+# --- VERIFICATION AND BENCHMARK ---
+
+def verify(count=200, max_ticks=FPS * 60 * 3):
+    """Checks that the batch engine reproduces simulation.run_match() exactly. Returns the mismatching seeds."""
+    import simulation
+    winners = {None: NO_WINNER, "YELLOW": YELLOW_WINS, "RED": RED_WINS}
+    mismatches = []
+    for difficulty in AI_DIFFICULTY_PRESETS:
+        if difficulty in PLANNED_DIFFICULTIES:
+            continue
+        for policy_name in ("scripted_yellow_input", "random_yellow_input", "mirror_ai_input"):
+            seeds = np.arange(count)
+            batch = run_batch(seeds, difficulty, globals()[policy_name], max_ticks)
+            for i, seed in enumerate(seeds):
+                state = simulation.run_match(int(seed), difficulty, getattr(simulation, policy_name), max_ticks)
+                expected = (winners[state["winner"]], state["tick"], state["yellow_health"], state["red_health"],
+                            state["yellow"].x, state["yellow"].y, state["red"].x, state["red"].y)
+                actual = (batch["winner"][i], batch["tick"][i], batch["yellow_health"][i], batch["red_health"][i],
+                          batch["yellow_x"][i], batch["yellow_y"][i], batch["red_x"][i], batch["red_y"][i])
+                if tuple(int(v) for v in actual) != expected:
+                    mismatches.append((difficulty, policy_name, int(seed)))
+    return mismatches
+
+def benchmark(sizes=(1, 10, 100, 1000, 10000, 100000)):
+    """Prints matches per second as the batch size grows, next to the scalar engine."""
+    import time
+    import simulation
+    start = time.perf_counter()
+    for seed in range(200):
+        simulation.run_match(seed, "HARD", simulation.random_yellow_input)
+    print(f"scalar:    {200 / (time.perf_counter() - start):12,.0f} matches/s")
+    for n in sizes:
+        start = time.perf_counter()
+        batch = run_batch(np.arange(n), "HARD", random_yellow_input)
+        elapsed = time.perf_counter() - start
+        ticks = int(batch["tick"].max())
+        print(f"N={n:>7}: {elapsed:7.2f}s, {ticks} lockstep ticks, {n / elapsed:12,.0f} matches/s")
+
+
+if __name__ == "__main__":
+    import sys
+    if "--verify" in sys.argv:
+        mismatches = verify()
+        print("Batch engine matches the scalar rules" if not mismatches else f"Mismatches: {mismatches[:20]}")
+        sys.exit(1 if mismatches else 0)
+    benchmark()
@@ -0,0 +1,243 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+
+import pygame
+
+import simulation
+from simulation import (MAX_BULLETS, MAX_HEALTH, INPUT_UP, INPUT_DOWN, INPUT_FIRE, BORDER, HEIGHT,
+                        new_state, step, scripted_yellow_input)
+
+# Headless benchmark suite. Each scenario scripts a repeatable scene (fixed
+# seeds, health topped up so nobody wins, entity counts held steady) and runs
+# it under SDL's dummy video and audio drivers. While a scenario runs, the
+# simulation functions and draw_window are wrapped with timers, so every call
+# is measured where it is really made. Results are compared against a
+# baselines file, and the exit status is 1 when a metric's median got slower
+# by more than the threshold.
+
+GAME_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Space Blaster – 2D AI-Enhanced Spaceship Shooter.py")
+BASELINE_PATH = "bench_baseline.json"
+THRESHOLD = 0.25 # A median more than 25% above its baseline is a regression
+MIN_REGRESSION_MS = 0.005 # ...and so is only a slowdown of at least this much, to ignore timer noise
+WARMUP_FRAMES = 60
+STRESS_SCALE = 20 # Entity count multiplier for the stress scenes
+
+# Functions timed per call, by module: simulation's are looked up by step() at call time
+TIMED_SIMULATION = ("handle_bullets", "handle_bullet_pools", "handle_powerups", "handle_red_ai_movement")
+TIMED_GAME = ("draw_window",)
+
+
+def load_game():
+    """Imports the game script as a module and starts it headlessly."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    spec = importlib.util.spec_from_file_location("space_blaster", GAME_SCRIPT)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    game.init(headless=True) # Sounds play silently through the dummy audio driver
+    game.FONTS_AND_SOUNDS_LOADED.wait()
+    return game
+
+
+def timer(function, samples):
+    """Wraps `function` so each call appends its duration in milliseconds to `samples`."""
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        return result
+    return timed
+
+
+def keep_alive(game_vars):
+    """Tops up both ships' health so a scenario never ends in a win."""
+    game_vars["yellow_health"] = game_vars["red_health"] = MAX_HEALTH
+
+
+# --- SCENARIOS ---
+# Each takes the game module and returns a function that plays one frame.
+
+def idle_menu(game):
+    """The main menu, redrawn every frame."""
+    return game.draw_menu
+
+def ai_match(game):
+    """A normal HARD match against the scripted yellow player, restarted whenever someone wins."""
+    game_vars = new_state("AI", "HARD", seed=1)
+    def frame():
+        nonlocal game_vars
+        step(game_vars, (scripted_yellow_input(game_vars), 0))
+        if game_vars["winner"]:
+            game_vars = new_state("AI", "HARD", seed=game_vars["seed"] + 1)
+        game.draw_window(**game.get_draw_args(game_vars))
+    return frame
+
+def multishot_spam(game):
+    """PVP with multi-shot always on and no fire cooldown, so both sides keep MAX_BULLETS bullets in flight."""
+    game_vars = new_state("PVP", "HARD", seed=2)
+    def frame():
+        for side in ("yellow", "red"):
+            game_vars[side + "_multishot_end_time"] = game_vars["time"] + 1000
+            game_vars[side + "_cooldown_end"] = 0
+        red_bits = INPUT_FIRE | (INPUT_UP if game_vars["tick"] // 60 % 2 else INPUT_DOWN)
+        step(game_vars, (scripted_yellow_input(game_vars), red_bits))
+        keep_alive(game_vars)
+        game.draw_window(**game.get_draw_args(game_vars))
+    return frame
+
+def two_powerups(game):
+    """An AI match with a live power-up on each side at all times."""
+    game_vars = new_state("AI", "HARD", seed=3)
+    spots = {"HEALTH": (200, 100), "MULTI_SHOT": (650, 400)}
+    def frame():
+        live = {powerup_type for _, powerup_type, _ in game_vars["powerups"]}
+        for powerup_type, (x, y) in spots.items():
+            if powerup_type not in live:
+                game_vars["powerups"].append((pygame.Rect(x, y, 20, 20), powerup_type, game_vars["time"]))
+        # Never expire; the spawner sees two power-ups and stays idle
+        game_vars["powerups"] = [(rect, powerup_type, game_vars["time"]) for rect, powerup_type, _ in game_vars["powerups"]]
+        step(game_vars, (scripted_yellow_input(game_vars), 0))
+        keep_alive(game_vars)
+        game.draw_window(**game.get_draw_args(game_vars))
+    return frame
+
+def stress_classic(game):
+    """An AI match with STRESS_SCALE times the bullet cap per side and 2 * STRESS_SCALE power-ups."""
+    game_vars = new_state("AI", "HARD", seed=4)
+    bullets = MAX_BULLETS * STRESS_SCALE
+    row = 0
+    def frame():
+        nonlocal row
+        # New bullets enter at a cycling height from each side's ship edge
+        for side, x in (("yellow", game_vars["yellow"].right), ("red", game_vars["red"].left)):
+            while len(game_vars[side + "_bullets"]) < bullets:
+                row = (row + 37) % HEIGHT
+                game_vars[side + "_bullets"].append(pygame.Rect(x, row, 10, 5))
+        game_vars["powerups"] = [(rect, powerup_type, game_vars["time"]) for rect, powerup_type, _ in game_vars["powerups"]]
+        while len(game_vars["powerups"]) < 2 * STRESS_SCALE:
+            i = len(game_vars["powerups"])
+            x = 50 + i * 97 % (BORDER.left - 100) if i % 2 else BORDER.right + 50 + i * 97 % (BORDER.left - 100)
+            game_vars["powerups"].append((pygame.Rect(x, 50 + i * 53 % (HEIGHT - 100), 20, 20), "HEALTH", game_vars["time"]))
+        step(game_vars, (scripted_yellow_input(game_vars), 0))
+        keep_alive(game_vars)
+        game.draw_window(**game.get_draw_args(game_vars))
+    return frame
+
+def stress_bullet_hell(game):
+    """A bullet-hell match with yellow holding fire, building up to thousands of live bullets."""
+    game_vars = new_state("BULLET_HELL", "HARD", seed=5)
+    def frame():
+        step(game_vars, (scripted_yellow_input(game_vars), 0))
+        keep_alive(game_vars)
+        game.draw_window(**game.get_draw_args(game_vars))
+    return frame
+
+SCENARIOS = {
+    "idle_menu": idle_menu,
+    "ai_match": ai_match,
+    "multishot_spam": multishot_spam,
+    "two_powerups": two_powerups,
+    "stress_classic": stress_classic,
+    "stress_bullet_hell": stress_bullet_hell,
+}
+
+
+# --- RUNNING AND COMPARING ---
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "calls": len(samples),
+        "median_ms": round(samples[len(samples) // 2], 5),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 5),
+        "mean_ms": round(sum(samples) / len(samples), 5),
+    }
+
+def run_scenario(game, name, frames):
+    """Plays `frames` timed frames of a scenario after a warm-up. Returns {metric: summary}."""
+    frame = SCENARIOS[name](game)
+    game.RENDERER.invalidate()
+    for _ in range(WARMUP_FRAMES):
+        frame()
+
+    samples = {metric: [] for metric in TIMED_SIMULATION + TIMED_GAME + ("frame",)}
+    originals = {(simulation, function): getattr(simulation, function) for function in TIMED_SIMULATION}
+    originals.update({(game, function): getattr(game, function) for function in TIMED_GAME})
+    for (module, function), original in originals.items():
+        setattr(module, function, timer(original, samples[function]))
+    gc.collect()
+    try:
+        for _ in range(frames):
+            start = time.perf_counter()
+            frame()
+            samples["frame"].append((time.perf_counter() - start) * 1000)
+    finally:
+        for (module, function), original in originals.items():
+            setattr(module, function, original)
+    return {metric: summarize(values) for metric, values in samples.items() if values}
+
+def compare(results, baseline, threshold):
+    """Returns a list of (scenario, metric, baseline ms, current ms) for medians that regressed past `threshold`."""
+    regressions = []
+    for scenario, metrics in results.items():
+        for metric, summary in metrics.items():
+            before = baseline.get(scenario, {}).get(metric)
+            if before is None:
+                continue
+            now = summary["median_ms"]
+            if now > before["median_ms"] * (1 + threshold) and now - before["median_ms"] >= MIN_REGRESSION_MS:
+                regressions.append((scenario, metric, before["median_ms"], now))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the headless benchmark scenarios and compare them with saved baselines.")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--frames", type=int, default=600, help="timed frames per scenario")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baselines file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="save these results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown of a median, as a fraction")
+    args = parser.parse_args()
+    for scenario in args.scenarios:
+        if scenario not in SCENARIOS:
+            parser.error(f"unknown scenario {scenario!r}")
+
+    game = load_game()
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for scenario in args.scenarios or SCENARIOS:
+        results[scenario] = run_scenario(game, scenario, args.frames)
+        print(scenario)
+        for metric, summary in results[scenario].items():
+            before = baseline.get(scenario, {}).get(metric)
+            change = f"{summary['median_ms'] / before['median_ms'] - 1:+7.1%}" if before and before["median_ms"] else ""
+            print(f"  {metric:>22}: median {summary['median_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms  "
+                  f"{summary['calls']:6} calls  {change}")
+
+    if args.save:
+        # Keep the baselines of scenarios that weren't run this time
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.node(), "python": platform.python_version(), "frames": args.frames,
+                       "results": baseline}, f, indent=2)
+        print(f"Baselines saved to {args.baseline}")
+        sys.exit(0)
+
+    regressions = compare(results, baseline, args.threshold)
+    for scenario, metric, before, now in regressions:
+        print(f"REGRESSION {scenario}/{metric}: median {before:.3f} ms -> {now:.3f} ms (+{now / before - 1:.0%})")
+    if not baseline:
+        print(f"No baselines in {args.baseline}; run with --save to create them")
+    elif not regressions:
+        print(f"No regressions beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
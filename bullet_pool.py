@@ -0,0 +1,138 @@
+from itertools import repeat
+
+import numpy as np
+
+# Struct-of-arrays bullet storage for the bullet-hell mode. Bullets live in
+# preallocated NumPy arrays, the first `count` entries being the live ones:
+# firing writes into the free tail, removals (hits, cancels, culling) swap live
+# bullets from the end of the prefix into the holes, and movement, wall
+# bounces, hits and culling are whole-array operations over the live prefix.
+
+BULLET_WIDTH, BULLET_HEIGHT = 10, 5
+
+
+class BulletPool:
+    """Preallocated bullets with O(1) removal and vectorised updates."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.count = 0
+        self.version = 0 # Bumped whenever the bullets change, for the renderer
+
+    def __len__(self):
+        return self.count
+
+    def spawn(self, x, y, vx, vy):
+        """Adds bullets at (x, y) with velocities from the `vx`/`vy` arrays. Returns how many fit."""
+        n = min(len(vx), self.capacity - self.count)
+        start, end = self.count, self.count + n
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = vx[:n]
+        self.vy[start:end] = vy[:n]
+        self.count = end
+        self.version += 1
+        return n
+
+    def remove(self, indices):
+        """Removes the bullets at `indices` (one index or an array of distinct ones) by moving the live bullets at
+        the end into their slots. Takes time in proportion to the bullets removed, not the bullets live."""
+        indices = np.atleast_1d(indices)
+        removed = len(indices)
+        if removed == 0:
+            return
+        count = self.count - removed
+        # Holes left below the new count are filled by the bullets past it that stay
+        below = indices < count
+        holes = indices[below]
+        leaving = np.zeros(removed, dtype=bool)
+        leaving[indices[~below] - count] = True
+        staying = np.flatnonzero(~leaving) + count
+        for array in (self.x, self.y, self.vx, self.vy):
+            array[holes] = array[staying]
+        self.count = count
+        self.version += 1
+
+    def update(self, target, width, height):
+        """Moves bullets, bounces them off the top and bottom edges and removes the ones that hit
+        `target` (a pygame.Rect) or leave the screen sideways. Returns the number of hits."""
+        n = self.count
+        if n == 0:
+            return 0
+        x, y, vy = self.x[:n], self.y[:n], self.vy[:n]
+        x += self.vx[:n]
+        y += vy
+        bounced = (y < 0) | (y + BULLET_HEIGHT > height)
+        vy[bounced] *= -1
+        np.clip(y, 0, height - BULLET_HEIGHT, out=y)
+
+        hit = ((x < target.right) & (target.x < x + BULLET_WIDTH)
+               & (y < target.bottom) & (target.y < y + BULLET_HEIGHT))
+        gone = hit | (x > width) | (x + BULLET_WIDTH < 0)
+        hits = int(np.count_nonzero(hit))
+        self.remove(np.flatnonzero(gone))
+        self.version += 1
+        return hits
+
+    def draw(self, surface, sprite, lag=0.0):
+        """Blits `sprite` at every live bullet in one batched call, `lag` ticks of movement behind their positions."""
+        n = self.count
+        if n:
+            x, y = self.x[:n], self.y[:n]
+            if lag:
+                x = x - self.vx[:n] * lag
+                y = y - self.vy[:n] * lag
+            positions = zip(x.astype(np.int32).tolist(), y.astype(np.int32).tolist())
+            surface.blits(zip(repeat(sprite), positions), doreturn=False)
+
+
+def cancel_overlapping(a, b, grid):
+    """Removes every bullet in pool `a` that touches a bullet in pool `b`, and those bullets from `b`.
+    `grid` is a spatial_hash.SpatialHash covering the screen. Returns the number of touching pairs."""
+    if not a.count or not b.count:
+        return 0
+    grid.build(b.x[:b.count], b.y[:b.count], BULLET_WIDTH, BULLET_HEIGHT)
+    a_index, b_index = grid.query_pairs(a.x[:a.count], a.y[:a.count], BULLET_WIDTH, BULLET_HEIGHT)
+    if len(a_index):
+        # A bullet can touch several others; remove it once
+        a.remove(np.unique(a_index))
+        b.remove(np.unique(b_index))
+    return len(a_index)
+
+def volley(count, speed, spread):
+    """Velocity arrays for a fan of `count` bullets moving at `speed` px/tick, spread over +-`spread` vertically."""
+    vy = np.linspace(-spread, spread, count, dtype=np.float32)
+    return np.full(count, speed, dtype=np.float32), vy
+
+
+if __name__ == "__main__":
+    import time
+    import pygame
+    from simulation import WIDTH, HEIGHT
+
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    sprite = pygame.Surface((BULLET_WIDTH, BULLET_HEIGHT))
+    sprite.fill((255, 255, 0))
+    target = pygame.Rect(700, 300, 55, 40)
+    vx, vy = volley(50, 7, 6)
+    for live in (1000, 5000, 10000, 20000):
+        pool = BulletPool(live)
+        while len(pool) < live:
+            pool.spawn(np.random.uniform(0, WIDTH - 100), np.random.uniform(0, HEIGHT), vx, vy)
+        frames = 300
+        update_time = draw_time = 0.0
+        for _ in range(frames):
+            # Keep the pool full, like a steady stream of volleys
+            while len(pool) < live:
+                pool.spawn(0, np.random.uniform(0, HEIGHT), vx, vy)
+            start = time.perf_counter()
+            pool.update(target, WIDTH, HEIGHT)
+            middle = time.perf_counter()
+            pool.draw(surface, sprite)
+            update_time += middle - start
+            draw_time += time.perf_counter() - middle
+        print(f"{live:>6} bullets: update {update_time / frames * 1000:.3f} ms, draw {draw_time / frames * 1000:.3f} ms per frame")
@@ -0,0 +1,86 @@
+import pygame
+
+# Dirty-rectangle rendering. Each frame the caller describes everything on
+# screen as a list of items; only the regions where an item appeared,
+# disappeared, moved or changed are repainted (background first, then every
+# item touching the region, clipped to it) and passed to display.update().
+
+
+class DirtyRenderer:
+    """Redraws only the parts of a surface that changed since the last frame."""
+
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.screen_rect = surface.get_rect()
+        self.previous = {} # key -> (rect, state) from the last frame
+        self.full_redraw = False
+        self.valid = False
+        self.pixels_pushed = 0 # Pixels passed to display.update() by the last render()
+
+    def invalidate(self):
+        """Forces the next frame to repaint everything, e.g. after another screen drew over the window."""
+        self.valid = False
+
+    def render(self, items):
+        """Draws `items` and returns the list of rects to pass to pygame.display.update().
+
+        Each item is (key, rect, state, draw): `key` identifies the item across
+        frames, `state` is anything whose change means the item looks different
+        and draw(surface) paints it at `rect`. Items are drawn in list order.
+        """
+        current = {key: (pygame.Rect(rect), state) for key, rect, state, draw in items}
+
+        if self.full_redraw or not self.valid:
+            self.surface.blit(self.background, (0, 0))
+            for key, rect, state, draw in items:
+                draw(self.surface)
+            self.previous = current
+            self.valid = True
+            self.pixels_pushed = self.screen_rect.width * self.screen_rect.height
+            return [self.screen_rect]
+
+        dirty = []
+        for key, (rect, state) in current.items():
+            old = self.previous.get(key)
+            if old is None:
+                dirty.append(rect)
+            elif old != (rect, state):
+                # A small move is one region covering both positions
+                if old[0].colliderect(rect):
+                    dirty.append(old[0].union(rect))
+                else:
+                    dirty.append(old[0])
+                    dirty.append(rect)
+        for key, (rect, state) in self.previous.items():
+            if key not in current:
+                dirty.append(rect)
+        dirty = merge_rects(dirty, self.screen_rect)
+
+        for region in dirty:
+            self.surface.set_clip(region)
+            self.surface.blit(self.background, region, region)
+            for key, rect, state, draw in items:
+                if region.colliderect(rect):
+                    draw(self.surface)
+        self.surface.set_clip(None)
+
+        self.previous = current
+        self.pixels_pushed = sum(r.width * r.height for r in dirty)
+        return dirty
+
+
+def merge_rects(rects, bounds):
+    """Clips rects to `bounds` and merges overlapping ones, so no pixel is repainted twice."""
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if rect.width == 0 or rect.height == 0:
+            continue
+        # Keep absorbing overlapping regions until the rect stops growing
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
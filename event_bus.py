@@ -0,0 +1,113 @@
+# Typed gameplay events. simulation.step() emits into an EventBus while it
+# runs; the game loop calls dispatch() once per tick, which hands every
+# record to the subscribers of its type in the order they happened. Records
+# are preallocated and reused, so emitting allocates nothing. A record is
+# only valid while it is being dispatched: subscribers copy what they keep.
+
+# Event types, with what `side` and `value` hold
+FIRE = 0 # side fired `value` bullets
+HIT = 1 # side was hit
+PICKUP = 2 # side picked up a power-up of type `value`
+SPAWN = 3 # a power-up of type `value` appeared
+EXPIRE = 4 # a power-up of type `value` timed out
+ROUND_END = 5 # side ("YELLOW" or "RED") won
+MULTISHOT_END = 6 # side's multi-shot ran out
+EVENT_NAMES = ("fire", "hit", "pickup", "spawn", "expire", "round_end", "multishot_end")
+
+CAPACITY = 64 # Records allocated up front; the bus doubles this if a tick ever needs more
+
+
+class Event:
+    """One gameplay event record, reused from tick to tick."""
+    __slots__ = ("type", "side", "value", "tick")
+
+    def __init__(self):
+        self.type = self.side = self.value = self.tick = None
+
+    def __repr__(self):
+        return f"Event({EVENT_NAMES[self.type]}, {self.side!r}, {self.value!r}, tick={self.tick})"
+
+
+class EventBus:
+    """Collects the events of a tick and dispatches them to subscribers by type."""
+
+    def __init__(self, capacity=CAPACITY):
+        self.records = [Event() for _ in range(capacity)]
+        self.count = 0 # Records emitted since the last dispatch
+        self.subscribers = [[] for _ in EVENT_NAMES]
+
+    def subscribe(self, event_type, callback):
+        """Calls callback(event) for every dispatched event of `event_type`."""
+        self.subscribers[event_type].append(callback)
+
+    def emit(self, event_type, side=None, value=None, tick=None):
+        if self.count == len(self.records):
+            self.records.extend(Event() for _ in range(len(self.records)))
+        record = self.records[self.count]
+        record.type, record.side, record.value, record.tick = event_type, side, value, tick
+        self.count += 1
+
+    def dispatch(self):
+        """Delivers the pending events in the order they were emitted and empties the bus."""
+        subscribers = self.subscribers
+        for i in range(self.count):
+            record = self.records[i]
+            for callback in subscribers[record.type]:
+                callback(record)
+        self.count = 0
+
+    def clear(self):
+        """Drops pending events without delivering them, e.g. when a match is abandoned."""
+        self.count = 0
+
+
+class MatchStats:
+    """Stats subscriber: counts each side's shots, hits taken and pickups, and power-ups spawned and expired."""
+
+    def __init__(self, bus=None):
+        self.shots = {"yellow": 0, "red": 0}
+        self.hits_taken = {"yellow": 0, "red": 0}
+        self.pickups = {"yellow": 0, "red": 0}
+        self.spawned = 0
+        self.expired = 0
+        self.winner = None
+        self.end_tick = None
+        if bus:
+            self.attach(bus)
+
+    def attach(self, bus):
+        bus.subscribe(FIRE, self.on_fire)
+        bus.subscribe(HIT, self.on_hit)
+        bus.subscribe(PICKUP, self.on_pickup)
+        bus.subscribe(SPAWN, self.on_spawn)
+        bus.subscribe(EXPIRE, self.on_expire)
+        bus.subscribe(ROUND_END, self.on_round_end)
+
+    def on_fire(self, event):
+        self.shots[event.side] += event.value
+
+    def on_hit(self, event):
+        self.hits_taken[event.side] += 1
+
+    def on_pickup(self, event):
+        self.pickups[event.side] += 1
+
+    def on_spawn(self, event):
+        self.spawned += 1
+
+    def on_expire(self, event):
+        self.expired += 1
+
+    def on_round_end(self, event):
+        self.winner, self.end_tick = event.side, event.tick
+
+    def accuracy(self, side):
+        """Fraction of `side`'s bullets that hit the other ship."""
+        other = "red" if side == "yellow" else "yellow"
+        return self.hits_taken[other] / self.shots[side] if self.shots[side] else 0.0
+
+    def summary(self):
+        return (f"shots {self.shots['yellow']}/{self.shots['red']}, "
+                f"accuracy {self.accuracy('yellow'):.0%}/{self.accuracy('red'):.0%}, "
+                f"pickups {self.pickups['yellow']}/{self.pickups['red']} (yellow/red), "
+                f"power-ups spawned {self.spawned}, expired {self.expired}")
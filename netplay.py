@@ -0,0 +1,499 @@
+import argparse
+import asyncio
+import random
+import struct
+import time
+
+import pygame
+
+from simulation import (FPS, MAX_BULLETS, INPUT_UP, INPUT_DOWN, INPUT_LEFT, INPUT_RIGHT, INPUT_FIRE,
+                        MAX_POWERUPS, AI_DIFFICULTY_PRESETS, new_state, step, tick_dt, rand_int, rebuild_timers)
+
+# Networked PVP over UDP. The server owns the match and steps it on a fixed
+# clock; each client sends its INPUT_* bitmask for every tick and the server
+# answers every tick with a snapshot of the whole match, delta-compressed
+# against the last snapshot that client acknowledged.
+#
+# Clients don't wait for the server: local input is applied immediately to a
+# predicted copy of the match, guessing that the other player keeps holding
+# the same keys. When a snapshot arrives that doesn't match what was
+# predicted for its tick, the client rolls back to it and re-simulates the
+# ticks since with its own recorded inputs. Clients run a few ticks ahead of
+# the server so their inputs arrive before they are needed; the server
+# reports how early they arrive and the client speeds up or slows down.
+
+PROTOCOL_VERSION = 4
+DEFAULT_PORT = 47800
+TICK_SECONDS = 1 / FPS # The server ticks on this clock; each tick steps tick_dt(tick) ms like local play
+SIDES = ("yellow", "red")
+WINNERS = (None, "YELLOW", "RED")
+DIFFICULTIES = tuple(AI_DIFFICULTY_PRESETS)
+POWERUP_TYPES = ("HEALTH", "MULTI_SHOT")
+HISTORY = 128 # Ticks of snapshots kept as delta baselines
+INPUT_REDUNDANCY = 8 # Every input packet repeats this many recent ticks, so a lost packet rarely loses input
+TARGET_SLACK = (1, 4) # How many ticks early client inputs should reach the server
+NO_BASE = 0xFFFFFFFF
+
+# Packets: one type byte, then a fixed header and, for inputs and snapshots, a payload
+HELLO = struct.Struct("<cB") # b"H", protocol version
+WELCOME = struct.Struct("<cBBQ") # b"W", side, difficulty, seed
+INPUT = struct.Struct("<cIIIB") # b"I", acked snapshot tick, client time (ms), first tick, count; then count input bytes
+SNAPSHOT = struct.Struct("<cIIbIBB") # b"D", tick, base tick, input slack, echoed client time, yellow bits, red bits; then delta
+
+
+# --- SNAPSHOTS ---
+# A snapshot is the match state as a fixed-length list of integers, so two
+# snapshots can be compared and diffed field by field.
+
+def state_fields(state):
+    """Flattens a PVP match state into a fixed-length list of ints."""
+    fields = [state["tick"], state["time"],
+              state["yellow"].x, state["yellow"].y, state["red"].x, state["red"].y,
+              state["yellow_health"], state["red_health"], state["yellow_cooldown_end"], state["red_cooldown_end"],
+              state["yellow_multishot_end_time"], state["red_multishot_end_time"], state["next_powerup_spawn_time"],
+              WINNERS.index(state["winner"])]
+    for side in SIDES:
+        bullets = state[side + "_bullets"]
+        fields.append(len(bullets))
+        for i in range(MAX_BULLETS):
+            fields.extend((bullets[i].x, bullets[i].y) if i < len(bullets) else (0, 0))
+    powerups = state["powerups"]
+    fields.append(len(powerups))
+    for i in range(MAX_POWERUPS):
+        if i < len(powerups):
+            rect, powerup_type, spawn_time = powerups[i]
+            fields.extend((rect.x, rect.y, POWERUP_TYPES.index(powerup_type), spawn_time))
+        else:
+            fields.extend((0, 0, 0, 0))
+    return fields
+
+def apply_fields(state, fields):
+    """Overwrites `state` with a snapshot from state_fields()."""
+    values = iter(fields)
+    state["tick"], state["time"] = next(values), next(values)
+    state["yellow"].topleft = next(values), next(values)
+    state["red"].topleft = next(values), next(values)
+    for key in ("yellow_health", "red_health", "yellow_cooldown_end", "red_cooldown_end",
+                "yellow_multishot_end_time", "red_multishot_end_time", "next_powerup_spawn_time"):
+        state[key] = next(values)
+    state["winner"] = WINNERS[next(values)]
+    for side in SIDES:
+        count = next(values)
+        slots = [(next(values), next(values)) for _ in range(MAX_BULLETS)]
+        state[side + "_bullets"] = [pygame.Rect(x, y, 10, 5) for x, y in slots[:count]]
+    count = next(values)
+    slots = [(next(values), next(values), next(values), next(values)) for _ in range(MAX_POWERUPS)]
+    state["powerups"] = [(pygame.Rect(x, y, 20, 20), POWERUP_TYPES[t], spawn_time) for x, y, t, spawn_time in slots[:count]]
+    rebuild_timers(state)
+
+
+def encode_delta(base, fields):
+    """Encodes `fields` against `base`: a bitmask of the changed fields, then each change as a zigzag varint."""
+    mask = 0
+    out = bytearray()
+    for i, (old, new) in enumerate(zip(base, fields)):
+        if old != new:
+            mask |= 1 << i
+            change = new - old
+            value = (change << 1) ^ (change >> 63) # Zigzag: small negative numbers stay small
+            while value >= 0x80:
+                out.append(value & 0x7F | 0x80)
+                value >>= 7
+            out.append(value)
+    return mask.to_bytes((len(fields) + 7) // 8, "little") + bytes(out)
+
+def decode_delta(base, data):
+    """Inverse of encode_delta()."""
+    mask_length = (len(base) + 7) // 8
+    mask = int.from_bytes(data[:mask_length], "little")
+    fields = list(base)
+    offset = mask_length
+    for i in range(len(base)):
+        if mask >> i & 1:
+            value = shift = 0
+            while True:
+                byte = data[offset]
+                offset += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            fields[i] = base[i] + ((value >> 1) ^ -(value & 1))
+    return fields
+
+
+# --- TRANSPORT ---
+
+class LinkStats:
+    """Byte and packet counters for one endpoint."""
+
+    def __init__(self):
+        self.sent_bytes = self.received_bytes = 0
+        self.sent_packets = self.received_packets = 0
+        self.dropped_packets = 0 # By the latency/loss shim
+        self.start = time.perf_counter()
+
+    def per_second(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return self.sent_bytes / elapsed, self.received_bytes / elapsed
+
+
+class Endpoint(asyncio.DatagramProtocol):
+    """UDP endpoint with an optional latency/packet-loss shim on everything it sends."""
+
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, shim_seed=0):
+        self.transport = None
+        self.latency = latency # One-way delay in seconds
+        self.jitter = jitter
+        self.loss = loss
+        self.random = random.Random(shim_seed) # The shim's own generator, so runs are repeatable
+        self.stats = LinkStats()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, data, addr=None):
+        self.stats.sent_bytes += len(data)
+        self.stats.sent_packets += 1
+        if self.loss and self.random.random() < self.loss:
+            self.stats.dropped_packets += 1
+            return
+        delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.send_now, data, addr)
+        else:
+            self.send_now(data, addr)
+
+    def send_now(self, data, addr):
+        if not self.transport.is_closing():
+            self.transport.sendto(data, addr)
+
+    def datagram_received(self, data, addr):
+        self.stats.received_bytes += len(data)
+        self.stats.received_packets += 1
+        try:
+            self.handle(data, addr)
+        except (struct.error, IndexError, ValueError, KeyError):
+            pass # Malformed or unexpected packet
+
+    def handle(self, data, addr):
+        raise NotImplementedError
+
+
+# --- SERVER ---
+
+class Server(Endpoint):
+    """Authoritative PVP server for two clients."""
+
+    def __init__(self, difficulty="EASY", seed=None, **shim):
+        super().__init__(**shim)
+        self.state = new_state("PVP", difficulty, seed)
+        self.clients = {} # addr -> side index
+        self.inputs = ({}, {}) # Per side: tick -> bits received ahead of time
+        self.newest_input = [0, 0] # Per side: newest tick received
+        self.last_bits = [0, 0] # Per side: bits used for the last tick
+        self.acks = [None, None] # Per side: newest snapshot tick the client has
+        self.echo = [0, 0] # Per side: newest client timestamp, echoed back for RTT
+        self.late_inputs = 0 # Ticks simulated without the client's input
+        self.history = {} # tick -> snapshot fields
+        self.started = asyncio.Event()
+        self.finished = asyncio.Event()
+
+    def handle(self, data, addr):
+        kind = data[:1]
+        if kind == b"H":
+            _, version = HELLO.unpack_from(data)
+            if version != PROTOCOL_VERSION:
+                return
+            if addr not in self.clients and len(self.clients) < 2:
+                self.clients[addr] = len(self.clients)
+            if addr in self.clients:
+                self.send(WELCOME.pack(b"W", self.clients[addr], DIFFICULTIES.index(self.state["difficulty"]),
+                                       self.state["seed"]), addr)
+            if len(self.clients) == 2:
+                self.started.set()
+        elif kind == b"I" and addr in self.clients:
+            side = self.clients[addr]
+            _, ack, client_time, first_tick, count = INPUT.unpack_from(data)
+            if self.acks[side] is None or ack > self.acks[side]:
+                self.acks[side] = ack
+            self.echo[side] = client_time
+            for i, bits in enumerate(data[INPUT.size:INPUT.size + count]):
+                tick = first_tick + i
+                if tick > self.state["tick"]: # Inputs for ticks already simulated are too late
+                    self.inputs[side][tick] = bits
+                    self.newest_input[side] = max(self.newest_input[side], tick)
+
+    def tick(self):
+        """Steps the match with the inputs that have arrived and sends every client a snapshot."""
+        tick = self.state["tick"] + 1
+        for side in (0, 1):
+            bits = self.inputs[side].pop(tick, None)
+            if bits is None:
+                # Missing input: keep holding the same keys, but don't repeat a fire press
+                bits = self.last_bits[side] & ~INPUT_FIRE
+                self.late_inputs += 1
+            self.last_bits[side] = bits
+        step(self.state, tuple(self.last_bits), tick_dt(self.state["tick"]))
+
+        self.history[tick] = state_fields(self.state)
+        self.history.pop(tick - HISTORY, None)
+        for addr, side in self.clients.items():
+            self.send_snapshot(addr, side, delta=True)
+
+    def send_snapshot(self, addr, side, delta):
+        """Sends the newest snapshot, as a delta against the client's acknowledged one when possible."""
+        tick = self.state["tick"]
+        fields = self.history[tick]
+        base_tick = self.acks[side] if delta and self.acks[side] in self.history else NO_BASE
+        base = self.history[base_tick] if base_tick != NO_BASE else [0] * len(fields)
+        slack = max(-128, min(127, self.newest_input[side] - tick))
+        header = SNAPSHOT.pack(b"D", tick, base_tick, slack, self.echo[side], *self.last_bits)
+        self.send(header + encode_delta(base, fields), addr)
+
+    async def run(self, linger=1.0):
+        """Waits for two clients, then ticks until the match ends."""
+        await self.started.wait()
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while not self.state["winner"]:
+            self.tick()
+            next_tick += TICK_SECONDS
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        # Repeat the final snapshot for a moment, so a client that lost it still sees the result
+        for _ in range(int(linger / TICK_SECONDS)):
+            for addr, side in self.clients.items():
+                self.send_snapshot(addr, side, delta=False)
+            await asyncio.sleep(TICK_SECONDS)
+        self.finished.set()
+
+
+# --- CLIENT ---
+
+class Client(Endpoint):
+    """Predicting, rolling-back PVP client. Call update() once per frame with the local player's bits."""
+
+    def __init__(self, server_addr, **shim):
+        super().__init__(**shim)
+        self.server_addr = server_addr
+        self.side = None
+        self.state = None # Predicted match
+        self.bus = None # An event_bus.EventBus for the events of newly predicted ticks, dispatched by the caller
+        self.local_inputs = {} # tick -> local bits
+        self.remote_bits = 0 # Last known remote input, used as the prediction
+        self.predicted = {} # tick -> predicted snapshot fields
+        self.snapshots = {} # tick -> received snapshot fields, the delta baselines
+        self.confirmed_tick = -1 # Newest snapshot applied
+        self.clock_start = None # (loop time, tick) the local tick clock counts from
+        self.clock_adjust = 0 # Ticks added to or removed from the clock by slack control
+        self.last_adjust = 0.0
+        self.rtt = None # Smoothed round trip time in seconds
+        self.welcomed = asyncio.Event()
+        # Prediction and rollback statistics
+        self.rollbacks = 0
+        self.confirmations = 0
+        self.resimulated_ticks = []
+        self.resimulation_seconds = []
+
+    def hello(self):
+        self.send(HELLO.pack(b"H", PROTOCOL_VERSION), self.server_addr)
+
+    def handle(self, data, addr):
+        kind = data[:1]
+        if kind == b"W" and self.side is None:
+            _, side, difficulty, seed = WELCOME.unpack_from(data)
+            self.side = side
+            self.state = new_state("PVP", DIFFICULTIES[difficulty], seed)
+            self.welcomed.set()
+        elif kind == b"D" and self.state is not None:
+            _, tick, base_tick, slack, echo, yellow_bits, red_bits = SNAPSHOT.unpack_from(data)
+            if tick <= self.confirmed_tick or tick in self.snapshots:
+                return # Out of order or duplicate
+            if base_tick == NO_BASE:
+                base = [0] * len(state_fields(self.state))
+            elif base_tick in self.snapshots:
+                base = self.snapshots[base_tick]
+            else:
+                return # Baseline already forgotten; the next snapshot will use a newer one
+            fields = decode_delta(base, data[SNAPSHOT.size:])
+            self.snapshots[tick] = fields
+            self.snapshots.pop(tick - HISTORY, None)
+            self.track_rtt(echo)
+            self.control_clock(slack)
+            self.remote_bits = (red_bits if self.side == 0 else yellow_bits) & ~INPUT_FIRE
+            self.confirm(tick, fields)
+
+    def track_rtt(self, echo):
+        if echo:
+            sample = ((self.now_ms() - echo) & 0xFFFFFFFF) / 1000
+            self.rtt = sample if self.rtt is None else self.rtt * 0.9 + sample * 0.1
+
+    def control_clock(self, slack):
+        """Nudges the local tick clock so inputs reach the server TARGET_SLACK ticks early."""
+        loop_time = asyncio.get_running_loop().time()
+        if self.clock_start is None or loop_time - self.last_adjust < max(self.rtt or 0, 0.1):
+            return # Wait for the last adjustment to show up in the server's reports
+        if slack < TARGET_SLACK[0]:
+            self.clock_adjust += TARGET_SLACK[0] - slack
+            self.last_adjust = loop_time
+        elif slack > TARGET_SLACK[1]:
+            self.clock_adjust -= 1
+            self.last_adjust = loop_time
+
+    def confirm(self, tick, fields):
+        """Applies an authoritative snapshot, rolling back and re-simulating if the prediction was wrong."""
+        self.confirmed_tick = tick
+        current = self.state["tick"]
+        if tick >= current:
+            # The server is ahead of the prediction (start of the match or a stalled client): jump to it
+            apply_fields(self.state, fields)
+            if self.clock_start is None:
+                self.clock_start = (asyncio.get_running_loop().time(), tick)
+            return
+        self.confirmations += 1
+        if self.predicted.get(tick) == fields:
+            return
+        start = time.perf_counter()
+        self.rollbacks += 1
+        apply_fields(self.state, fields)
+        self.predicted[tick] = fields
+        for t in range(tick + 1, current + 1):
+            self.simulate(self.local_inputs.get(t, 0))
+        self.resimulated_ticks.append(current - tick)
+        self.resimulation_seconds.append(time.perf_counter() - start)
+
+    def simulate(self, local_bits, bus=None):
+        """Steps the predicted match once with the local input and the predicted remote input."""
+        remote = self.remote_bits
+        inputs = (local_bits, remote) if self.side == 0 else (remote, local_bits)
+        step(self.state, inputs, tick_dt(self.state["tick"]), bus=bus)
+        tick = self.state["tick"]
+        self.predicted[tick] = state_fields(self.state)
+        self.predicted.pop(tick - HISTORY, None)
+
+    def update(self, local_bits):
+        """Advances the prediction to the local clock, applying `local_bits`, and sends the input.
+        Gameplay events of the new ticks go to self.bus, if set; re-simulated ticks after a rollback emit none."""
+        if self.clock_start is None or self.state["winner"]:
+            return
+        loop_time = asyncio.get_running_loop().time()
+        target = self.clock_start[1] + int((loop_time - self.clock_start[0]) / TICK_SECONDS) + self.clock_adjust
+        # Catch up at most a few ticks per frame; a client that falls far behind snaps forward
+        if target - self.state["tick"] > HISTORY // 2:
+            self.clock_adjust -= target - self.state["tick"] - TARGET_SLACK[1]
+            target = self.state["tick"] + TARGET_SLACK[1]
+        while self.state["tick"] < target and not self.state["winner"]:
+            tick = self.state["tick"] + 1
+            self.local_inputs[tick] = local_bits
+            self.local_inputs.pop(tick - HISTORY, None)
+            self.simulate(local_bits, self.bus)
+            local_bits &= ~INPUT_FIRE # A fire press only counts once
+        self.send_inputs()
+
+    def send_inputs(self):
+        newest = self.state["tick"]
+        first = max(newest - INPUT_REDUNDANCY + 1, self.confirmed_tick + 1, 1)
+        bits = bytes(self.local_inputs.get(t, 0) for t in range(first, newest + 1))
+        self.send(INPUT.pack(b"I", max(self.confirmed_tick, 0), self.now_ms(), first, len(bits)) + bits, self.server_addr)
+
+    def now_ms(self):
+        return int(asyncio.get_running_loop().time() * 1000) & 0xFFFFFFFF or 1
+
+    def report(self):
+        """Prediction, rollback and bandwidth statistics as a dict."""
+        sent, received = self.stats.per_second()
+        resim_ms = sorted(s * 1000 for s in self.resimulation_seconds)
+        return {
+            "side": SIDES[self.side] if self.side is not None else None,
+            "rtt_ms": round(self.rtt * 1000, 1) if self.rtt is not None else None,
+            "upload_bytes_per_s": round(sent),
+            "download_bytes_per_s": round(received),
+            "snapshots_confirmed": self.confirmations,
+            "rollbacks": self.rollbacks,
+            "mispredicted": round(self.rollbacks / self.confirmations, 3) if self.confirmations else 0.0,
+            "mean_resimulated_ticks": round(sum(self.resimulated_ticks) / len(self.resimulated_ticks), 2) if self.resimulated_ticks else 0,
+            "mean_rollback_ms": round(sum(resim_ms) / len(resim_ms), 3) if resim_ms else 0,
+            "max_rollback_ms": round(resim_ms[-1], 3) if resim_ms else 0,
+        }
+
+
+async def start_server(port=DEFAULT_PORT, host="0.0.0.0", **options):
+    loop = asyncio.get_running_loop()
+    _, server = await loop.create_datagram_endpoint(lambda: Server(**options), local_addr=(host, port))
+    return server
+
+async def connect(host, port=DEFAULT_PORT, timeout=10.0, **shim):
+    """Joins a server and waits for the welcome. Raises TimeoutError if the server doesn't answer."""
+    loop = asyncio.get_running_loop()
+    _, client = await loop.create_datagram_endpoint(lambda: Client((host, port), **shim), remote_addr=(host, port))
+    client.server_addr = None # Connected socket
+    deadline = loop.time() + timeout
+    while not client.welcomed.is_set():
+        if loop.time() > deadline:
+            client.transport.close()
+            raise TimeoutError(f"no answer from {host}:{port}")
+        client.hello()
+        try:
+            await asyncio.wait_for(client.welcomed.wait(), 0.25)
+        except asyncio.TimeoutError:
+            pass
+    return client
+
+
+# --- SELF TEST ---
+
+def bot_input(seed, tick):
+    """A bot that holds keys for a while like a person would, so prediction is sometimes right and sometimes wrong."""
+    held = tick // 20 # Change keys every 20 ticks
+    bits = rand_int(seed, held, 0, 0, INPUT_UP | INPUT_DOWN | INPUT_LEFT | INPUT_RIGHT)
+    if rand_int(seed, tick, 1, 0, 30) == 0:
+        bits |= INPUT_FIRE
+    return bits
+
+async def selftest(seconds=20, latency_ms=100, jitter_ms=10, loss=0.05, port=DEFAULT_PORT):
+    """Plays two bots against each other through a localhost server with the latency/loss shim on every endpoint."""
+    one_way = latency_ms / 2000
+    shim = {"latency": one_way, "jitter": jitter_ms / 1000, "loss": loss}
+    server = await start_server(port, "127.0.0.1", seed=1, shim_seed=0, **shim)
+    server_task = asyncio.create_task(server.run())
+    clients = [await connect("127.0.0.1", port, shim_seed=i + 1, **shim) for i in range(2)]
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    frame = 0
+    while loop.time() < end and not server.finished.is_set():
+        for i, client in enumerate(clients):
+            client.update(bot_input(100 + i, frame))
+        frame += 1
+        await asyncio.sleep(1 / FPS)
+    server_task.cancel()
+
+    sent, received = server.stats.per_second()
+    print(f"RTT {latency_ms} ms (+-{jitter_ms} ms jitter), {loss:.0%} loss, {server.state['tick']} server ticks")
+    print(f"server: {sent:,.0f} B/s up, {received:,.0f} B/s down, {server.late_inputs} ticks without a client's input, "
+          f"{server.stats.dropped_packets} packets dropped by the shim")
+    for client in clients:
+        print("client: " + ", ".join(f"{key} {value}" for key, value in client.report().items()))
+    for endpoint in [server] + clients:
+        endpoint.transport.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Networked PVP server and localhost self-test.")
+    parser.add_argument("command", choices=("server", "selftest"))
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default="EASY")
+    parser.add_argument("--seconds", type=float, default=20, help="self-test length")
+    parser.add_argument("--latency", type=float, default=100, help="simulated round trip time in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="simulated jitter in ms")
+    parser.add_argument("--loss", type=float, default=0.05, help="simulated packet loss, 0-1")
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        asyncio.run(selftest(args.seconds, args.latency, args.jitter, args.loss, args.port))
+    else:
+        async def serve():
+            server = await start_server(args.port, difficulty=args.difficulty,
+                                        latency=args.latency / 2000, jitter=args.jitter / 1000, loss=args.loss)
+            print(f"Waiting for two players on port {args.port}")
+            await server.run()
+        asyncio.run(serve())
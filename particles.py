@@ -0,0 +1,187 @@
+import math
+
+import numpy as np
+import pygame
+
+# Struct-of-arrays particles for explosions, thruster trails and pickup
+# bursts. Like bullet_pool.BulletPool, particles live in preallocated NumPy
+# arrays with the live ones first: emitting writes into the free tail, update()
+# moves and ages all of them with whole-array operations and compacts out the
+# dead, and draw() writes every particle's pixels into the surface through
+# pygame.surfarray in a few fancy-indexed assignments instead of one draw call
+# each. Particles are cosmetic: they run on the frame clock, not in the
+# simulation, so they never change a match or its replay.
+#
+# Every particle belongs to a group, one per effect (a ship's thruster trail,
+# one explosion). groups() gives each group's bounding rect, so a dirty-rect
+# renderer can repaint the area around each effect instead of one box spanning
+# all of them, and draw() can draw a single group.
+
+# Live particles allowed per quality setting; emitters scale their counts down with it
+QUALITY_BUDGETS = {"OFF": 0, "LOW": 2000, "MEDIUM": 8000, "HIGH": 20000}
+RAMP_STEPS = 8 # Colours a particle goes through over its life
+DRAG = 2.0 # Per second: velocity decays by exp(-DRAG * seconds)
+SIZE = 2 # Particles are SIZE x SIZE pixel squares
+
+
+class ParticleSystem:
+    """Preallocated particles with vectorised updates and batched pixel drawing."""
+
+    def __init__(self, quality="HIGH", seed=None):
+        self.capacity = QUALITY_BUDGETS[quality]
+        self.density = self.capacity / QUALITY_BUDGETS["HIGH"] # Fraction of each effect's particles emitted
+        self.x = np.zeros(self.capacity, dtype=np.float32)
+        self.y = np.zeros(self.capacity, dtype=np.float32)
+        self.vx = np.zeros(self.capacity, dtype=np.float32)
+        self.vy = np.zeros(self.capacity, dtype=np.float32)
+        self.age = np.zeros(self.capacity, dtype=np.float32) # Seconds lived
+        self.life = np.ones(self.capacity, dtype=np.float32) # Seconds to live
+        self.ramp = np.zeros(self.capacity, dtype=np.uint8) # Row of self.colors
+        self.group = np.zeros(self.capacity, dtype=np.uint16) # Effect the particle belongs to
+        self.colors = np.zeros((0, RAMP_STEPS, 3), dtype=np.uint8)
+        self.ramps = {} # name -> row of self.colors
+        self.mapped_colors, self.mapped_key = None, None # self.colors as pixel values; see mapped()
+        self.members = (None, {}) # (version, {group: indices of its particles}) from the last groups()
+        self.count = 0
+        self.version = 0 # Bumped whenever the particles change, for the renderer
+        self.rng = np.random.default_rng(seed)
+
+    def add_ramp(self, name, start, end):
+        """Registers a colour ramp that particles fade through from `start` to `end` over their life."""
+        steps = np.linspace(0, 1, RAMP_STEPS)[:, None]
+        ramp = np.round(np.array(start) * (1 - steps) + np.array(end) * steps).astype(np.uint8)
+        self.ramps[name] = len(self.colors)
+        self.colors = np.concatenate((self.colors, ramp[None]))
+
+    def emit(self, x, y, count, speed, life, ramp, angle=0.0, spread=math.pi, group=0):
+        """Emits `count` particles (scaled by the quality) at (x, y), flying at up to `speed` px/s in directions
+        within `spread` radians of `angle` and living 50-100% of `life` seconds, into `group`. Returns how many fit."""
+        n = min(round(count * self.density), self.capacity - self.count)
+        if n <= 0:
+            return 0
+        start, end = self.count, self.count + n
+        rng = self.rng
+        direction = angle + rng.uniform(-spread, spread, n)
+        velocity = speed * np.sqrt(rng.random(n)) # Denser towards the rim, like a shock front
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.vx[start:end] = np.cos(direction) * velocity
+        self.vy[start:end] = np.sin(direction) * velocity
+        self.age[start:end] = 0
+        self.life[start:end] = life * rng.uniform(0.5, 1.0, n)
+        self.ramp[start:end] = self.ramps[ramp]
+        self.group[start:end] = group
+        self.count = end
+        self.version += 1
+        return n
+
+    def update(self, seconds, width, height):
+        """Moves and ages every particle by `seconds` and removes the ones that burnt out or left the screen."""
+        n = self.count
+        if n == 0:
+            return
+        x, y, vx, vy, age = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n], self.age[:n]
+        x += vx * seconds
+        y += vy * seconds
+        drag = math.exp(-DRAG * seconds)
+        vx *= drag
+        vy *= drag
+        age += seconds
+        gone = (age >= self.life[:n]) | (x < 0) | (x > width - SIZE) | (y < 0) | (y > height - SIZE)
+        if gone.any():
+            keep = np.flatnonzero(~gone)
+            k = len(keep)
+            for array in (self.x, self.y, self.vx, self.vy, self.age, self.life, self.ramp, self.group):
+                array[:k] = array[keep]
+            self.count = k
+        self.version += 1
+
+    def clear(self):
+        self.count = 0
+        self.version += 1
+
+    def groups(self):
+        """(group, rect) for every group with live particles, the rect covering that group's particles."""
+        n = self.count
+        if n == 0:
+            return []
+        order = np.argsort(self.group[:n], kind="stable")
+        group = self.group[:n][order]
+        starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+        x, y = self.x[:n][order], self.y[:n][order]
+        left, top = np.minimum.reduceat(x, starts).astype(np.int32), np.minimum.reduceat(y, starts).astype(np.int32)
+        right, bottom = np.maximum.reduceat(x, starts).astype(np.int32), np.maximum.reduceat(y, starts).astype(np.int32)
+        ids = group[starts].tolist()
+        self.members = (self.version, dict(zip(ids, np.split(order, starts[1:]))))
+        return [(g, pygame.Rect(l, t, r - l + SIZE, b - t + SIZE))
+                for g, l, t, r, b in zip(ids, left.tolist(), top.tolist(), right.tolist(), bottom.tolist())]
+
+    def draw(self, surface, group=None):
+        """Writes every live particle (of `group`, if given) inside the surface's clip rect straight into its pixels."""
+        n = self.count
+        if n == 0:
+            return
+        if group is None:
+            which = slice(0, n)
+        else:
+            if self.members[0] != self.version:
+                self.groups()
+            which = self.members[1].get(group)
+            if which is None:
+                return
+        x = self.x[which].astype(np.int32)
+        y = self.y[which].astype(np.int32)
+        clip = surface.get_clip()
+        inside = (x >= clip.left) & (x <= clip.right - SIZE) & (y >= clip.top) & (y <= clip.bottom - SIZE)
+        # Row-major index into the ramps: ramp * RAMP_STEPS + how far through its life the particle is
+        shade = np.minimum((self.age[which] / self.life[which] * RAMP_STEPS).astype(np.int32), RAMP_STEPS - 1)
+        shade += self.ramp[which].astype(np.int32) * RAMP_STEPS
+        x, y = x[inside], y[inside]
+        colors = self.mapped(surface).take(shade[inside])
+        pixels = pygame.surfarray.pixels2d(surface)
+        rows = pixels.T # Row-major, as the pixels are laid out in memory
+        if rows.flags.c_contiguous:
+            # One flat index per particle, offset for each pixel of the square
+            flat = rows.reshape(-1)
+            index = y * rows.shape[1] + x
+            for dy in range(SIZE):
+                for dx in range(SIZE):
+                    flat[index + (dy * rows.shape[1] + dx)] = colors
+        else: # Rows padded to a pitch wider than the surface
+            for dy in range(SIZE):
+                for dx in range(SIZE):
+                    pixels[x + dx, y + dy] = colors
+        del pixels, rows # Unlocks the surface
+
+    def mapped(self, surface):
+        """The colour ramps as a flat array of pixel values in `surface`'s format, cached per format."""
+        key = (surface.get_bitsize(), surface.get_masks(), len(self.colors))
+        if self.mapped_key != key:
+            flat = [surface.map_rgb(tuple(rgb)) for rgb in self.colors.reshape(-1, 3).tolist()]
+            self.mapped_colors = np.array(flat, dtype=np.uint32)
+            self.mapped_key = key
+        return self.mapped_colors
+
+
+if __name__ == "__main__":
+    import time
+    from simulation import WIDTH, HEIGHT
+
+    surface = pygame.Surface((WIDTH, HEIGHT), depth=32)
+    system = ParticleSystem("HIGH", seed=1)
+    system.add_ramp("fire", (255, 240, 160), (120, 20, 0))
+    frames = 300
+    update_time = draw_time = 0.0
+    peak = 0
+    for _ in range(frames):
+        # Keep the system full with explosions all over the screen
+        while system.count < system.capacity:
+            system.emit(system.rng.uniform(100, WIDTH - 100), system.rng.uniform(100, HEIGHT - 100), 400, 250, 1.0, "fire")
+        peak = max(peak, system.count)
+        start = time.perf_counter()
+        system.update(1 / 60, WIDTH, HEIGHT)
+        middle = time.perf_counter()
+        system.draw(surface)
+        update_time += middle - start
+        draw_time += time.perf_counter() - middle
+    print(f"{peak} particles: update {update_time / frames * 1000:.3f} ms, draw {draw_time / frames * 1000:.3f} ms per frame")
@@ -0,0 +1,150 @@
+import csv
+import json
+import os
+import time
+from array import array
+
+import pygame
+
+# Per-phase frame profiler. The game loop calls start_frame(), then mark(name)
+# at the end of every phase, then end_frame(); each mark charges the time
+# since the previous one to that phase. Durations go into fixed-size ring
+# buffers, so a long session costs no more memory than a short one. Callers
+# only hold a profiler while it is enabled ("if profiler: profiler.mark(...)"),
+# which keeps the cost of a disabled profiler to one truth test per phase.
+
+FRAMES = 600 # Frames kept in the ring buffers, 10 seconds at 60 FPS
+SPIKE_FACTOR = 1.5 # A frame this many times over budget is a spike
+MAX_SPIKES = 8 # Spikes listed in the overlay
+
+
+class FrameProfiler:
+    """Times each phase of every frame into ring buffers and exports the result."""
+
+    def __init__(self, budget_ms, capacity=FRAMES):
+        self.enabled = False
+        self.budget_ms = budget_ms
+        self.capacity = capacity
+        self.frames = 0 # Frames recorded so far; the newest one is at (frames - 1) % capacity
+        self.frame_ms = array("d", bytes(8 * capacity))
+        self.frame_start = array("d", bytes(8 * capacity)) # perf_counter() seconds, for traces
+        self.phase_ms = {} # phase -> array of per-frame milliseconds
+        self.phase_order = [] # Phases in the order they were first seen
+        self.current = {} # phase -> seconds in the frame being recorded
+        self.spikes = [] # (frame, frame ms, slowest phase, its ms), newest last
+        self.start = self.last = 0.0
+
+    def clear(self):
+        """Forgets every recorded frame; `enabled` is left alone."""
+        self.frames = 0
+        self.phase_ms.clear()
+        self.phase_order.clear()
+        self.spikes.clear()
+
+    def start_frame(self):
+        self.start = self.last = time.perf_counter()
+        self.current.clear()
+
+    def mark(self, phase):
+        """Charges the time since the previous mark (or the frame start) to `phase`."""
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        slot = self.frames % self.capacity
+        frame_ms = (self.last - self.start) * 1000
+        self.frame_ms[slot] = frame_ms
+        self.frame_start[slot] = self.start
+        for phase, seconds in self.current.items():
+            if phase not in self.phase_ms:
+                self.phase_ms[phase] = array("d", bytes(8 * self.capacity))
+                self.phase_order.append(phase)
+        for phase, buffer in self.phase_ms.items():
+            buffer[slot] = self.current.get(phase, 0.0) * 1000
+        if frame_ms > self.budget_ms * SPIKE_FACTOR:
+            slowest = max(self.current, key=self.current.get)
+            self.spikes.append((self.frames, frame_ms, slowest, self.current[slowest] * 1000))
+            del self.spikes[:-MAX_SPIKES]
+        self.frames += 1
+
+    def recorded(self):
+        """Ring buffer slots holding recorded frames, oldest first."""
+        count = min(self.frames, self.capacity)
+        first = self.frames - count
+        return [(first + i) % self.capacity for i in range(count)]
+
+    def percentiles(self, values, quantiles=(0.5, 0.99)):
+        if not values:
+            return [0.0] * len(quantiles)
+        values = sorted(values)
+        return [values[min(len(values) - 1, int(q * len(values)))] for q in quantiles]
+
+    def stats(self):
+        """Returns {phase: (p50 ms, p99 ms)} over the buffered frames, with the whole frame under "frame"."""
+        slots = self.recorded()
+        stats = {"frame": self.percentiles([self.frame_ms[s] for s in slots])}
+        for phase in self.phase_order:
+            stats[phase] = self.percentiles([self.phase_ms[phase][s] for s in slots])
+        return stats
+
+    # --- EXPORT ---
+
+    def export_csv(self, path):
+        """One row per buffered frame: frame number, frame ms and the ms of every phase."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + self.phase_order)
+            first = self.frames - len(self.recorded())
+            for i, slot in enumerate(self.recorded()):
+                writer.writerow([first + i, round(self.frame_ms[slot], 4)]
+                                + [round(self.phase_ms[phase][slot], 4) for phase in self.phase_order])
+
+    def export_chrome_trace(self, path):
+        """Writes the buffered frames in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Space Blaster"}}]
+        for slot in self.recorded():
+            start_us = self.frame_start[slot] * 1e6
+            events.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": round(start_us, 1),
+                           "dur": round(self.frame_ms[slot] * 1000, 1)})
+            # Phases run one after another in the order they were first seen
+            offset_us = start_us
+            for phase in self.phase_order:
+                duration_us = self.phase_ms[phase][slot] * 1000
+                if duration_us:
+                    events.append({"name": phase, "ph": "X", "pid": 1, "tid": 1, "ts": round(offset_us, 1),
+                                   "dur": round(duration_us, 1)})
+                    offset_us += duration_us
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, directory="profiles"):
+        """Writes a Chrome trace, a CSV of every frame and a JSON summary. Returns the trace path."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, time.strftime("frames-%Y%m%d-%H%M%S"))
+        self.export_chrome_trace(stem + ".trace.json")
+        self.export_csv(stem + ".csv")
+        with open(stem + ".summary.json", "w") as f:
+            json.dump({"frames": min(self.frames, self.capacity), "budget_ms": self.budget_ms,
+                       "p50_p99_ms": {phase: [round(v, 4) for v in values] for phase, values in self.stats().items()},
+                       "spikes": [{"frame": frame, "frame_ms": round(ms, 3), "slowest_phase": phase, "phase_ms": round(phase_ms, 3)}
+                                  for frame, ms, phase, phase_ms in self.spikes]}, f, indent=2)
+        return stem + ".trace.json"
+
+    # --- OVERLAY ---
+
+    def overlay(self, font, color=(255, 255, 255), background=(0, 0, 0, 170)):
+        """Renders the p50/p99 table and recent spikes onto a translucent panel."""
+        lines = [f"{'phase':<12}{'p50 ms':>8}{'p99 ms':>8}"]
+        for phase, (p50, p99) in self.stats().items():
+            lines.append(f"{phase:<12}{p50:8.2f}{p99:8.2f}")
+        lines.append(f"spikes > {self.budget_ms * SPIKE_FACTOR:.1f} ms: {len(self.spikes)} recent")
+        for frame, ms, phase, phase_ms in self.spikes[-3:]:
+            lines.append(f" #{frame}: {ms:.1f} ms, {phase} {phase_ms:.1f}")
+        texts = [font.render(line, True, color) for line in lines]
+        line_height = font.get_linesize()
+        panel = pygame.Surface((max(t.get_width() for t in texts) + 12, line_height * len(texts) + 8), pygame.SRCALPHA)
+        panel.fill(background)
+        for i, text in enumerate(texts):
+            panel.blit(text, (6, 4 + i * line_height))
+        return panel
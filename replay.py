@@ -0,0 +1,308 @@
+import argparse
+import copy
+import os
+import struct
+import time
+
+from simulation import (AI_DIFFICULTY_PRESETS, PLANNED_DIFFICULTIES, FPS, INPUT_FIRE, new_state, step,
+                        scripted_yellow_input, random_yellow_input, mirror_ai_input)
+
+# Match replays. The rules are deterministic given the seed and each tick's
+# inputs and duration, so a replay is a small header followed by one packed
+# 16-bit word per tick:
+#
+#   bits 0-4   yellow's INPUT_* bitmask
+#   bits 5-9   red's INPUT_* bitmask
+#   bits 10-15 the tick's dt in milliseconds, or DT_ESCAPE when it is followed
+#              by a 32-bit dt (long frames, e.g. the first tick after a pause)
+#
+# The header is rewritten with the tick count and the final result when the
+# recorder is closed, so stored replays double as regression tests of the rules.
+
+MAGIC = b"SBREPLAY"
+VERSION = 2 # 2: the power-up spawn delay is rolled once per spawn
+MODES = ("AI", "PVP", "BULLET_HELL")
+DIFFICULTIES = tuple(AI_DIFFICULTY_PRESETS)
+WINNERS = (None, "YELLOW", "RED")
+# magic, version, mode, difficulty, reserved, seed, start time, ticks, winner, yellow health, red health
+HEADER = struct.Struct("<8sBBBBQqIBbb")
+TICK = struct.Struct("<H")
+LONG_DT = struct.Struct("<I")
+DT_ESCAPE = 63
+UNKNOWN_TICKS = 0xFFFFFFFF # Tick count of a replay whose recorder was never closed
+REPLAY_EXTENSION = ".sbr"
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def pack_tick(yellow_bits, red_bits, dt):
+    """Packs one tick's inputs and duration."""
+    word = (yellow_bits & 31) | (red_bits & 31) << 5
+    if 0 <= dt < DT_ESCAPE:
+        return TICK.pack(word | dt << 10)
+    return TICK.pack(word | DT_ESCAPE << 10) + LONG_DT.pack(dt)
+
+
+# --- RECORDING ---
+
+class ReplayRecorder:
+    """Writes a replay of the match that starts with `state` as it is played."""
+
+    def __init__(self, path, state):
+        self.path = path
+        self.ticks = 0
+        self.buffer = bytearray()
+        self.file = open(path, "wb")
+        self.header = [MAGIC, VERSION, MODES.index(state["mode"]), DIFFICULTIES.index(state["difficulty"]), 0,
+                       state["seed"], state["time"], UNKNOWN_TICKS, 0, state["yellow_health"], state["red_health"]]
+        self.file.write(HEADER.pack(*self.header))
+
+    def record(self, inputs, dt):
+        """Records the inputs and dt of one step() call."""
+        self.buffer += pack_tick(inputs[0], inputs[1], dt)
+        self.ticks += 1
+        if len(self.buffer) >= 1 << 16:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self, state):
+        """Finishes the file, storing the tick count and the result reached in `state`."""
+        if self.file.closed:
+            return
+        self.file.write(self.buffer)
+        self.header[7:] = [self.ticks, WINNERS.index(state["winner"]), state["yellow_health"], state["red_health"]]
+        self.file.seek(0)
+        self.file.write(HEADER.pack(*self.header))
+        self.file.close()
+
+
+# --- PLAYBACK ---
+
+class Replay:
+    """A loaded replay: the match settings, every tick as (yellow_bits, red_bits, dt) and the recorded result."""
+
+    def __init__(self, mode, difficulty, seed, start_time, ticks, result):
+        self.mode = mode
+        self.difficulty = difficulty
+        self.seed = seed
+        self.start_time = start_time
+        self.ticks = ticks
+        self.result = result # (winner, yellow_health, red_health), or None if the recording was cut short
+
+    def new_state(self):
+        return new_state(self.mode, self.difficulty, self.seed, now=self.start_time)
+
+def load(path):
+    """Reads a replay file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ReplayError(f"{path} is too short to be a replay")
+    magic, version, mode, difficulty, _, seed, start_time, tick_count, winner, yellow_health, red_health = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ReplayError(f"{path} is not a version {VERSION} replay")
+
+    ticks = []
+    offset = HEADER.size
+    while offset + TICK.size <= len(data) and len(ticks) != tick_count:
+        word, = TICK.unpack_from(data, offset)
+        offset += TICK.size
+        dt = word >> 10
+        if dt == DT_ESCAPE:
+            if offset + LONG_DT.size > len(data):
+                break
+            dt, = LONG_DT.unpack_from(data, offset)
+            offset += LONG_DT.size
+        ticks.append((word & 31, word >> 5 & 31, dt))
+    result = None
+    if tick_count != UNKNOWN_TICKS:
+        if len(ticks) != tick_count:
+            raise ReplayError(f"{path} is truncated: {len(ticks)} of {tick_count} ticks")
+        result = (WINNERS[winner], yellow_health, red_health)
+    return Replay(MODES[mode], DIFFICULTIES[difficulty], seed, start_time, ticks, result)
+
+def play(replay):
+    """Replays a whole match headlessly, as fast as possible, and returns the final state."""
+    state = replay.new_state()
+    for yellow_bits, red_bits, dt in replay.ticks:
+        step(state, (yellow_bits, red_bits), dt)
+    return state
+
+
+class ReplayPlayer:
+    """Steps through a replay with seeking. Keyframes saved along the way make seeking backwards cheap."""
+
+    def __init__(self, replay, keyframe_interval=FPS * 5):
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.state = replay.new_state()
+        self.position = 0 # Ticks played so far
+        self.keyframes = {0: copy.deepcopy(self.state)}
+
+    def __len__(self):
+        return len(self.replay.ticks)
+
+    def finished(self):
+        return self.position >= len(self.replay.ticks)
+
+    def advance(self, bus=None):
+        """Plays the next tick, emitting its gameplay events into `bus` if one is given."""
+        if self.finished():
+            return
+        yellow_bits, red_bits, dt = self.replay.ticks[self.position]
+        step(self.state, (yellow_bits, red_bits), dt, bus=bus)
+        self.position += 1
+        if self.position % self.keyframe_interval == 0 and self.position not in self.keyframes:
+            self.keyframes[self.position] = copy.deepcopy(self.state)
+
+    def seek(self, position):
+        """Jumps to just after tick `position`, replaying from the nearest keyframe before it."""
+        position = max(0, min(position, len(self.replay.ticks)))
+        if not self.position <= position < self.position + self.keyframe_interval:
+            start = max(tick for tick in self.keyframes if tick <= position)
+            self.state = copy.deepcopy(self.keyframes[start])
+            self.position = start
+        while self.position < position:
+            self.advance()
+
+
+# --- REGRESSION CHECKS ---
+
+def recorded_outcome(replay):
+    return (len(replay.ticks),) + replay.result
+
+def check(paths):
+    """Replays every finished recording and compares the outcome with the one stored in the file.
+
+    Classic-mode replays of the same mode and difficulty are played in lockstep
+    with batch_sim, except against the planner AI; the rest go through simulation.step(). Returns
+    (replays checked, list of (path, recorded, replayed) mismatches).
+    """
+    replays = {}
+    for path in paths:
+        replay = load(path)
+        if replay.result is not None:
+            replays[path] = replay
+
+    mismatches = []
+    groups = {}
+    for path, replay in replays.items():
+        if replay.mode in ("AI", "PVP") and not (replay.mode == "AI" and replay.difficulty in PLANNED_DIFFICULTIES):
+            groups.setdefault((replay.mode, replay.difficulty), []).append(path)
+        else:
+            state = play(replay)
+            outcome = (state["tick"], state["winner"], state["yellow_health"], state["red_health"])
+            if outcome != recorded_outcome(replay):
+                mismatches.append((path, recorded_outcome(replay), outcome))
+    for (mode, difficulty), group in groups.items():
+        for path, outcome in zip(group, play_batch([replays[path] for path in group], mode, difficulty)):
+            if outcome != recorded_outcome(replays[path]):
+                mismatches.append((path, recorded_outcome(replays[path]), outcome))
+    return len(replays), mismatches
+
+def play_batch(replays, mode, difficulty):
+    """Plays classic-mode replays in lockstep with batch_sim. Returns (tick, winner, yellow_health, red_health) for each."""
+    import numpy as np
+    import batch_sim
+
+    length = max(len(replay.ticks) for replay in replays)
+    # (tick, replay) input tables, padded past the end of shorter replays
+    inputs = np.zeros((length, len(replays), 3), dtype=np.int32)
+    for i, replay in enumerate(replays):
+        if replay.ticks:
+            inputs[:len(replay.ticks), i] = replay.ticks
+    ends = np.array([len(replay.ticks) for replay in replays])
+
+    results = batch_sim.new_batch([replay.seed for replay in replays], mode, difficulty)
+    batch = results
+    for tick in range(length):
+        # Drop matches whose replay ran out or that already have a winner
+        running = (batch["winner"] == batch_sim.NO_WINNER) & (ends[batch["index"]] > tick)
+        if not running.all():
+            if batch is not results:
+                batch_sim.store(results, batch["index"], batch)
+            batch = batch_sim.select(batch, np.nonzero(running)[0])
+            if batch["n"] == 0:
+                break
+        rows = inputs[tick, batch["index"]]
+        batch_sim.step(batch, rows[:, 0], rows[:, 1], rows[:, 2])
+    if batch is not results:
+        batch_sim.store(results, batch["index"], batch)
+    winners = {batch_sim.NO_WINNER: None, batch_sim.YELLOW_WINS: "YELLOW", batch_sim.RED_WINS: "RED"}
+    return [(int(results["tick"][i]), winners[int(results["winner"][i])],
+             int(results["yellow_health"][i]), int(results["red_health"][i])) for i in range(len(replays))]
+
+
+# --- CORPUS GENERATION ---
+
+POLICIES = {
+    "scripted": scripted_yellow_input,
+    "random": random_yellow_input,
+    "ai": mirror_ai_input,
+}
+
+def record_match(path, seed, mode="AI", difficulty="EASY", yellow_policy=random_yellow_input, max_ticks=FPS * 60 * 3):
+    """Plays a scripted match headlessly and records it, with a randomly varying dt like a real frame clock."""
+    from simulation import rand_int, STREAM_SCRIPTED_INPUT
+    state = new_state(mode, difficulty, seed)
+    recorder = ReplayRecorder(path, state)
+    while not state["winner"] and state["tick"] < max_ticks:
+        yellow_bits = yellow_policy(state)
+        # In PVP red mashes random keys
+        red_bits = rand_int(seed, state["tick"], STREAM_SCRIPTED_INPUT + 1, 0, 31) if mode == "PVP" else 0
+        if mode == "BULLET_HELL":
+            yellow_bits |= INPUT_FIRE
+        dt = 16 + rand_int(seed, state["tick"], STREAM_SCRIPTED_INPUT + 2, 0, 1)
+        recorder.record((yellow_bits, red_bits), dt)
+        step(state, (yellow_bits, red_bits), dt)
+    recorder.close(state)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play back, check or generate match replays.")
+    parser.add_argument("replays", nargs="*", help="replay files or directories of them")
+    parser.add_argument("--check", action="store_true", help="replay every file and compare with its recorded result")
+    parser.add_argument("--generate", type=int, metavar="N", help="record N scripted matches into the first directory given")
+    parser.add_argument("--mode", choices=MODES, default="AI", help="mode of generated matches")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default="EASY", help="difficulty of generated matches")
+    parser.add_argument("--policy", choices=POLICIES, default="random", help="yellow's scripted policy for generated matches")
+    args = parser.parse_args()
+
+    if args.generate:
+        if len(args.replays) != 1:
+            parser.error("--generate needs exactly one output directory")
+        os.makedirs(args.replays[0], exist_ok=True)
+        for seed in range(args.generate):
+            record_match(os.path.join(args.replays[0], f"{args.mode.lower()}-{args.difficulty.lower()}-{seed}{REPLAY_EXTENSION}"),
+                         seed, args.mode, args.difficulty, POLICIES[args.policy])
+        print(f"Recorded {args.generate} matches in {args.replays[0]}")
+    else:
+        paths = []
+        for name in args.replays:
+            if os.path.isdir(name):
+                paths.extend(sorted(os.path.join(name, f) for f in os.listdir(name) if f.endswith(REPLAY_EXTENSION)))
+            else:
+                paths.append(name)
+        if not paths:
+            parser.error("no replay files given")
+
+        start = time.perf_counter()
+        if args.check:
+            checked, mismatches = check(paths)
+            for path, recorded, replayed in mismatches:
+                print(f"MISMATCH {path}: recorded (tick, winner, yellow health, red health) {recorded}, replayed {replayed}")
+            print(f"{checked} replays checked, {len(mismatches)} mismatches in {time.perf_counter() - start:.2f}s")
+            raise SystemExit(1 if mismatches else 0)
+
+        total_ticks = 0
+        for path in paths:
+            replay = load(path)
+            state = play(replay)
+            total_ticks += state["tick"]
+            print(f"{path}: {replay.mode} {replay.difficulty} seed {replay.seed}, {state['tick']} ticks, "
+                  f"winner {state['winner']}, health yellow {state['yellow_health']} red {state['red_health']}")
+        elapsed = time.perf_counter() - start
+        print(f"{len(paths)} replays, {total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed:,.0f} ticks/s)")
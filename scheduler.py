@@ -0,0 +1,47 @@
+import heapq
+
+# Timers on the match clock. A timed rule (a power-up's lifespan, the power-up
+# spawner, the end of multi-shot, a ship's fire cooldown) schedules a timer
+# when the thing it times starts, instead of re-checking it every tick; pop_due() hands back only the
+# timers whose time has come. Timers are plain (due, seq, kind, argument)
+# tuples in a heap, so a queue is deep-copied along with the match state for
+# replay keyframes, and can be rebuilt from a snapshot. The clock is the
+# match's game time, which stands still while the game is paused, so paused
+# timers neither fire nor run down.
+#
+# A timer is not cancelled when what it times ends early (a power-up is picked
+# up, multi-shot is extended by another pickup): whoever runs it checks the
+# state first and ignores timers that no longer apply.
+
+
+class TimerQueue:
+    """A heap of (due time, kind, argument) timers, popped once the clock reaches their due time."""
+
+    def __init__(self):
+        self.heap = []
+        self.seq = 0 # Tie-breaker, so timers due at the same time come out in the order they were scheduled
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, due, kind, arg=None):
+        heapq.heappush(self.heap, (due, self.seq, kind, arg))
+        self.seq += 1
+
+    def next_due(self):
+        """The earliest due time, or None when nothing is scheduled."""
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Removes and returns the timers due at or before `now` as (due, kind, argument), earliest first."""
+        heap = self.heap
+        if not heap or heap[0][0] > now:
+            return ()
+        due = []
+        while heap and heap[0][0] <= now:
+            time, _, kind, arg = heapq.heappop(heap)
+            due.append((time, kind, arg))
+        return due
+
+    def clear(self):
+        self.heap.clear()
@@ -0,0 +1,605 @@
+import random
+
+import pygame
+
+from event_bus import FIRE, HIT, PICKUP, SPAWN, EXPIRE, ROUND_END, MULTISHOT_END
+from scheduler import TimerQueue
+
+# Headless game rules. Nothing in here touches the display, the mixer or the
+# SDL event queue: time comes from the state's own clock (advanced by `dt` in
+# step()) and randomness from the match seed, so matches can be run uncapped
+# and reproduced exactly.
+
+# --- CONSTANTS ---
+# Screen Dimensions
+WIDTH, HEIGHT = 900, 500
+
+# Center Border
+BORDER = pygame.Rect(WIDTH // 2 - 5, 0, 10, HEIGHT)
+
+# Game Settings
+FPS = 60
+VEL = 5  # Player spaceship velocity
+BULLET_VEL = 7
+MAX_BULLETS = 5 # Increased max bullets to accommodate multi-shot
+PLAYER_BULLET_COOLDOWN = 500 # Milliseconds between player shots
+MULTI_SHOT_DURATION = 5000 # 5 seconds
+POWERUP_LIFESPAN = 5000 # 5 seconds for a power-up to exist
+POWERUP_SPAWN_DELAY = (8000, 15000) # Milliseconds from one power-up spawn to the next, rolled once per spawn
+MAX_POWERUPS = 2 # The spawner waits while this many are out
+MAX_HEALTH = 10
+
+# Bullet-hell mode: red is the AI, both sides fire fans of bullets while fire is
+# held, and bullets live in bullet_pool.BulletPool arrays instead of a capped list
+BULLET_HELL_CAPACITY = 8192 # Live bullets per side
+BULLET_HELL_COOLDOWN = 30 # Milliseconds between volleys
+BULLET_HELL_VOLLEY = 64 # Bullets per volley, doubled by multi-shot
+BULLET_HELL_SPREAD = 6 # Vertical speed of the outermost bullets in a volley
+BULLET_HELL_HIT_GRACE = 1000 # A ship that was just hit ignores further hits for this long
+
+# Spaceship Dimensions
+SPACESHIP_WIDTH, SPACESHIP_HEIGHT = 55, 40
+
+# --- AI Difficulty Settings ---
+# (AI_VEL, AI_SHOOT_COOLDOWN) per difficulty
+AI_DIFFICULTY_PRESETS = {
+    "EASY": (3, 1000), # AI shoots slower
+    "HARD": (4.5, 600), # AI shoots faster
+    "HARD+": (4.5, 600), # HARD, steered by ai_planner.Planner
+}
+# Difficulties whose AI plans ahead with ai_planner.py in the "AI" mode; batch_sim.py can't run these
+PLANNED_DIFFICULTIES = ("HARD+",)
+
+# Modes where red is controlled by the AI
+AI_MODES = ("AI", "BULLET_HELL")
+
+# Timestamp used for "never happened", so the first shot is always allowed
+NEVER = -10**9
+
+# --- RANDOM NUMBERS ---
+# Random numbers are a hash of (seed, tick, stream) rather than a stateful
+# generator, so any draw can be recomputed in isolation. batch_sim.py relies on
+# this to reproduce the scalar rules with whole-array operations.
+MASK64 = 0xFFFFFFFFFFFFFFFF
+STREAM_SPAWN_DELAY = 0
+STREAM_SPAWN_SIDE = 1
+STREAM_SPAWN_TYPE = 2
+STREAM_WIGGLE_ROLL = 3
+STREAM_WIGGLE_DIR = 4
+STREAM_SCRIPTED_INPUT = 5
+STREAM_SPAWN_X = 16 # + 2 * attempt
+STREAM_SPAWN_Y = 17 # + 2 * attempt
+
+# --- INPUT BITS ---
+# One player's input for one tick is a bitmask of these flags.
+# FIRE means the fire key was pressed during the tick, the others are held keys.
+INPUT_UP = 1
+INPUT_DOWN = 2
+INPUT_LEFT = 4
+INPUT_RIGHT = 8
+INPUT_FIRE = 16
+
+
+def rand_int(seed, tick, stream, lo, hi):
+    """Returns a random integer in [lo, hi] determined by (seed, tick, stream) (splitmix64)."""
+    x = (seed * 0x9E3779B97F4A7C15 + tick * 0xBF58476D1CE4E5B9 + stream * 0x94D049BB133111EB) & MASK64
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & MASK64
+    x ^= x >> 27
+    x = (x * 0x94D049BB133111EB) & MASK64
+    x ^= x >> 31
+    return lo + x % (hi - lo + 1)
+
+
+# --- GAME STATE MANAGEMENT ---
+
+def new_state(mode="AI", difficulty="EASY", seed=None, now=0):
+    """Creates the state dictionary for a new match. A seed of None picks a random one."""
+    ai_vel, ai_shoot_cooldown = AI_DIFFICULTY_PRESETS[difficulty]
+    if seed is None:
+        seed = random.getrandbits(32)
+    state = {
+        "mode": mode,
+        "difficulty": difficulty,
+        "time": now,
+        "tick": 0,
+        "seed": seed,
+        "ai_vel": ai_vel,
+        "ai_shoot_cooldown": ai_shoot_cooldown,
+        "red": pygame.Rect(700, 300, SPACESHIP_WIDTH, SPACESHIP_HEIGHT),
+        "yellow": pygame.Rect(100, 300, SPACESHIP_WIDTH, SPACESHIP_HEIGHT),
+        "red_bullets": [],
+        "yellow_bullets": [],
+        "red_health": MAX_HEALTH,
+        "yellow_health": MAX_HEALTH,
+        "yellow_cooldown_end": 0, # Time a side's fire cooldown runs out, or 0 when it can fire
+        "red_cooldown_end": 0,
+        "powerups": [],
+        "next_powerup_spawn_time": None,
+        "yellow_multishot_end_time": 0,
+        "red_multishot_end_time": 0,
+        "timers": TimerQueue(), # Power-up expiry and spawning, multi-shot expiry, fire cooldowns; see run_timers()
+        "winner": None # "YELLOW" or "RED" once the match is over
+    }
+    schedule_powerup_spawn(state)
+    if mode == "AI" and difficulty in PLANNED_DIFFICULTIES:
+        from ai_planner import Planner # Imported here because it builds on this module
+        state["ai_planner"] = Planner()
+    if mode == "BULLET_HELL":
+        # Imported here so the other modes don't need NumPy
+        from bullet_pool import BulletPool, volley
+        from spatial_hash import SpatialHash
+        state["red_bullets"] = BulletPool(BULLET_HELL_CAPACITY)
+        state["yellow_bullets"] = BulletPool(BULLET_HELL_CAPACITY)
+        state["bullet_grid"] = SpatialHash(WIDTH, HEIGHT) # Broadphase for bullets cancelling each other
+        state["red_hit_time"] = NEVER
+        state["yellow_hit_time"] = NEVER
+        # (side, multi-shot) -> velocity arrays, built once so firing allocates nothing
+        state["volleys"] = {
+            (side, multi): volley(BULLET_HELL_VOLLEY * (2 if multi else 1), BULLET_VEL if side == "yellow" else -BULLET_VEL, BULLET_HELL_SPREAD)
+            for side in ("yellow", "red") for multi in (False, True)
+        }
+    return state
+
+
+# --- GAME LOGIC FUNCTIONS ---
+
+def move_yellow(bits, yellow):
+    if bits & INPUT_LEFT and yellow.x - VEL > 0:  # LEFT
+        yellow.x -= VEL
+    if bits & INPUT_RIGHT and yellow.x + VEL + yellow.width < BORDER.x:  # RIGHT
+        yellow.x += VEL
+    if bits & INPUT_UP and yellow.y - VEL > 0:  # UP
+        yellow.y -= VEL
+    if bits & INPUT_DOWN and yellow.y + VEL + yellow.height < HEIGHT - 15:  # DOWN
+        yellow.y += VEL
+
+def move_red(bits, red):
+    if bits & INPUT_LEFT and red.x - VEL > BORDER.x + BORDER.width:  # LEFT
+        red.x -= VEL
+    if bits & INPUT_RIGHT and red.x + VEL + red.width < WIDTH:  # RIGHT
+        red.x += VEL
+    if bits & INPUT_UP and red.y - VEL > 0:  # UP
+        red.y -= VEL
+    if bits & INPUT_DOWN and red.y + VEL + red.height < HEIGHT - 15:  # DOWN
+        red.y += VEL
+
+def handle_red_ai_movement(red, yellow, powerups, ai_vel, seed, tick):
+    """Controls the red spaceship with smarter AI to prioritize power-ups."""
+    target_y = yellow.centery
+    target_x = None  # Default: no horizontal target
+
+    # Find the closest power-up on the AI's side
+    closest_powerup = None
+    min_dist = float('inf')
+    for p_rect, p_type, p_time in powerups:
+        if p_rect.centerx > BORDER.centerx:
+            dist = ((red.centerx - p_rect.centerx)**2 + (red.centery - p_rect.centery)**2)**0.5
+            if dist < min_dist:
+                min_dist = dist
+                closest_powerup = p_rect
+
+    # If a power-up is found, make it the primary target
+    if closest_powerup:
+        target_y = closest_powerup.centery
+        target_x = closest_powerup.centerx
+
+    # --- Execute Movement ---
+    # Vertical movement
+    if red.centery < target_y:
+        red.y += ai_vel
+    elif red.centery > target_y:
+        red.y -= ai_vel
+
+    # Horizontal movement
+    if target_x:  # If there's a horizontal target (a power-up)
+        if red.centerx < target_x:
+            red.x += ai_vel
+        elif red.centerx > target_x:
+            red.x -= ai_vel
+    else:  # If no power-up, do the slight random wiggle
+        if rand_int(seed, tick, STREAM_WIGGLE_ROLL, 0, 100) > 98:
+            move_dir = -1 if rand_int(seed, tick, STREAM_WIGGLE_DIR, 0, 1) == 0 else 1
+            red.x += (ai_vel * move_dir)
+
+    # Clamp position to stay within bounds
+    if red.x < BORDER.x + BORDER.width:
+        red.x = BORDER.x + BORDER.width
+    if red.x + red.width > WIDTH:
+        red.x = WIDTH - red.width
+    if red.y < 0:
+        red.y = 0
+    if red.y + red.height > HEIGHT:
+        red.y = HEIGHT - red.height
+
+def ai_wants_to_fire(red, yellow):
+    """The AI fires when it is roughly level with the player."""
+    return abs((red.y + red.height//2) - (yellow.y + yellow.height//2)) < 50
+
+def start_cooldown(state, side, end):
+    """Stops `side` firing until the time `end`, when its cooldown timer runs out."""
+    state[side + "_cooldown_end"] = end
+    state["timers"].schedule(end, "cooldown_end", side)
+
+def fire(state, side, cooldown):
+    """Fires a normal or multi-shot volley for one side. Returns the number of bullets fired."""
+    current_time = state["time"]
+    ship = state[side]
+    bullets = state[side + "_bullets"]
+    can_fire_multi = current_time < state[side + "_multishot_end_time"]
+    bullets_to_fire = 3 if can_fire_multi else 1
+    if len(bullets) > MAX_BULLETS - bullets_to_fire or state[side + "_cooldown_end"]:
+        return 0
+
+    # Can fire again on the first tick more than `cooldown` milliseconds from now
+    start_cooldown(state, side, current_time + cooldown + 1)
+    # Yellow fires from its right edge, red from its left edge
+    x = ship.x + ship.width if side == "yellow" else ship.x
+    y = ship.y + ship.height // 2 - 2
+    if can_fire_multi: # Multi-shot active
+        bullets.append(pygame.Rect(x, y - 10, 10, 5))
+        bullets.append(pygame.Rect(x, y, 10, 5))
+        bullets.append(pygame.Rect(x, y + 10, 10, 5))
+    else: # Normal shot
+        bullets.append(pygame.Rect(x, y, 10, 5))
+    return bullets_to_fire
+
+def cancel_bullets(yellow_bullets, red_bullets):
+    """Removes every bullet that touches an opposing bullet. Returns the number of bullets removed."""
+    if not yellow_bullets or not red_bullets:
+        return 0
+    touching = [bullet.collidelistall(red_bullets) for bullet in yellow_bullets]
+    red_touching = {j for matches in touching for j in matches}
+    if not red_touching:
+        return 0
+    removed = len(red_touching) + sum(1 for matches in touching if matches)
+    yellow_bullets[:] = [bullet for bullet, matches in zip(yellow_bullets, touching) if not matches]
+    red_bullets[:] = [bullet for j, bullet in enumerate(red_bullets) if j not in red_touching]
+    return removed
+
+def handle_bullets(yellow_bullets, red_bullets, yellow, red):
+    """Moves bullets, cancels the ones that touch an opposing bullet and removes the ones that hit or leave the screen.
+    Returns (red_hits, yellow_hits)."""
+    for bullet in yellow_bullets:
+        bullet.x += BULLET_VEL
+    for bullet in red_bullets:
+        bullet.x -= BULLET_VEL
+    cancel_bullets(yellow_bullets, red_bullets)
+
+    red_hits = 0
+    yellow_hits = 0
+    # Iterate over a copy of the list to allow safe removal
+    for bullet in yellow_bullets[:]:
+        if red.colliderect(bullet):
+            red_hits += 1
+            if bullet in yellow_bullets: yellow_bullets.remove(bullet)
+        elif bullet.x > WIDTH:
+            if bullet in yellow_bullets: yellow_bullets.remove(bullet)
+
+    # Iterate over a copy of the list to allow safe removal
+    for bullet in red_bullets[:]:
+        if yellow.colliderect(bullet):
+            yellow_hits += 1
+            if bullet in red_bullets: red_bullets.remove(bullet)
+        elif bullet.x < 0:
+            if bullet in red_bullets: red_bullets.remove(bullet)
+
+    return red_hits, yellow_hits
+
+def fire_volley(state, side):
+    """Bullet-hell firing: a fan of bullets every BULLET_HELL_COOLDOWN, with no bullet cap. Returns the number fired."""
+    current_time = state["time"]
+    if state[side + "_cooldown_end"]:
+        return 0
+    start_cooldown(state, side, current_time + BULLET_HELL_COOLDOWN)
+    ship = state[side]
+    vx, vy = state["volleys"][side, current_time < state[side + "_multishot_end_time"]]
+    x = ship.x + ship.width if side == "yellow" else ship.x
+    y = ship.y + ship.height // 2 - 2
+    return state[side + "_bullets"].spawn(x, y, vx, vy)
+
+def handle_bullet_pools(state):
+    """Bullet-hell version of handle_bullets(). A ship takes at most one hit per BULLET_HELL_HIT_GRACE. Returns (red_hits, yellow_hits)."""
+    from bullet_pool import cancel_overlapping
+    hits = []
+    for shooter, target in (("yellow", "red"), ("red", "yellow")):
+        landed = state[shooter + "_bullets"].update(state[target], WIDTH, HEIGHT)
+        if landed and state["time"] - state[target + "_hit_time"] >= BULLET_HELL_HIT_GRACE:
+            state[target + "_hit_time"] = state["time"]
+            hits.append(1)
+        else:
+            hits.append(0)
+    # Opposing bullets that touch cancel each other, found through the spatial hash
+    cancel_overlapping(state["yellow_bullets"], state["red_bullets"], state["bullet_grid"])
+    return hits[0], hits[1]
+
+def handle_powerups(powerups, yellow, red, yellow_health, red_health, yellow_multishot_end_time, red_multishot_end_time, current_time, picked_up=None):
+    """Checks for powerup collision and applies effects. Collected powerups are appended to `picked_up` as (side, type)."""
+    # Iterate over a copy of the list to allow safe removal
+    for powerup_rect, powerup_type, spawn_time in powerups[:]:
+        if yellow.colliderect(powerup_rect):
+            if powerup_type == "HEALTH":
+                yellow_health = min(MAX_HEALTH, yellow_health + 2)
+            elif powerup_type == "MULTI_SHOT":
+                yellow_multishot_end_time = current_time + MULTI_SHOT_DURATION
+            if picked_up is not None: picked_up.append(("yellow", powerup_type))
+            powerups.remove((powerup_rect, powerup_type, spawn_time))
+        elif red.colliderect(powerup_rect):
+            if powerup_type == "HEALTH":
+                red_health = min(MAX_HEALTH, red_health + 2)
+            elif powerup_type == "MULTI_SHOT":
+                red_multishot_end_time = current_time + MULTI_SHOT_DURATION
+            if picked_up is not None: picked_up.append(("red", powerup_type))
+            powerups.remove((powerup_rect, powerup_type, spawn_time))
+
+    return yellow_health, red_health, yellow_multishot_end_time, red_multishot_end_time
+
+def schedule_powerup_spawn(state):
+    """Rolls the delay to the next power-up spawn and schedules it."""
+    delay = rand_int(state["seed"], state["tick"], STREAM_SPAWN_DELAY, *POWERUP_SPAWN_DELAY)
+    # The spawn happens on the first tick more than `delay` milliseconds from now
+    state["next_powerup_spawn_time"] = state["time"] + delay + 1
+    state["timers"].schedule(state["next_powerup_spawn_time"], "spawn_powerup")
+
+def spawn_powerup(state):
+    """Randomly spawns a power-up away from both ships and schedules its expiry and the next spawn.
+    Returns the new power-up or None."""
+    current_time = state["time"]
+    seed, tick = state["seed"], state["tick"]
+    schedule_powerup_spawn(state)
+
+    spawn_side = "LEFT" if rand_int(seed, tick, STREAM_SPAWN_SIDE, 0, 1) == 0 else "RIGHT"
+    # HEALTH and MULTI_SHOT are weighted 3:1
+    powerup_type = "HEALTH" if rand_int(seed, tick, STREAM_SPAWN_TYPE, 0, 3) < 3 else "MULTI_SHOT"
+
+    # Spawn attempt with collision avoidance
+    tries = 0
+    while True:
+        if spawn_side == "LEFT":
+            powerup_x = rand_int(seed, tick, STREAM_SPAWN_X + 2 * tries, 50, BORDER.left - 50)
+        else: # spawn_side == "RIGHT"
+            powerup_x = rand_int(seed, tick, STREAM_SPAWN_X + 2 * tries, BORDER.right + 50, WIDTH - 50)
+
+        powerup_y = rand_int(seed, tick, STREAM_SPAWN_Y + 2 * tries, 50, HEIGHT - 50)
+        powerup_rect = pygame.Rect(powerup_x, powerup_y, 20, 20)
+
+        # Avoid spawning on ships
+        if not powerup_rect.colliderect(state["yellow"]) and not powerup_rect.colliderect(state["red"]):
+            powerup = (powerup_rect, powerup_type, current_time)
+            state["powerups"].append(powerup)
+            # Gone on the first tick more than POWERUP_LIFESPAN after it appeared
+            state["timers"].schedule(current_time + POWERUP_LIFESPAN + 1, "expire_powerup", current_time)
+            return powerup
+
+        tries += 1
+        if tries > 20:  # Fallback to prevent infinite loop
+            return None
+
+# --- TIMERS ---
+# Handlers for the timers in state["timers"], by kind: handler(state, due, arg, bus).
+
+def on_expire_powerup(state, due, spawn_time, bus):
+    """Drops the power-up that appeared at `spawn_time`, unless it has been picked up already."""
+    for powerup in state["powerups"]:
+        if powerup[2] == spawn_time:
+            state["powerups"].remove(powerup)
+            if bus: bus.emit(EXPIRE, None, powerup[1], state["tick"])
+            return
+
+def on_spawn_powerup(state, due, arg, bus):
+    if len(state["powerups"]) >= MAX_POWERUPS:
+        # Full: try again next tick, like the spawner always has
+        state["timers"].schedule(state["time"] + 1, "spawn_powerup")
+        return
+    powerup = spawn_powerup(state)
+    if powerup and bus: bus.emit(SPAWN, None, powerup[1], state["tick"])
+
+def on_cooldown_end(state, due, side, bus):
+    # Only the timer of the side's latest cooldown ends it
+    if state[side + "_cooldown_end"] == due:
+        state[side + "_cooldown_end"] = 0
+
+def on_multishot_end(state, due, side, bus):
+    # A later pickup moved the end time, and with it another timer
+    if state[side + "_multishot_end_time"] == due and bus:
+        bus.emit(MULTISHOT_END, side, None, state["tick"])
+
+TIMER_HANDLERS = {
+    "cooldown_end": on_cooldown_end,
+    "expire_powerup": on_expire_powerup,
+    "multishot_end": on_multishot_end,
+    "spawn_powerup": on_spawn_powerup,
+}
+# Timers that come due on the same tick run in this order whatever their due time, so a power-up that
+# expires frees its slot for a spawn on the same tick
+TIMER_ORDER = {kind: i for i, kind in enumerate(TIMER_HANDLERS)}
+
+def run_timers(state, bus=None):
+    """Runs the handlers of every timer due by state["time"]."""
+    due = state["timers"].pop_due(state["time"])
+    if len(due) > 1:
+        due.sort(key=lambda timer: TIMER_ORDER[timer[1]])
+    for time, kind, arg in due:
+        TIMER_HANDLERS[kind](state, time, arg, bus)
+
+def rebuild_timers(state):
+    """Recreates state["timers"] from the rest of the state, e.g. after it was overwritten by a network snapshot."""
+    timers = state["timers"]
+    timers.clear()
+    for rect, powerup_type, spawn_time in state["powerups"]:
+        timers.schedule(spawn_time + POWERUP_LIFESPAN + 1, "expire_powerup", spawn_time)
+    for side in ("yellow", "red"):
+        if state[side + "_multishot_end_time"] > state["time"]:
+            timers.schedule(state[side + "_multishot_end_time"], "multishot_end", side)
+        if state[side + "_cooldown_end"]:
+            timers.schedule(state[side + "_cooldown_end"], "cooldown_end", side)
+    timers.schedule(state["next_powerup_spawn_time"], "spawn_powerup")
+
+def check_winner(state):
+    """Sets state["winner"] once a ship has run out of health."""
+    if state["red_health"] <= 0:
+        state["winner"] = "YELLOW"
+    if state["yellow_health"] <= 0:
+        state["winner"] = "RED"
+    return state["winner"]
+
+
+# --- SIMULATION STEP ---
+
+def tick_dt(tick):
+    """Milliseconds of game time in tick number `tick` at FPS ticks per second: 16 or 17, adding up to exactly one second per FPS ticks."""
+    return (tick + 1) * 1000 // FPS - tick * 1000 // FPS
+
+def step(state, inputs, dt=1000 // FPS, profiler=None, bus=None):
+    """Advances the match by one tick of `dt` milliseconds.
+
+    `inputs` is a (yellow_bits, red_bits) pair of INPUT_* bitmasks; red's bits
+    are ignored in the AI modes. The tick's gameplay events are emitted into
+    `bus`, an event_bus.EventBus, if one is given. An enabled
+    profiler.FrameProfiler passed as `profiler` gets a mark after each phase.
+    """
+    if state["winner"]:
+        return
+
+    state["time"] += dt
+    state["tick"] += 1
+    yellow_bits, red_bits = inputs
+
+    # Timers: fire cooldowns, power-up timeout and spawning, and the end of multi-shot. They run first,
+    # so a cooldown that runs out on this tick lets this tick's shot through
+    run_timers(state, bus)
+    if profiler: profiler.mark("timers")
+
+    # Firing
+    if state["mode"] == "BULLET_HELL":
+        if yellow_bits & INPUT_FIRE:
+            fired = fire_volley(state, "yellow")
+            if fired and bus: bus.emit(FIRE, "yellow", fired, state["tick"])
+        fired = fire_volley(state, "red") # The AI never stops firing
+        if fired and bus: bus.emit(FIRE, "red", fired, state["tick"])
+    else:
+        if yellow_bits & INPUT_FIRE:
+            fired = fire(state, "yellow", PLAYER_BULLET_COOLDOWN)
+            if fired and bus: bus.emit(FIRE, "yellow", fired, state["tick"])
+        if state["mode"] == "AI":
+            planner = state.get("ai_planner")
+            if planner.wants_to_fire(state["red"], state["yellow"]) if planner else ai_wants_to_fire(state["red"], state["yellow"]):
+                fired = fire(state, "red", state["ai_shoot_cooldown"])
+                if fired and bus: bus.emit(FIRE, "red", fired, state["tick"])
+        elif red_bits & INPUT_FIRE:
+            fired = fire(state, "red", PLAYER_BULLET_COOLDOWN)
+            if fired and bus: bus.emit(FIRE, "red", fired, state["tick"])
+    if profiler: profiler.mark("firing")
+
+    # Check for Winner
+    if check_winner(state):
+        if bus: bus.emit(ROUND_END, state["winner"], None, state["tick"])
+        return
+
+    # Movement
+    move_yellow(yellow_bits, state["yellow"])
+    if "ai_planner" in state:
+        state["ai_planner"].move(state)
+    elif state["mode"] in AI_MODES:
+        handle_red_ai_movement(state["red"], state["yellow"], state["powerups"], state["ai_vel"], state["seed"], state["tick"])
+    else: # PVP mode
+        move_red(red_bits, state["red"])
+    if profiler: profiler.mark("movement")
+
+    # Bullets and Power-ups
+    if state["mode"] == "BULLET_HELL":
+        red_hits, yellow_hits = handle_bullet_pools(state)
+    else:
+        red_hits, yellow_hits = handle_bullets(state["yellow_bullets"], state["red_bullets"], state["yellow"], state["red"])
+    state["red_health"] -= red_hits
+    state["yellow_health"] -= yellow_hits
+    if bus:
+        for _ in range(red_hits):
+            bus.emit(HIT, "red", None, state["tick"])
+        for _ in range(yellow_hits):
+            bus.emit(HIT, "yellow", None, state["tick"])
+    if profiler: profiler.mark("bullets")
+
+    picked_up = []
+    (state["yellow_health"], state["red_health"],
+     state["yellow_multishot_end_time"], state["red_multishot_end_time"]) = handle_powerups(
+        state["powerups"], state["yellow"], state["red"],
+        state["yellow_health"], state["red_health"],
+        state["yellow_multishot_end_time"], state["red_multishot_end_time"],
+        state["time"], picked_up)
+    for side, powerup_type in picked_up:
+        if powerup_type == "MULTI_SHOT":
+            state["timers"].schedule(state[side + "_multishot_end_time"], "multishot_end", side)
+        if bus: bus.emit(PICKUP, side, powerup_type, state["tick"])
+    if profiler: profiler.mark("pickups")
+
+def multishot_seconds_left(state, side):
+    """Remaining multi-shot time for the UI, rounded up to whole seconds."""
+    remaining = state[side + "_multishot_end_time"] - state["time"]
+    return -(-remaining // 1000) if remaining > 0 else 0
+
+
+# --- HEADLESS RUNNER ---
+
+def scripted_yellow_input(state):
+    """Scripted yellow opponent for headless matches: tracks red vertically and fires whenever possible."""
+    bits = INPUT_FIRE
+    if state["yellow"].centery < state["red"].centery - VEL:
+        bits |= INPUT_DOWN
+    elif state["yellow"].centery > state["red"].centery + VEL:
+        bits |= INPUT_UP
+    return bits
+
+def random_yellow_input(state):
+    """Scripted yellow opponent that mashes random keys, drawn from the match seed."""
+    return rand_int(state["seed"], state["tick"] + 1, STREAM_SCRIPTED_INPUT, 0, 31)
+
+def mirror_ai_input(state):
+    """Scripted yellow opponent that plays like the red AI: chases power-ups on its side, else lines up with red and fires."""
+    yellow, red = state["yellow"], state["red"]
+    target_y = red.centery
+    target_x = None
+
+    # Find the closest power-up on yellow's side
+    min_dist = float('inf')
+    for p_rect, p_type, p_time in state["powerups"]:
+        if p_rect.centerx < BORDER.centerx:
+            dist = (yellow.centerx - p_rect.centerx)**2 + (yellow.centery - p_rect.centery)**2
+            if dist < min_dist:
+                min_dist = dist
+                target_x, target_y = p_rect.centerx, p_rect.centery
+
+    bits = 0
+    if yellow.centery < target_y:
+        bits |= INPUT_DOWN
+    elif yellow.centery > target_y:
+        bits |= INPUT_UP
+    if target_x is not None:
+        if yellow.centerx < target_x:
+            bits |= INPUT_RIGHT
+        elif yellow.centerx > target_x:
+            bits |= INPUT_LEFT
+    if ai_wants_to_fire(red, yellow):
+        bits |= INPUT_FIRE
+    return bits
+
+def run_match(seed=None, difficulty="EASY", yellow_policy=scripted_yellow_input, max_ticks=FPS * 60 * 10, dt=1000 // FPS):
+    """Plays one uncapped AI match headlessly and returns the final state."""
+    state = new_state("AI", difficulty, seed)
+    while not state["winner"] and state["tick"] < max_ticks:
+        step(state, (yellow_policy(state), 0), dt)
+    return state
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    total_ticks = 0
+    wins = {"YELLOW": 0, "RED": 0, None: 0}
+    for seed in range(100):
+        result = run_match(seed)
+        total_ticks += result["tick"]
+        wins[result["winner"]] += 1
+    elapsed = time.perf_counter() - start
+    print(f"100 matches, {total_ticks} ticks in {elapsed:.2f}s ({total_ticks / elapsed:,.0f} ticks/s)")
+    print(f"Yellow: {wins['YELLOW']}  Red: {wins['RED']}  Unfinished: {wins[None]}")
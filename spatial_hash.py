@@ -0,0 +1,130 @@
+import numpy as np
+
+# Uniform-grid broadphase for rectangles stored as NumPy arrays. Entities are
+# binned by the cell holding their top-left corner with a counting sort, so
+# indexing n entities is O(n) whole-array work. A query rect only visits the
+# cells where the top-left corner of an overlapping entity can be, and the
+# candidates found there are confirmed with an exact rectangle test.
+# Everything moves every tick, so the grid is rebuilt from the current
+# positions each time instead of tracking individual moves.
+#
+# The game uses it for one test: bullets against opposing bullets in
+# bullet-hell matches, the only check that grows with the square of the
+# entity count. Hits on a ship are one vectorised test of a whole bullet pool
+# against one rect (BulletPool.update), and power-ups (two at most), the
+# spawner's retries and the classic modes' few bullets are tested against the
+# ships directly, which is cheaper than indexing them and keeps those modes
+# free of NumPy.
+
+# Cells sized so a 10x5 bullet queried against 10x5 bullets visits 2x2 cells
+CELL_WIDTH, CELL_HEIGHT = 20, 10
+
+
+class SpatialHash:
+    """Uniform grid over equally sized rects, answering "which of these overlap that" for whole arrays at once."""
+
+    def __init__(self, width, height, cell_width=CELL_WIDTH, cell_height=CELL_HEIGHT):
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.cols = width // cell_width + 1
+        self.rows = height // cell_height + 1
+        self.x = self.y = None
+        self.width = self.height = 0
+        self.order = np.zeros(0, dtype=np.intp) # Entity indices sorted by cell
+        self.starts = np.zeros(self.cols * self.rows + 1, dtype=np.intp) # order[starts[c]:starts[c + 1]] are in cell c
+
+    def column(self, x):
+        return np.clip(np.floor_divide(x, self.cell_width).astype(np.intp), 0, self.cols - 1)
+
+    def row(self, y):
+        return np.clip(np.floor_divide(y, self.cell_height).astype(np.intp), 0, self.rows - 1)
+
+    def build(self, x, y, width, height):
+        """Indexes rects of size (width, height) with top-left corners at (x, y). Keeps references to x and y."""
+        self.x, self.y, self.width, self.height = x, y, width, height
+        cells = self.row(y) * self.cols + self.column(x)
+        self.order = np.argsort(cells, kind="stable")
+        counts = np.bincount(cells, minlength=self.cols * self.rows)
+        np.cumsum(counts, out=self.starts[1:])
+
+    def query_pairs(self, x, y, width, height):
+        """Returns (query indices, entity indices) of every overlapping pair between the rects (x, y, width, height)
+        and the indexed entities."""
+        # An overlapping entity's corner lies in (x - entity width, x + width) x (y - entity height, y + height)
+        first_col, last_col = self.column(x - self.width), self.column(x + width)
+        first_row, last_row = self.row(y - self.height), self.row(y + height)
+        span_cols = -(-(width + self.width) // self.cell_width) + 1
+        span_rows = -(-(height + self.height) // self.cell_height) + 1
+        queries = np.arange(len(x))
+        found_queries, found_entities = [], []
+        for dy in range(span_rows):
+            for dx in range(span_cols):
+                col, row = first_col + dx, first_row + dy
+                inside = (col <= last_col) & (row <= last_row)
+                cell = (row * self.cols + col)[inside]
+                start = self.starts[cell]
+                counts = self.starts[cell + 1] - start
+                total = counts.sum()
+                if total == 0:
+                    continue
+                # Expand every query into one candidate per entity in the cell
+                found_queries.append(np.repeat(queries[inside], counts))
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                found_entities.append(self.order[np.repeat(start, counts) + offsets])
+        if not found_queries:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        query = np.concatenate(found_queries)
+        entity = np.concatenate(found_entities)
+        qx, qy, ex, ey = x[query], y[query], self.x[entity], self.y[entity]
+        overlap = (qx < ex + self.width) & (ex < qx + width) & (qy < ey + self.height) & (ey < qy + height)
+        return query[overlap], entity[overlap]
+
+
+def brute_force_pairs(ax, ay, aw, ah, bx, by, bw, bh):
+    """Reference O(n*m) version of SpatialHash.query_pairs(), for testing and benchmarks."""
+    overlap = ((ax[:, None] < bx[None, :] + bw) & (bx[None, :] < ax[:, None] + aw)
+               & (ay[:, None] < by[None, :] + bh) & (by[None, :] < ay[:, None] + ah))
+    return np.nonzero(overlap)
+
+
+if __name__ == "__main__":
+    import time
+    import pygame
+    from simulation import WIDTH, HEIGHT
+
+    # Two opposing swarms of 10x5 bullets, like a bullet-hell match at its peak
+    rng = np.random.default_rng(0)
+    grid = SpatialHash(WIDTH, HEIGHT)
+    print(f"{'bullets/side':>12} {'Rect lists':>12} {'brute force':>12} {'grid':>10} {'pairs':>7}")
+    for n in (10, 100, 1000, 3000, 5000, 10000):
+        ax, ay = rng.uniform(0, WIDTH, n).astype(np.float32), rng.uniform(0, HEIGHT, n).astype(np.float32)
+        bx, by = rng.uniform(0, WIDTH, n).astype(np.float32), rng.uniform(0, HEIGHT, n).astype(np.float32)
+        runs = 20
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            grid.build(bx, by, 10, 5)
+            pairs = grid.query_pairs(ax, ay, 10, 5)
+        grid_ms = (time.perf_counter() - start) / runs * 1000
+
+        # The classic modes' approach: pygame.Rect lists and collidelistall
+        if n <= 3000:
+            a_rects = [pygame.Rect(int(x), int(y), 10, 5) for x, y in zip(ax, ay)]
+            b_rects = [pygame.Rect(int(x), int(y), 10, 5) for x, y in zip(bx, by)]
+            start = time.perf_counter()
+            for _ in range(runs):
+                [rect.collidelistall(b_rects) for rect in a_rects]
+            rect_ms = f"{(time.perf_counter() - start) / runs * 1000:9.3f} ms"
+        else:
+            rect_ms = "skipped"
+
+        if n <= 5000:
+            start = time.perf_counter()
+            for _ in range(runs):
+                expected = brute_force_pairs(ax, ay, 10, 5, bx, by, 10, 5)
+            brute_ms = f"{(time.perf_counter() - start) / runs * 1000:9.3f} ms"
+            assert sorted(zip(*map(np.ndarray.tolist, pairs))) == sorted(zip(*map(np.ndarray.tolist, expected)))
+        else:
+            brute_ms = "skipped"
+        print(f"{n:>12} {rect_ms:>12} {brute_ms:>12} {grid_ms:7.3f} ms {len(pairs[0]):>7}")
@@ -0,0 +1,254 @@
+import argparse
+import collections
+import sqlite3
+import threading
+import time
+
+from simulation import FPS, MULTI_SHOT_DURATION, AI_MODES
+from event_bus import FIRE, HIT, PICKUP, SPAWN, EXPIRE, MULTISHOT_END
+
+# Match telemetry. A TelemetrySink subscribes to a match's event bus, so the
+# firing code, handle_bullets(), handle_powerups() and the winner check report
+# through the events they already emit. Subscribers only append a small tuple
+# to a bounded deque, which is safe to share with one consumer thread without
+# a lock; a background writer thread drains it every FLUSH_SECONDS (or sooner
+# once BATCH_SIZE records are waiting) and writes each batch to SQLite in one
+# transaction. Per-match totals are added up on the writer thread, so the game
+# loop never touches the database. When the writer falls behind and the queue
+# is full, event records are dropped and counted rather than stalling a frame;
+# match start and end records are always queued.
+#
+# python telemetry.py [DB] prints win rates, time to kill, accuracy and more
+# per mode and difficulty.
+
+DEFAULT_PATH = "telemetry.db"
+QUEUE_CAPACITY = 50000 # Event records waiting for the writer, at most
+BATCH_SIZE = 2000 # Wake the writer early once this many are waiting
+FLUSH_SECONDS = 0.5
+MULTI_SHOT_TICKS = MULTI_SHOT_DURATION * FPS // 1000
+
+# Record kinds, the first item of every queued tuple
+MATCH_START = 0 # (MATCH_START, match, mode, difficulty, seed, red player)
+EVENT = 1 # (EVENT, match, tick, event type, side, value)
+MATCH_END = 2 # (MATCH_END, match, winner, ticks, game milliseconds, records dropped)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    started REAL, -- Unix time
+    mode TEXT, difficulty TEXT, seed INTEGER,
+    red_player TEXT, -- "ai" or "human"; yellow is always human
+    winner TEXT, -- "YELLOW", "RED", or NULL when the match was abandoned
+    ticks INTEGER, duration_ms INTEGER,
+    yellow_shots INTEGER, red_shots INTEGER,
+    yellow_hits INTEGER, red_hits INTEGER, -- Hits landed
+    yellow_pickups INTEGER, red_pickups INTEGER,
+    yellow_multishot_ticks INTEGER, red_multishot_ticks INTEGER,
+    spawns INTEGER, expiries INTEGER,
+    dropped INTEGER -- Event records lost to backpressure
+);
+CREATE TABLE IF NOT EXISTS events (
+    match INTEGER, tick INTEGER, type INTEGER, side TEXT, value TEXT
+);
+"""
+
+
+class MatchTotals:
+    """Per-match counters, kept by the writer thread."""
+
+    def __init__(self, row_id):
+        self.row_id = row_id
+        self.counts = collections.Counter()
+        self.multishot_until = {"yellow": 0, "red": 0} # Tick each side's multi-shot runs out
+
+    def add(self, tick, event_type, side, value):
+        other = "red" if side == "yellow" else "yellow"
+        if event_type == FIRE:
+            self.counts[side + "_shots"] += value
+        elif event_type == HIT:
+            self.counts[other + "_hits"] += 1
+        elif event_type == PICKUP:
+            self.counts[side + "_pickups"] += 1
+            if value == "MULTI_SHOT":
+                # A pickup while multi-shot is active extends it
+                until = tick + MULTI_SHOT_TICKS
+                self.counts[side + "_multishot_ticks"] += until - max(tick, self.multishot_until[side])
+                self.multishot_until[side] = until
+        elif event_type == SPAWN:
+            self.counts["spawns"] += 1
+        elif event_type == EXPIRE:
+            self.counts["expiries"] += 1
+
+    def finish(self, ticks):
+        """Takes off the multi-shot time that was still to come when the match ended."""
+        for side, until in self.multishot_until.items():
+            self.counts[side + "_multishot_ticks"] -= max(0, until - ticks)
+
+
+class TelemetrySink:
+    """Queues match records from the game thread and writes them to SQLite on a background thread."""
+
+    def __init__(self, path=DEFAULT_PATH, capacity=QUEUE_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.batch_size = min(BATCH_SIZE, capacity // 2)
+        self.records = collections.deque()
+        self.wake = threading.Event()
+        self.closing = False
+        self.match = None # Number of the match being recorded
+        self.start_time = 0 # Game time the match started at
+        self.matches = 0
+        self.dropped = 0 # Event records dropped in the current match
+        self.error = None # Set by the writer if the database fails; later records are discarded
+        self.thread = threading.Thread(target=self.run, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    # --- GAME THREAD ---
+
+    def start_match(self, state, bus):
+        """Starts recording the match in `state` from the events on `bus`."""
+        self.end_match(state)
+        self.matches += 1
+        self.match = self.matches
+        self.dropped = 0
+        red_player = "ai" if state["mode"] in AI_MODES else "human"
+        self.records.append((MATCH_START, self.match, state["mode"], state["difficulty"], state["seed"], red_player))
+        self.start_time = state["time"]
+        for event_type in (FIRE, HIT, PICKUP, SPAWN, EXPIRE, MULTISHOT_END):
+            bus.subscribe(event_type, self.on_event)
+
+    def on_event(self, event):
+        if self.match is None:
+            return
+        if len(self.records) >= self.capacity:
+            self.dropped += 1 # Backpressure: lose the record rather than the frame
+            return
+        self.records.append((EVENT, self.match, event.tick, event.type, event.side, event.value))
+        if len(self.records) >= self.batch_size:
+            self.wake.set()
+
+    def end_match(self, state):
+        """Finishes the current match, if any, with the result in `state`; unfinished matches have no winner."""
+        if self.match is None:
+            return
+        self.records.append((MATCH_END, self.match, state["winner"], state["tick"], state["time"] - self.start_time, self.dropped))
+        self.match = None
+        self.wake.set()
+
+    def close(self, timeout=5.0):
+        """Writes everything still queued and stops the writer."""
+        self.closing = True
+        self.wake.set()
+        self.thread.join(timeout)
+
+    # --- WRITER THREAD ---
+
+    def run(self):
+        try:
+            db = sqlite3.connect(self.path)
+            db.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            self.fail(e)
+            return
+        totals = {} # match number -> MatchTotals
+        while True:
+            self.wake.wait(FLUSH_SECONDS)
+            self.wake.clear()
+            closing = self.closing
+            try:
+                self.flush(db, totals)
+            except sqlite3.Error as e:
+                self.fail(e)
+                break
+            if closing:
+                break
+        db.close()
+
+    def flush(self, db, totals):
+        """Writes every queued record in one transaction."""
+        records = self.records
+        events = []
+        with db:
+            for _ in range(len(records)):
+                record = records.popleft()
+                kind = record[0]
+                if kind == EVENT:
+                    _, match, tick, event_type, side, value = record
+                    match_totals = totals.get(match)
+                    if match_totals:
+                        match_totals.add(tick, event_type, side, value)
+                        events.append((match_totals.row_id, tick, event_type, side, None if value is None else str(value)))
+                elif kind == MATCH_START:
+                    _, match, mode, difficulty, seed, red_player = record
+                    cursor = db.execute("INSERT INTO matches (started, mode, difficulty, seed, red_player) VALUES (?, ?, ?, ?, ?)",
+                                        (time.time(), mode, difficulty, seed, red_player))
+                    totals[match] = MatchTotals(cursor.lastrowid)
+                elif kind == MATCH_END:
+                    _, match, winner, ticks, duration_ms, dropped = record
+                    match_totals = totals.pop(match, None)
+                    if match_totals:
+                        match_totals.finish(ticks)
+                        columns = ["winner", "ticks", "duration_ms", "dropped"]
+                        values = [winner, ticks, duration_ms, dropped]
+                        for column in ("yellow_shots", "red_shots", "yellow_hits", "red_hits", "yellow_pickups", "red_pickups",
+                                       "yellow_multishot_ticks", "red_multishot_ticks", "spawns", "expiries"):
+                            columns.append(column)
+                            values.append(match_totals.counts[column])
+                        db.execute(f"UPDATE matches SET {', '.join(c + ' = ?' for c in columns)} WHERE id = ?",
+                                   values + [match_totals.row_id])
+            if events:
+                db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", events)
+
+    def fail(self, error):
+        self.error = error
+        self.capacity = 0 # Drop everything from now on
+        self.records.clear()
+        print(f"Warning: Telemetry is off. Error: {error}")
+
+
+# --- SUMMARY ---
+
+SUMMARY_QUERY = """
+SELECT mode, difficulty, red_player, COUNT(*),
+       SUM(winner IS 'YELLOW'), SUM(winner IS 'RED'), SUM(winner IS NULL),
+       AVG(CASE WHEN winner IS NOT NULL THEN duration_ms END),
+       SUM(yellow_shots), SUM(red_shots), SUM(yellow_hits), SUM(red_hits),
+       AVG(yellow_pickups + red_pickups), AVG(spawns), AVG(expiries),
+       SUM(yellow_multishot_ticks), SUM(red_multishot_ticks), SUM(ticks), SUM(dropped)
+FROM matches WHERE ticks IS NOT NULL
+GROUP BY mode, difficulty, red_player ORDER BY mode, difficulty
+"""
+
+def summary(path=DEFAULT_PATH):
+    """Returns a printable per-mode and per-difficulty summary of the matches in the database at `path`."""
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute(SUMMARY_QUERY).fetchall()
+    finally:
+        db.close()
+    if not rows:
+        return f"No finished matches in {path}"
+    lines = []
+    for (mode, difficulty, red_player, matches, yellow_wins, red_wins, abandoned, time_to_kill, yellow_shots, red_shots,
+         yellow_hits, red_hits, pickups, spawns, expiries, yellow_multishot, red_multishot, ticks, dropped) in rows:
+        decided = yellow_wins + red_wins
+        red_name = "AI" if red_player == "ai" else "red"
+        lines.append(f"{mode} {difficulty}: {matches} match{'es' if matches != 1 else ''} ({abandoned} abandoned)")
+        if decided:
+            lines.append(f"  wins: yellow {yellow_wins / decided:.0%}, {red_name} {red_wins / decided:.0%}; "
+                         f"time to kill {time_to_kill / 1000:.1f} s on average")
+        lines.append(f"  accuracy: yellow {yellow_hits / yellow_shots if yellow_shots else 0:.1%} of {yellow_shots} shots, "
+                     f"{red_name} {red_hits / red_shots if red_shots else 0:.1%} of {red_shots} shots")
+        lines.append(f"  multi-shot uptime: yellow {yellow_multishot / ticks if ticks else 0:.1%}, "
+                     f"{red_name} {red_multishot / ticks if ticks else 0:.1%}")
+        lines.append(f"  power-ups per match: {spawns:.1f} spawned, {pickups:.1f} picked up, {expiries:.1f} expired")
+        if dropped:
+            lines.append(f"  {dropped} event records dropped under backpressure")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise recorded match telemetry.")
+    parser.add_argument("database", nargs="?", default=DEFAULT_PATH, help=f"telemetry database (default: {DEFAULT_PATH})")
+    args = parser.parse_args()
+    print(summary(args.database))
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+# Font rasterisation is one of the most expensive calls in the game loop, and
+# the HUD strings only change a few times per match, so rendered text
+# surfaces are cached by (font, text, color) with least-recently-used eviction.
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Same as font.render(text, antialias, color), but only rasterises each string once."""
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.surfaces),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+TEXT_CACHE = TextCache()
+
+def render_text(font, text, color):
+    """Renders antialiased text through the shared cache."""
+    return TEXT_CACHE.render(font, text, color)
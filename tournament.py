@@ -0,0 +1,123 @@
+import argparse
+import csv
+import itertools
+import os
+import time
+import zlib
+from multiprocessing import Pool
+
+import numpy as np
+
+import batch_sim
+from simulation import rand_int
+
+# AI parameter sweeps. Every cell of the grid (AI_VEL x AI_SHOOT_COOLDOWN x
+# opponent) is one task for the process pool; each worker plays the cell's
+# matches with the batch engine and returns one row of the results table.
+# Rows are appended as cells finish, so an interrupted sweep resumes by
+# skipping every cell already in the table.
+
+OPPONENTS = {
+    "scripted": batch_sim.scripted_yellow_input,
+    "random": batch_sim.random_yellow_input,
+    "ai": batch_sim.mirror_ai_input,
+}
+
+RESULT_FIELDS = [
+    "ai_vel", "ai_shoot_cooldown", "opponent", "matches", "seed",
+    "red_win_rate", "yellow_win_rate", "unfinished",
+    "mean_match_seconds", "red_damage_dealt", "yellow_damage_dealt",
+    "red_accuracy", "yellow_accuracy", "red_pickups", "yellow_pickups",
+]
+
+
+def cell_key(ai_vel, ai_shoot_cooldown, opponent, matches, seed):
+    """Identifies a cell in the results table, independent of how the grid was ordered."""
+    return (float(ai_vel), int(ai_shoot_cooldown), opponent, int(matches), int(seed))
+
+def cell_seeds(key):
+    """Deterministic per-match seeds for a cell, derived from the cell itself."""
+    ai_vel, ai_shoot_cooldown, opponent, matches, seed = key
+    cell_hash = zlib.crc32(f"{ai_vel}|{ai_shoot_cooldown}|{opponent}".encode())
+    return np.array([rand_int(seed, cell_hash, i, 0, 2**32 - 1) for i in range(matches)], dtype=np.uint64)
+
+def run_cell(key):
+    """Plays every match of one cell and returns its row of the results table."""
+    ai_vel, ai_shoot_cooldown, opponent, matches, seed = key
+    result = batch_sim.run_batch(cell_seeds(key), yellow_policy=OPPONENTS[opponent],
+                                 ai_vel=ai_vel, ai_shoot_cooldown=ai_shoot_cooldown)
+
+    def accuracy(side):
+        shots = result[side + "_shots"].sum()
+        return result[side + "_hits"].sum() / shots if shots else 0.0
+
+    return {
+        "ai_vel": ai_vel,
+        "ai_shoot_cooldown": ai_shoot_cooldown,
+        "opponent": opponent,
+        "matches": matches,
+        "seed": seed,
+        "red_win_rate": round(float(np.mean(result["winner"] == batch_sim.RED_WINS)), 4),
+        "yellow_win_rate": round(float(np.mean(result["winner"] == batch_sim.YELLOW_WINS)), 4),
+        "unfinished": int(np.sum(result["winner"] == batch_sim.NO_WINNER)),
+        "mean_match_seconds": round(float(result["time"].mean()) / 1000, 2),
+        "red_damage_dealt": round(float(result["red_hits"].mean()), 2),
+        "yellow_damage_dealt": round(float(result["yellow_hits"].mean()), 2),
+        "red_accuracy": round(float(accuracy("red")), 4),
+        "yellow_accuracy": round(float(accuracy("yellow")), 4),
+        "red_pickups": round(float(result["red_pickups"].mean()), 2),
+        "yellow_pickups": round(float(result["yellow_pickups"].mean()), 2),
+    }
+
+def finished_cells(path):
+    """Reads the keys of the cells already in a results table."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline="") as f:
+        return {cell_key(row["ai_vel"], row["ai_shoot_cooldown"], row["opponent"], row["matches"], row["seed"])
+                for row in csv.DictReader(f)}
+
+def run_tournament(ai_vels, ai_shoot_cooldowns, opponents, matches, seed=0, out="tournament.csv", workers=None):
+    """Runs every cell of the grid that isn't in `out` yet, appending one row per finished cell."""
+    done = finished_cells(out)
+    cells = [cell_key(v, c, o, matches, seed) for v, c, o in itertools.product(ai_vels, ai_shoot_cooldowns, opponents)]
+    todo = [key for key in cells if key not in done]
+    print(f"{len(cells)} cells, {len(cells) - len(todo)} already finished, {len(todo)} to run")
+    if not todo:
+        return
+
+    start = time.perf_counter()
+    new_file = not os.path.exists(out)
+    with open(out, "a", newline="") as f, Pool(workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if new_file:
+            writer.writeheader()
+        # One cell per task keeps all workers busy until the grid runs out
+        for i, row in enumerate(pool.imap_unordered(run_cell, todo, chunksize=1), 1):
+            writer.writerow(row)
+            f.flush()
+            print(f"[{i}/{len(todo)}] AI_VEL={row['ai_vel']} AI_SHOOT_COOLDOWN={row['ai_shoot_cooldown']} "
+                  f"vs {row['opponent']}: red wins {row['red_win_rate']:.1%}, {row['mean_match_seconds']}s per match")
+    elapsed = time.perf_counter() - start
+    print(f"{len(todo) * matches} matches in {elapsed:.1f}s ({len(todo) * matches / elapsed:,.0f} matches/s)")
+
+
+def parse_list(kind):
+    return lambda text: [kind(value) for value in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep AI parameters against scripted opponents.")
+    parser.add_argument("--ai-vel", type=parse_list(float), default=[3, 4.5], help="comma-separated AI_VEL values")
+    parser.add_argument("--ai-cooldown", type=parse_list(int), default=[600, 1000], help="comma-separated AI_SHOOT_COOLDOWN values (ms)")
+    parser.add_argument("--opponents", type=parse_list(str), default=list(OPPONENTS), help=f"comma-separated opponents: {', '.join(OPPONENTS)}")
+    parser.add_argument("--matches", type=int, default=1000, help="matches per cell")
+    parser.add_argument("--seed", type=int, default=0, help="base seed; per-match seeds are derived from it and the cell")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--out", default="tournament.csv", help="results table; existing rows are kept and skipped")
+    args = parser.parse_args()
+
+    unknown = [o for o in args.opponents if o not in OPPONENTS]
+    if unknown:
+        parser.error(f"unknown opponents: {', '.join(unknown)}")
+    run_tournament(args.ai_vel, args.ai_cooldown, args.opponents, args.matches, args.seed, args.out, args.workers)